@@ -12,28 +12,30 @@ db = SQLAlchemy()
 login_manager = LoginManager()
 jwt = JWTManager()
 
-# Set Google Cloud credentials - absolute path
-CREDENTIALS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'google-vision-key.json')
-if os.path.exists(CREDENTIALS_PATH):
-    os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = CREDENTIALS_PATH
-    print(f"✅ Google Cloud credentials loaded: {CREDENTIALS_PATH}")
-else:
-    print(f"⚠️ Warning: Credentials file not found at {CREDENTIALS_PATH}")
-
-def create_app():
+def create_app(start_workers=None):
     """Create and configure Flask application"""
     app = Flask(__name__)
     
+    from app.serialization import init_json
+    init_json(app)
+    
     # Configuration
+    from app.database import engine_options, database_binds, configure_engine
     SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'dev-secret-key-change-in-production')
+    DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///dealership.db')
     app.config.update(
-        SQLALCHEMY_DATABASE_URI=os.getenv('DATABASE_URL', 'sqlite:///dealership.db'),
+        SQLALCHEMY_DATABASE_URI=DATABASE_URL,
+        SQLALCHEMY_ENGINE_OPTIONS=engine_options(DATABASE_URL),
+        SQLALCHEMY_BINDS=database_binds(),
         SECRET_KEY=SECRET_KEY,
-        JWT_SECRET_KEY=SECRET_KEY
+        JWT_SECRET_KEY=SECRET_KEY,
+        # Whole-request cap: oversize bodies get a 413 before any parsing
+        MAX_CONTENT_LENGTH=int(os.getenv('MAX_CONTENT_LENGTH', str(512 * 1024 * 1024)))
     )
     
     # Initialize extensions
     db.init_app(app)
+    configure_engine(app)
     login_manager.init_app(app)
     jwt.init_app(app)
     CORS(app)
@@ -41,11 +43,34 @@ def create_app():
     # Register blueprints
     from app.auth import bp as auth_bp
     from app.documents import bp as docs_bp
+    from app.vehicles import bp as vehicles_bp
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(docs_bp, url_prefix='/api/documents')
+    app.register_blueprint(vehicles_bp, url_prefix='/api/vehicles')
+    
+    # Schema comes from versioned migrations; with DB_MIGRATE_ON_START=0 run 'flask migrate' on deploy
+    from app.migrations import MIGRATE_ON_START, run_migrations, migrate_command
+    app.cli.add_command(migrate_command)
+    from app.reextract import reextract_command
+    app.cli.add_command(reextract_command)
+    from app.storage import migrate_storage_command, init_storage
+    app.cli.add_command(migrate_storage_command)
+    init_storage(app)
+    if MIGRATE_ON_START:
+        with app.app_context():
+            run_migrations()
+    
+    from app.metrics import init_metrics
+    init_metrics(app)
+    
+    from app.compression import init_compression
+    init_compression(app)
     
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # OCR workers start with each process's first request, unless they run as worker.py
+    from app.jobs import OCR_WORKER_MODE, start_worker_pool
+    if start_workers is None:
+        start_workers = OCR_WORKER_MODE != 'external'
+    if start_workers:
+        start_worker_pool(app)
     
     return app
\ No newline at end of file
@@ -1,11 +1,78 @@
+import os
+import time
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
 from flask import Blueprint, request, jsonify
-from app import db
-from app.models import User
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import create_access_token
+from app import db, jwt
+from app.models import User, RevokedToken
+from app.passwords import hash_password, verify_password
+from flask_jwt_extended import create_access_token, get_jwt, verify_jwt_in_request
 
 bp = Blueprint('auth', __name__)
 
+# Revocation lookups are cached per process; a logout in another worker takes
+# up to REVOCATION_CACHE_TTL seconds to be seen here (immediate in this one)
+REVOCATION_CACHE_TTL = float(os.getenv('REVOCATION_CACHE_TTL', '30'))
+REVOCATION_CACHE_SIZE = int(os.getenv('REVOCATION_CACHE_SIZE', '10000'))
+
+# Who a request is for, straight from the token claims
+Identity = namedtuple('Identity', ['user_id', 'role', 'dealership_name'])
+
+class RevocationCache:
+    """Thread-safe LRU of jti -> revoked flag, entries expire after ttl seconds"""
+    def __init__(self, ttl=REVOCATION_CACHE_TTL, max_size=REVOCATION_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, jti):
+        """Cached flag, or None when unknown or stale"""
+        with self.lock:
+            entry = self.entries.get(jti)
+            if entry is None or entry[1] < time.monotonic():
+                self.misses += 1
+                return None
+            self.entries.move_to_end(jti)
+            self.hits += 1
+            return entry[0]
+    
+    def set(self, jti, revoked):
+        with self.lock:
+            self.entries[jti] = (revoked, time.monotonic() + self.ttl)
+            self.entries.move_to_end(jti)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+revocation_cache = RevocationCache()
+
+@jwt.token_in_blocklist_loader
+def is_token_revoked(jwt_header, jwt_payload):
+    """Checked on every authenticated request; hits the database once per token per TTL"""
+    jti = jwt_payload['jti']
+    revoked = revocation_cache.get(jti)
+    if revoked is None:
+        revoked = db.session.get(RevokedToken, jti) is not None
+        revocation_cache.set(jti, revoked)
+    return revoked
+
+def token_claims(user):
+    """Claims embedded at login so authorization needs no User lookup"""
+    return {'role': user.role, 'dealership': user.dealership_name}
+
+def current_identity():
+    """Identity of the verified token on this request"""
+    claims = get_jwt()
+    user_id = int(claims['sub'])
+    if 'role' not in claims:
+        # Tokens issued before role claims existed
+        user = db.session.get(User, user_id)
+        return Identity(user_id, user.role if user else None, user.dealership_name if user else None)
+    return Identity(user_id, claims['role'], claims.get('dealership'))
+
 def validate_input(data, required_fields):
     """Validate required fields in request data"""
     if not data or not all(data.get(field) for field in required_fields):
@@ -30,7 +97,7 @@ def register():
         
         user = User(
             email=data['email'],
-            password=generate_password_hash(data['password']),
+            password=hash_password(data['password']),
             role=data.get('role', 'dealer'),
             dealership_name=data.get('dealership_name', 'Unknown')
         )
@@ -43,7 +110,7 @@ def register():
             'message': 'Registration successful',
             'user_id': user.id
         }), 201
-        
+    
     except Exception as e:
         db.session.rollback()
         return handle_error(str(e))
@@ -59,10 +126,19 @@ def login():
         
         user = User.query.filter_by(email=data['email']).first()
         
-        if not user or not check_password_hash(user.password, data['password']):
+        if not user:
             return handle_error('Invalid email or password', 401)
         
-        token = create_access_token(identity=str(user.id))
+        ok, rehash = verify_password(user.password, data['password'])
+        if not ok:
+            return handle_error('Invalid email or password', 401)
+        
+        if rehash:
+            # Upgrade to the current hashing policy while the plaintext is at hand
+            user.password = hash_password(data['password'])
+            db.session.commit()
+        
+        token = create_access_token(identity=str(user.id), additional_claims=token_claims(user))
         
         return jsonify({
             'success': True,
@@ -74,6 +150,57 @@ def login():
                 'dealership_name': user.dealership_name
             }
         }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return handle_error(str(e))
+
+@bp.route('/logout', methods=['POST'])
+def logout():
+    """Revoke the current access token"""
+    try:
+        verify_jwt_in_request()
+    except Exception:
+        return handle_error('Unauthorized', 401)
+    
+    try:
+        claims = get_jwt()
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        # Opportunistic purge: expired tokens are rejected by their exp claim anyway.
+        # Tokens without exp (JWT_ACCESS_TOKEN_EXPIRES=False) have no expires_at and stay revoked
+        RevokedToken.query.filter(
+            RevokedToken.expires_at.isnot(None),
+            RevokedToken.expires_at < now
+        ).delete(synchronize_session=False)
+        exp = claims.get('exp')
+        db.session.merge(RevokedToken(
+            jti=claims['jti'],
+            user_id=int(claims['sub']),
+            expires_at=datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None) if exp is not None else None
+        ))
+        db.session.commit()
+        revocation_cache.set(claims['jti'], True)
         
+        return jsonify({'success': True, 'message': 'Logged out'}), 200
+    
     except Exception as e:
-        return handle_error(str(e))
\ No newline at end of file
+        db.session.rollback()
+        return handle_error(str(e))
+
+@bp.route('/me', methods=['GET'])
+def me():
+    """Current user from token claims (no database lookup)"""
+    try:
+        verify_jwt_in_request()
+    except Exception:
+        return handle_error('Unauthorized', 401)
+    
+    identity = current_identity()
+    return jsonify({
+        'success': True,
+        'user': {
+            'id': identity.user_id,
+            'role': identity.role,
+            'dealership_name': identity.dealership_name
+        }
+    }), 200
\ No newline at end of file
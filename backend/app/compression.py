@@ -0,0 +1,73 @@
+"""Negotiated gzip/brotli compression of API responses above a size threshold
+
+Brotli is offered when the brotli package is installed, gzip always. Bodies under
+COMPRESS_MIN_BYTES go out as they are: the saving would not pay for the CPU and headers.
+File downloads, zip streams and previews are passed through untouched, they are already
+compressed or streamed. COMPRESS_ENABLED=0 leaves compression to a proxy in front.
+"""
+import os
+import gzip
+from app.metrics import RESPONSE_BYTES
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+# Levels for dynamic responses: near the best ratio per CPU ms, not the best ratio
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '5'))
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '4'))
+COMPRESS_MIMETYPES = {'application/json', 'text/plain', 'text/html', 'text/csv'}
+
+def compress_gzip(data):
+    # mtime=0: equal bodies compress to equal bytes
+    return gzip.compress(data, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+
+def compress_brotli(data):
+    return brotli.compress(data, quality=COMPRESS_BROTLI_QUALITY)
+
+ENCODINGS = {'br': compress_brotli, 'gzip': compress_gzip}
+
+def available_encodings():
+    """Encodings this process can produce, preferred first"""
+    return ['br', 'gzip'] if brotli else ['gzip']
+
+def is_compressible(response):
+    return (
+        response.status_code in (200, 201)
+        and not response.direct_passthrough
+        and not response.is_streamed
+        and response.mimetype in COMPRESS_MIMETYPES
+        and 'Content-Encoding' not in response.headers
+    )
+
+def compress_response(response, accept_encodings):
+    """Compress the body with the best encoding the client accepts, when it is big enough"""
+    if not is_compressible(response):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = accept_encodings.best_match(available_encodings())
+    if not encoding or (response.content_length or 0) < COMPRESS_MIN_BYTES:
+        return response
+    
+    data = response.get_data()
+    compressed = ENCODINGS[encoding](data)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    RESPONSE_BYTES.inc('original', amount=len(data))
+    RESPONSE_BYTES.inc('sent', amount=len(compressed))
+    return response
+
+def init_compression(app):
+    """Install the compression hook; registered last, so it runs first and inside the request timing"""
+    if not COMPRESS_ENABLED:
+        return
+    
+    from flask import request
+    
+    @app.after_request
+    def compress(response):
+        return compress_response(response, request.accept_encodings)
@@ -0,0 +1,97 @@
+"""Database engine configuration: pooling, SQLite pragmas and read-replica routing"""
+import os
+import weakref
+from flask import current_app
+from flask.globals import app_ctx
+from sqlalchemy import event
+from sqlalchemy.orm import scoped_session, sessionmaker
+from app import db
+
+# Server databases (Postgres): per-process pool, recycled before the server or a proxy drops it
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '30000'))
+
+# WAL lets readers run alongside the single writer; busy_timeout makes writers wait for
+# the lock instead of failing with 'database is locked'
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '30000'))
+# NORMAL is crash-safe in WAL mode and skips the fsync on every commit
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', str(64 * 1024)))
+
+# Optional replica for the list, search and stats endpoints (may lag the primary slightly)
+READ_REPLICA_URL = os.getenv('READ_REPLICA_URL')
+
+# Engines of every app in this process; a WeakSet so apps that are gone (tests, factories)
+# do not keep theirs alive
+_engines = weakref.WeakSet()
+
+def dispose_engines_after_fork():
+    """gunicorn --preload forks workers after create_app ran migrations in the master:
+    children start with empty pools instead of sharing the parent's sockets"""
+    for engine in list(_engines):
+        engine.dispose(close=False)
+
+# Once per process, not per create_app
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=dispose_engines_after_fork)
+
+def engine_options(url):
+    """create_engine keyword arguments for a database URL"""
+    if url.startswith('sqlite'):
+        # SQLAlchemy's SQLite pools already fit: one connection per thread for files
+        return {}
+
+    options = {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING
+    }
+    if url.startswith('postgresql'):
+        options['connect_args'] = {'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'}
+    return options
+
+def database_binds():
+    """SQLALCHEMY_BINDS for the read replica, if one is configured"""
+    if not READ_REPLICA_URL:
+        return {}
+    return {'replica': {'url': READ_REPLICA_URL, **engine_options(READ_REPLICA_URL)}}
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Per-connection SQLite settings"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f'PRAGMA journal_mode={SQLITE_JOURNAL_MODE}')
+    cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+    cursor.execute(f'PRAGMA synchronous={SQLITE_SYNCHRONOUS}')
+    cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+    # Negative cache_size is in KiB rather than pages
+    cursor.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}')
+    cursor.close()
+
+def configure_engine(app):
+    """Hook engine events and the replica session for this app's databases"""
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', set_sqlite_pragmas)
+            _engines.add(engine)
+
+        if 'replica' in db.engines:
+            session = scoped_session(
+                sessionmaker(bind=db.engines['replica']),
+                scopefunc=lambda: id(app_ctx._get_current_object())
+            )
+            app.extensions['read_session'] = session
+            app.teardown_appcontext(lambda exc: session.remove())
+
+def read_session():
+    """Session for read-only endpoints: the replica when configured, else the primary"""
+    session = current_app.extensions.get('read_session')
+    return session() if session else db.session
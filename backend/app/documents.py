@@ -1,18 +1,61 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, send_file, current_app
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
 from app import db
-from app.models import Document
-from app.ocr import process_document
+from app.database import read_session
+from app.models import Document, DocumentText, OcrJob, UploadSession
+from app.serialization import RowSerializer
+from app.jobs import enqueue_ocr, notify_workers
+from app.ocr import get_backend_stats
+from app.ocr_cache import get_stats as get_cache_stats
+from app.search import search_documents, remove_documents
+from app.vin import unlink_documents
+from app.stats import contribution, apply_changes, remove_documents_from_rollup, get_dealer_stats
+from app.thumbnails import get_thumbnail, remove_thumbnails, DEFAULT_THUMBNAIL_WIDTH
+from app.storage import UPLOAD_FOLDER, delete_unused_file, file_exists, file_size, local_path, open_file
+from app.uploads import (
+    ALLOWED_TYPES, MAX_FILE_SIZE, UPLOAD_CHUNK_SIZE, UploadError, get_extension, save_file,
+    expire_sessions, create_session, append_chunk, finish_session, discard_session
+)
+from sqlalchemy import tuple_, case, func
+import io
 import os
+import base64
+import zipfile
+from contextlib import closing
 from datetime import datetime
 
 bp = Blueprint('documents', __name__)
 
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'uploads')
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Largest id list accepted by the bulk endpoints
+MAX_BULK_IDS = 500
+ZIP_CHUNK_SIZE = 1024 * 1024
 
-ALLOWED_TYPES = {'pdf', 'jpg', 'jpeg', 'png'}
-MAX_FILE_SIZE = 100 * 1024 * 1024
+# Body of GET /<id>/notes: response key -> column, selected and serialized without loading the row
+NOTES_COLUMNS = {
+    'id': Document.id,
+    'filename': Document.original_filename,
+    'file_type': Document.file_type,
+    'notes': func.coalesce(Document.notes, ''),
+    'vin': Document.vin,
+    'buyer_name': Document.buyer_name,
+    'seller_name': Document.seller_name,
+    'sale_date': Document.sale_date,
+    'sale_amount': Document.sale_amount,
+    'odometer_reading': Document.odometer_reading,
+    'document_type': Document.document_type,
+    'status': Document.status
+}
+NOTES_SERIALIZER = RowSerializer(NOTES_COLUMNS)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_SEARCH_OFFSET = 1000
+
+# Stored files never change in place, so clients may cache them and revalidate with the ETag
+DOWNLOAD_MAX_AGE = int(os.getenv('DOWNLOAD_MAX_AGE', '0'))
+# '' streams from this process, 'x-sendfile' (Apache/lighttpd) or 'x-accel' (nginx) hands it to the proxy
+DOWNLOAD_OFFLOAD = os.getenv('DOWNLOAD_OFFLOAD', '').lower()
+DOWNLOAD_ACCEL_PREFIX = os.getenv('DOWNLOAD_ACCEL_PREFIX', '/protected-uploads/')
 
 def verify_auth():
     """Verify JWT and return user_id"""
@@ -26,29 +69,149 @@ def handle_options():
     """Handle CORS preflight"""
     return '', 200
 
-def get_user_folder(user_id):
-    """Create user upload folder"""
-    folder = os.path.join(UPLOAD_FOLDER, f'user_{user_id}')
-    os.makedirs(folder, exist_ok=True)
-    return folder
-
 def validate_file(file):
-    """Validate file (is_valid, error, ext, size)"""
+    """Validate file name and type (is_valid, error, ext), size is enforced while streaming"""
     if not file.filename or '.' not in file.filename:
-        return False, 'Invalid filename', None, None
+        return False, 'Invalid filename', None
+    
+    ext = get_extension(file.filename)
+    if not ext:
+        return False, 'Invalid type', None
+    
+    return True, None, ext
+
+def create_documents(user_id, stored_files):
+    """Insert pending documents for (original_filename, ext, size, filepath, content_hash) tuples
+    and queue their OCR in the current transaction (caller commits)"""
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    docs = [
+        Document(
+            uploaded_by=user_id,
+            filename=f"{timestamp}_{original_filename}",
+            original_filename=original_filename,
+            file_type=ext,
+            file_size=size,
+            file_path=filepath,
+            content_hash=content_hash,
+            status='pending'
+        )
+        for original_filename, ext, size, filepath, content_hash in stored_files
+    ]
+    # One flush: SQLAlchemy sends the rows as a single multi-row INSERT ... RETURNING
+    db.session.add_all(docs)
+    db.session.flush()
+    apply_changes([(None, contribution(doc)) for doc in docs])
+    for doc in docs:
+        enqueue_ocr(doc)
+    return docs
+
+def create_document(user_id, original_filename, ext, size, filepath, content_hash):
+    """Insert a pending document and queue its OCR (caller commits)"""
+    return create_documents(user_id, [(original_filename, ext, size, filepath, content_hash)])[0]
+
+def get_owned_document(doc_id, user_id):
+    """Load a document by primary key and owner; notes and OCR text stay unloaded"""
+    return Document.query.filter_by(id=doc_id, uploaded_by=user_id).first()
+
+def get_owned_documents(doc_ids, user_id):
+    """One ownership query for a batch of ids (docs, missing_ids)"""
+    docs = Document.query.filter(Document.id.in_(doc_ids), Document.uploaded_by == user_id).all()
+    found = {doc.id for doc in docs}
+    return docs, [doc_id for doc_id in doc_ids if doc_id not in found]
+
+def parse_id_list(data):
+    """Validate a bulk request's ids (ids, error)"""
+    doc_ids = data.get('ids') if isinstance(data, dict) else None
+    if not isinstance(doc_ids, list) or not doc_ids:
+        return None, 'ids must be a non-empty list'
+    if len(doc_ids) > MAX_BULK_IDS:
+        return None, f'At most {MAX_BULK_IDS} ids per request'
+    # JSON integers only: int() would turn true into 1 and 1.7 into 1
+    if not all(type(doc_id) is int for doc_id in doc_ids):
+        return None, 'ids must be integers'
+    # Keep request order, drop duplicates
+    return list(dict.fromkeys(doc_ids)), None
+
+def delete_documents(docs):
+    """Delete documents and everything hanging off them in the current transaction (caller commits)
+
+    Returns the stored files no remaining document points at, for the caller to
+    remove once the commit has succeeded.
+    """
+    doc_ids = [doc.id for doc in docs]
+    paths = {doc.file_path for doc in docs}
     
-    ext = file.filename.rsplit('.', 1)[1].lower()
-    if ext not in ALLOWED_TYPES:
-        return False, 'Invalid type', None, None
+    OcrJob.query.filter(OcrJob.document_id.in_(doc_ids)).delete(synchronize_session=False)
+    remove_documents(doc_ids)
+    unlink_documents(doc_ids)
+    remove_documents_from_rollup(docs)
+    DocumentText.query.filter(DocumentText.document_id.in_(doc_ids)).delete(synchronize_session=False)
+    for doc in docs:
+        db.session.delete(doc)
+    db.session.flush()
     
-    file.seek(0, os.SEEK_END)
-    size = file.tell()
-    file.seek(0)
+    # Deduplicated uploads share a file; keep it while anything else references it
+    still_used = {path for (path,) in db.session.query(Document.file_path).filter(Document.file_path.in_(paths))}
+    orphaned = {}
+    for doc in docs:
+        if doc.file_path not in still_used:
+            orphaned.setdefault(doc.file_path, doc)
+    return list(orphaned.values())
+
+def remove_stored_files(docs):
+    """Remove files and cached previews of deleted documents, after commit"""
+    for doc in docs:
+        try:
+            if delete_unused_file(doc.file_path):
+                remove_thumbnails(doc)
+        except Exception as e:
+            # The rows are already gone; a leftover file is only wasted disk
+            current_app.logger.warning('Could not remove %s: %s', doc.file_path, e)
+
+class ZipStream(io.RawIOBase):
+    """Write-only sink that hands zipfile output back in chunks"""
+    def __init__(self):
+        self.chunks = []
     
-    if size > MAX_FILE_SIZE:
-        return False, 'File too large', None, None
+    def writable(self):
+        return True
     
-    return True, None, ext, size
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def zip_archive_name(name, used):
+    """Unique name inside the archive, 'a (2).pdf' for repeats"""
+    candidate, n = name, 1
+    while candidate in used:
+        n += 1
+        stem, dot, ext = name.rpartition('.')
+        candidate = f'{stem} ({n}).{ext}' if dot else f'{name} ({n})'
+    used.add(candidate)
+    return candidate
+
+def stream_zip(entries):
+    """Yield a zip archive of (file_path, archive_name, modified) entries without buffering whole files"""
+    sink = ZipStream()
+    # Unseekable output: zipfile writes data descriptors after each member
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for path, name, modified in entries:
+            info = zipfile.ZipInfo(name, date_time=modified.timetuple()[:6])
+            size = file_size(path)
+            with closing(open_file(path)) as source, archive.open(info, 'w', force_zip64=size > zipfile.ZIP64_LIMIT) as member:
+                while True:
+                    chunk = source.read(ZIP_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    member.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
 
 def check_authorization(doc, user_id):
     """Check document ownership"""
@@ -57,33 +220,49 @@ def check_authorization(doc, user_id):
     return True, None, 200
 
 def check_file_exists(file_path):
-    """Check if file exists"""
-    if not os.path.exists(file_path):
+    """Check if the stored file exists"""
+    if not file_exists(file_path):
         return False, 'File not found', 404
     return True, None, 200
 
-def process_ocr(doc, filepath):
-    """Process document with OCR"""
-    try:
-        ocr_result = process_document(filepath)
-        
-        if ocr_result['success']:
-            doc.status = 'completed'
-            doc.extracted_text = ocr_result['extracted_text']
-            doc.vin = ocr_result['extracted_data'].get('vin')
-            doc.buyer_name = ocr_result['extracted_data'].get('buyer_name')
-            doc.seller_name = ocr_result['extracted_data'].get('seller_name')
-            doc.sale_date = ocr_result['extracted_data'].get('sale_date')
-            doc.sale_amount = ocr_result['extracted_data'].get('sale_amount')
-            doc.odometer_reading = ocr_result['extracted_data'].get('odometer_reading')
-            doc.document_type = ocr_result['extracted_data'].get('document_type')
-        else:
-            doc.status = 'failed'
-        
-        db.session.commit()
-    except Exception as e:
-        doc.status = 'failed'
-        db.session.commit()
+def offload_response(response, file_path):
+    """Swap the body for an X-Sendfile / X-Accel-Redirect header, the proxy serves bytes and ranges"""
+    response.close()
+    response.set_data(b'')
+    response.headers.pop('Content-Length', None)
+    if DOWNLOAD_OFFLOAD == 'x-accel':
+        relative = os.path.relpath(file_path, UPLOAD_FOLDER).replace(os.sep, '/')
+        response.headers['X-Accel-Redirect'] = DOWNLOAD_ACCEL_PREFIX.rstrip('/') + '/' + relative
+    else:
+        response.headers['X-Sendfile'] = os.path.abspath(file_path)
+    return response
+
+def send_stored_file(file_path, etag, last_modified, offload=True, **kwargs):
+    """send_file with ETag/Last-Modified validation, Range support and optional proxy offload
+
+    file_path may also be a stream (objects in remote storage), which is never offloaded.
+    """
+    offload = offload and isinstance(file_path, str) and DOWNLOAD_OFFLOAD in ('x-sendfile', 'x-accel')
+    response = send_file(
+        file_path,
+        conditional=not offload,
+        etag=etag or True,
+        last_modified=last_modified,
+        max_age=DOWNLOAD_MAX_AGE,
+        **kwargs
+    )
+    # Documents are per-dealer: never let shared caches keep them
+    response.cache_control.public = False
+    response.cache_control.private = True
+    if DOWNLOAD_MAX_AGE <= 0:
+        response.cache_control.no_cache = True
+    
+    if offload:
+        # Answer 304s here; range requests are left to the proxy serving the file
+        response = response.make_conditional(request, accept_ranges=False)
+        if response.status_code == 200:
+            response = offload_response(response, file_path)
+    return response
 
 @bp.route('/upload', methods=['POST', 'OPTIONS'])
 def upload():
@@ -101,45 +280,44 @@ def upload():
         if not files:
             return jsonify({'error': 'No files'}), 400
         
-        user_folder = get_user_folder(user_id)
-        uploaded = []
+        stored = []
         errors = []
         
+        # Write every file first, then insert all rows in one transaction
         for file in files:
-            is_valid, error, ext, size = validate_file(file)
+            is_valid, error, ext = validate_file(file)
             if not is_valid:
                 errors.append(error)
                 continue
             
             try:
-                timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                filename = f"{timestamp}_{file.filename}"
-                filepath = os.path.join(user_folder, filename)
-                file.save(filepath)
+                filepath, content_hash, size = save_file(file, ext)
+                stored.append((file.filename, ext, size, filepath, content_hash))
                 
-                doc = Document(
-                    uploaded_by=user_id,
-                    filename=filename,
-                    original_filename=file.filename,
-                    file_type=ext,
-                    file_size=size,
-                    file_path=filepath,
-                    status='pending'
-                )
-                db.session.add(doc)
+            except UploadError as e:
+                errors.append(e.message)
+            except Exception as e:
+                errors.append(str(e))
+        
+        uploaded = []
+        if stored:
+            try:
+                docs = create_documents(user_id, stored)
                 db.session.commit()
-                
-                process_ocr(doc, filepath)
-                
-                uploaded.append({
-                    'filename': file.filename,
-                    'size': size,
-                    'id': doc.id
-                })
+                uploaded = [{
+                    'filename': doc.original_filename,
+                    'size': doc.file_size,
+                    'id': doc.id,
+                    'status': doc.status
+                } for doc in docs]
                 
             except Exception as e:
+                db.session.rollback()
                 errors.append(str(e))
         
+        if uploaded:
+            notify_workers()
+        
         status_code = 200 if uploaded else 400
         return jsonify({
             'success': bool(uploaded),
@@ -151,10 +329,319 @@ def upload():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def encode_cursor(uploaded_at, doc_id):
+    """Opaque keyset cursor for the last row of a page"""
+    raw = f'{uploaded_at.isoformat()}|{doc_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    """Cursor back to (uploaded_at, id), raises ValueError if malformed"""
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    uploaded_at, doc_id = raw.split('|')
+    return datetime.fromisoformat(uploaded_at), int(doc_id)
+
+def parse_list_args(args):
+    """Validate list query parameters (params, error)"""
+    try:
+        fields = args.get('fields')
+        if fields:
+            fields = [f.strip() for f in fields.split(',') if f.strip()]
+            unknown = set(fields) - set(Document.LIST_FIELDS)
+            if unknown:
+                return None, f"Unknown fields: {', '.join(sorted(unknown))}"
+            # id and uploaded_at are always selected, the cursor is built from them
+            fields = ['id', 'uploaded_at'] + [f for f in fields if f not in ('id', 'uploaded_at')]
+        else:
+            fields = list(Document.SUMMARY_FIELDS)
+        
+        limit = min(max(args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+        cursor = decode_cursor(args['cursor']) if args.get('cursor') else None
+        uploaded_from = datetime.fromisoformat(args['from']) if args.get('from') else None
+        uploaded_to = datetime.fromisoformat(args['to']) if args.get('to') else None
+    except ValueError:
+        return None, 'Invalid cursor or date'
+    
+    return {
+        'fields': fields,
+        'limit': limit,
+        'cursor': cursor,
+        'status': args.get('status'),
+        'document_type': args.get('document_type'),
+        'vin': args.get('vin'),
+        'uploaded_from': uploaded_from,
+        'uploaded_to': uploaded_to
+    }, None
+
+def query_documents_page(user_id, params):
+    """One keyset page of documents, newest first (rows, next_cursor)"""
+    columns = [getattr(Document, f) for f in params['fields']]
+    query = read_session().query(*columns).filter(Document.uploaded_by == user_id)
+    
+    for name in ('status', 'document_type', 'vin'):
+        if params[name]:
+            query = query.filter(getattr(Document, name) == params[name])
+    if params['uploaded_from']:
+        query = query.filter(Document.uploaded_at >= params['uploaded_from'])
+    if params['uploaded_to']:
+        query = query.filter(Document.uploaded_at < params['uploaded_to'])
+    if params['cursor']:
+        query = query.filter(tuple_(Document.uploaded_at, Document.id) < tuple_(*params['cursor']))
+    
+    limit = params['limit']
+    rows = query.order_by(Document.uploaded_at.desc(), Document.id.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].uploaded_at, rows[-1].id)
+    return rows, next_cursor
+
+def get_upload_session(upload_id, user_id):
+    """Load a chunked upload owned by user_id, or None"""
+    session = db.session.get(UploadSession, upload_id)
+    if not session or session.user_id != user_id:
+        return None
+    return session
+
+@bp.route('/upload/sessions', methods=['POST', 'OPTIONS'])
+def start_chunked_upload():
+    """Start a resumable chunked upload"""
+    if request.method == 'OPTIONS':
+        return handle_options()
+    
+    user_id, auth_error = verify_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        
+        expire_sessions()
+        session = create_session(user_id, data.get('filename'), data.get('size'))
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'upload_id': session.id,
+            'offset': 0,
+            'chunk_size': UPLOAD_CHUNK_SIZE
+        }), 201
+        
+    except UploadError as e:
+        db.session.rollback()
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/upload/sessions/<upload_id>', methods=['GET', 'PUT', 'DELETE', 'OPTIONS'])
+def chunked_upload(upload_id):
+    """Get offset, append a chunk (Upload-Offset header) or cancel a chunked upload"""
+    if request.method == 'OPTIONS':
+        return handle_options()
+    
+    user_id, auth_error = verify_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        session = get_upload_session(upload_id, user_id)
+        if not session:
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        if request.method == 'GET':
+            return jsonify({
+                'success': True,
+                'upload_id': session.id,
+                'offset': session.received_bytes,
+                'size': session.total_size
+            }), 200
+        
+        if request.method == 'DELETE':
+            discard_session(session)
+            db.session.commit()
+            return jsonify({'success': True, 'message': 'Upload cancelled'}), 200
+        
+        if request.content_length and request.content_length > UPLOAD_CHUNK_SIZE:
+            return jsonify({'error': 'Chunk too large'}), 413
+        
+        offset = request.headers.get('Upload-Offset', type=int)
+        if offset is None:
+            return jsonify({'error': 'Upload-Offset header required'}), 400
+        
+        complete = append_chunk(session, request.stream, offset)
+        if not complete:
+            db.session.commit()
+            return jsonify({'success': True, 'offset': session.received_bytes, 'complete': False}), 200
+        
+        filename, ext, size = session.original_filename, session.file_type, session.total_size
+        filepath, content_hash = finish_session(session)
+        doc = create_document(user_id, filename, ext, size, filepath, content_hash)
+        db.session.commit()
+        notify_workers()
+        
+        return jsonify({
+            'success': True,
+            'offset': size,
+            'complete': True,
+            'id': doc.id,
+            'status': doc.status
+        }), 201
+        
+    except UploadError as e:
+        db.session.rollback()
+        return jsonify({'error': e.message, 'offset': session.received_bytes}), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/', methods=['GET', 'OPTIONS'])
 @bp.route('', methods=['GET', 'OPTIONS'])
 def list_documents():
-    """Get all documents"""
+    """List documents, one keyset page at a time"""
+    if request.method == 'OPTIONS':
+        return handle_options()
+    
+    user_id, auth_error = verify_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        params, error = parse_list_args(request.args)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        rows, next_cursor = query_documents_page(user_id, params)
+        return jsonify({
+            'success': True,
+            'documents': Document.serializer(tuple(params['fields'])).many(rows),
+            'next_cursor': next_cursor
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/stats', methods=['GET', 'OPTIONS'])
+def stats():
+    """Dashboard statistics from the daily rollup"""
+    if request.method == 'OPTIONS':
+        return handle_options()
+    
+    user_id, auth_error = verify_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        since = request.args.get('from')
+        since = datetime.fromisoformat(since).date() if since else None
+    except ValueError:
+        return jsonify({'error': 'Invalid date'}), 400
+    
+    try:
+        return jsonify({'success': True, 'stats': get_dealer_stats(user_id, since)}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/search', methods=['GET', 'OPTIONS'])
+def search():
+    """Full-text search over extracted text"""
+    if request.method == 'OPTIONS':
+        return handle_options()
+    
+    user_id, auth_error = verify_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Query required'}), 400
+        
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        offset = min(max(request.args.get('offset', 0, type=int), 0), MAX_SEARCH_OFFSET)
+        
+        results, next_offset = search_documents(user_id, query, limit, offset)
+        return jsonify({
+            'success': True,
+            'results': results,
+            'next_offset': next_offset
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/cache/stats', methods=['GET', 'OPTIONS'])
+def cache_stats():
+    """Get OCR cache hit/miss counters"""
+    if request.method == 'OPTIONS':
+        return handle_options()
+    
+    user_id, auth_error = verify_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        return jsonify({'success': True, 'cache': get_cache_stats()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/ocr/stats', methods=['GET', 'OPTIONS'])
+def ocr_stats():
+    """Get per-backend OCR latency, cost and Vision calls avoided"""
+    if request.method == 'OPTIONS':
+        return handle_options()
+    
+    user_id, auth_error = verify_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        return jsonify({'success': True, 'ocr': get_backend_stats()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/<int:doc_id>/status', methods=['GET', 'OPTIONS'])
+def document_status(doc_id):
+    """Get OCR processing status"""
+    if request.method == 'OPTIONS':
+        return handle_options()
+    
+    user_id, auth_error = verify_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        doc = get_owned_document(doc_id, user_id)
+        
+        authorized, error, code = check_authorization(doc, user_id)
+        if not authorized:
+            return jsonify({'error': error}), code
+        
+        job = OcrJob.query.filter_by(document_id=doc.id).order_by(OcrJob.id.desc()).first()
+        
+        return jsonify({
+            'success': True,
+            'id': doc.id,
+            'status': doc.status,
+            'attempts': job.attempts if job else 0,
+            'error': job.last_error if job else None,
+            # The list row as the default projection has it, so clients polling a pending
+            # document can update it in place instead of reloading the list
+            'document': Document.row_to_dict([getattr(doc, f) for f in Document.SUMMARY_FIELDS], Document.SUMMARY_FIELDS)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/<int:doc_id>/text', methods=['GET', 'OPTIONS'])
+def document_text(doc_id):
+    """Get full extracted OCR text"""
     if request.method == 'OPTIONS':
         return handle_options()
     
@@ -163,10 +650,17 @@ def list_documents():
         return auth_error
     
     try:
-        docs = Document.query.filter_by(uploaded_by=user_id).all()
+        row = db.session.query(Document.id, DocumentText.extracted_text).outerjoin(
+            DocumentText, DocumentText.document_id == Document.id
+        ).filter(Document.id == doc_id, Document.uploaded_by == user_id).first()
+        
+        if not row:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
         return jsonify({
             'success': True,
-            'documents': [doc.to_dict() for doc in docs]
+            'id': row.id,
+            'extracted_text': row.extracted_text
         }), 200
         
     except Exception as e:
@@ -183,7 +677,7 @@ def download(doc_id):
         return auth_error
     
     try:
-        doc = Document.query.get(doc_id)
+        doc = get_owned_document(doc_id, user_id)
         
         authorized, error, code = check_authorization(doc, user_id)
         if not authorized:
@@ -193,8 +687,11 @@ def download(doc_id):
         if not exists:
             return jsonify({'error': error}), code
         
-        return send_file(
-            doc.file_path,
+        # Local files go through send_file (ranges, proxy offload); remote objects are streamed
+        return send_stored_file(
+            local_path(doc.file_path) or open_file(doc.file_path),
+            doc.content_hash,
+            doc.uploaded_at,
             as_attachment=True,
             download_name=doc.original_filename
         )
@@ -202,6 +699,39 @@ def download(doc_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/<int:doc_id>/pages/<int:page>/thumbnail', methods=['GET', 'OPTIONS'])
+def page_thumbnail(doc_id, page):
+    """JPEG preview of one page, rendered once and served from the disk cache"""
+    if request.method == 'OPTIONS':
+        return handle_options()
+    
+    user_id, auth_error = verify_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        doc = get_owned_document(doc_id, user_id)
+        
+        authorized, error, code = check_authorization(doc, user_id)
+        if not authorized:
+            return jsonify({'error': error}), code
+        
+        exists, error, code = check_file_exists(doc.file_path)
+        if not exists:
+            return jsonify({'error': error}), code
+        
+        width = request.args.get('width', DEFAULT_THUMBNAIL_WIDTH, type=int)
+        path, error, code = get_thumbnail(doc, page, width)
+        if error:
+            return jsonify({'error': error}), code
+        
+        etag = f'{doc.content_hash}-p{page}-w{width}' if doc.content_hash else None
+        # Previews are small and live outside UPLOAD_FOLDER, always served from here
+        return send_stored_file(path, etag, doc.uploaded_at, offload=False, mimetype='image/jpeg')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/<int:doc_id>', methods=['DELETE', 'OPTIONS'])
 def delete(doc_id):
     """Delete document"""
@@ -213,17 +743,15 @@ def delete(doc_id):
         return auth_error
     
     try:
-        doc = Document.query.get(doc_id)
+        doc = get_owned_document(doc_id, user_id)
         
         authorized, error, code = check_authorization(doc, user_id)
         if not authorized:
             return jsonify({'error': error}), code
         
-        if os.path.exists(doc.file_path):
-            os.remove(doc.file_path)
-        
-        db.session.delete(doc)
+        orphaned = delete_documents([doc])
         db.session.commit()
+        remove_stored_files(orphaned)
         
         return jsonify({
             'success': True,
@@ -234,6 +762,118 @@ def delete(doc_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/bulk/delete', methods=['POST', 'OPTIONS'])
+def bulk_delete():
+    """Delete many documents in one transaction"""
+    if request.method == 'OPTIONS':
+        return handle_options()
+    
+    user_id, auth_error = verify_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        doc_ids, error = parse_id_list(request.get_json(silent=True))
+        if error:
+            return jsonify({'error': error}), 400
+        
+        docs, missing = get_owned_documents(doc_ids, user_id)
+        orphaned = delete_documents(docs) if docs else []
+        db.session.commit()
+        remove_stored_files(orphaned)
+        
+        return jsonify({
+            'success': True,
+            'deleted': [doc_id for doc_id in doc_ids if doc_id not in missing],
+            'not_found': missing
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/bulk/notes', methods=['POST', 'OPTIONS'])
+def bulk_notes():
+    """Replace or append notes on many documents with one UPDATE"""
+    if request.method == 'OPTIONS':
+        return handle_options()
+    
+    user_id, auth_error = verify_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        doc_ids, error = parse_id_list(data)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        notes = data.get('notes', '')
+        mode = data.get('mode', 'replace')
+        if not isinstance(notes, str) or mode not in ('replace', 'append'):
+            return jsonify({'error': "notes must be a string and mode 'replace' or 'append'"}), 400
+        
+        owned = [doc_id for (doc_id,) in db.session.query(Document.id).filter(
+            Document.id.in_(doc_ids), Document.uploaded_by == user_id
+        )]
+        if mode == 'append':
+            value = case(
+                (func.coalesce(Document.notes, '') == '', notes),
+                else_=Document.notes + '\n' + notes
+            )
+        else:
+            value = notes
+        if owned:
+            Document.query.filter(Document.id.in_(owned)).update({'notes': value}, synchronize_session=False)
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'updated': owned,
+            'not_found': [doc_id for doc_id in doc_ids if doc_id not in set(owned)]
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/bulk/download', methods=['POST', 'OPTIONS'])
+def bulk_download():
+    """Stream many documents as one zip archive, built while it is sent"""
+    if request.method == 'OPTIONS':
+        return handle_options()
+    
+    user_id, auth_error = verify_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        doc_ids, error = parse_id_list(request.get_json(silent=True))
+        if error:
+            return jsonify({'error': error}), 400
+        
+        docs, missing = get_owned_documents(doc_ids, user_id)
+        if missing:
+            return jsonify({'error': 'Unauthorized', 'not_found': missing}), 403
+        
+        # Resolve everything now; the generator runs after the request context is gone
+        used_names = set()
+        by_id = {doc.id: doc for doc in docs}
+        entries = []
+        for doc_id in doc_ids:
+            doc = by_id[doc_id]
+            if file_exists(doc.file_path):
+                entries.append((doc.file_path, zip_archive_name(doc.original_filename, used_names), doc.uploaded_at))
+        if not entries:
+            return jsonify({'error': 'File not found'}), 404
+        
+        response = Response(stream_zip(entries), mimetype='application/zip', direct_passthrough=True)
+        response.headers['Content-Disposition'] = 'attachment; filename=documents.zip'
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/<int:doc_id>/notes', methods=['GET', 'POST', 'OPTIONS'])
 def manage_notes(doc_id):
     """Get or update document notes"""
@@ -245,28 +885,19 @@ def manage_notes(doc_id):
         return auth_error
     
     try:
-        doc = Document.query.get(doc_id)
+        if request.method == 'GET':
+            row = db.session.query(*NOTES_COLUMNS.values()).filter(
+                Document.id == doc_id,
+                Document.uploaded_by == user_id
+            ).first()
+            if not row:
+                return jsonify({'error': 'Unauthorized'}), 403
+            return jsonify({'success': True, **NOTES_SERIALIZER.one(row)}), 200
         
-        if not doc or doc.uploaded_by != user_id:
+        doc = get_owned_document(doc_id, user_id)
+        if not doc:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        if request.method == 'GET':
-            return jsonify({
-                'success': True,
-                'id': doc.id,
-                'filename': doc.original_filename,
-                'file_type': doc.file_type,
-                'notes': doc.notes or '',
-                'vin': doc.vin,
-                'buyer_name': doc.buyer_name,
-                'seller_name': doc.seller_name,
-                'sale_date': doc.sale_date,
-                'sale_amount': doc.sale_amount,
-                'odometer_reading': doc.odometer_reading,
-                'document_type': doc.document_type,
-                'status': doc.status
-            }), 200
-        
         data = request.get_json()
         doc.notes = data.get('notes', '')
         db.session.commit()
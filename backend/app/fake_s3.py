@@ -0,0 +1,69 @@
+"""Local stand-in for a boto3 S3 client (development, tests and benchmarks)
+
+Implements the calls S3Storage makes, storing objects as files under STORAGE_FAKE_S3_ROOT/<bucket>/.
+Missing objects raise ClientError with the same error codes botocore uses.
+"""
+import os
+import shutil
+import tempfile
+import hashlib
+
+FAKE_S3_ROOT = os.getenv('STORAGE_FAKE_S3_ROOT', os.path.join(tempfile.gettempdir(), 'fake-s3'))
+
+class ClientError(Exception):
+    """Mirror of botocore.exceptions.ClientError"""
+    def __init__(self, code, operation):
+        super().__init__(f'An error occurred ({code}) when calling the {operation} operation')
+        self.response = {'Error': {'Code': code}}
+
+class S3Client:
+    """Objects as plain files; writes go through a temp file and rename, like S3's atomic PUT"""
+    def __init__(self, root=None):
+        self.root = root or FAKE_S3_ROOT
+    
+    def _path(self, bucket, key):
+        return os.path.join(self.root, bucket, *key.split('/'))
+    
+    def _existing(self, bucket, key, operation, code='NoSuchKey'):
+        path = self._path(bucket, key)
+        if not os.path.isfile(path):
+            raise ClientError(code, operation)
+        return path
+    
+    def _write(self, bucket, key, source):
+        path = self._path(bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as out:
+            shutil.copyfileobj(source, out)
+        os.replace(temp_path, path)
+    
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None, Callback=None, Config=None):
+        with open(Filename, 'rb') as source:
+            self._write(Bucket, Key, source)
+    
+    def put_object(self, Bucket, Key, Body=b'', **kwargs):
+        import io
+        self._write(Bucket, Key, io.BytesIO(Body) if isinstance(Body, bytes) else Body)
+        return {}
+    
+    def download_file(self, Bucket, Key, Filename, ExtraArgs=None, Callback=None, Config=None):
+        # boto3 reports a missing object on download as a 404 from its HEAD request
+        shutil.copyfile(self._existing(Bucket, Key, 'HeadObject', '404'), Filename)
+    
+    def head_object(self, Bucket, Key, **kwargs):
+        path = self._existing(Bucket, Key, 'HeadObject', '404')
+        size = os.path.getsize(path)
+        return {'ContentLength': size, 'ETag': '"%s"' % hashlib.md5(path.encode()).hexdigest()}
+    
+    def get_object(self, Bucket, Key, **kwargs):
+        path = self._existing(Bucket, Key, 'GetObject')
+        return {'Body': open(path, 'rb'), 'ContentLength': os.path.getsize(path)}
+    
+    def delete_object(self, Bucket, Key, **kwargs):
+        # S3 deletes are idempotent
+        try:
+            os.remove(self._path(Bucket, Key))
+        except FileNotFoundError:
+            pass
+        return {}
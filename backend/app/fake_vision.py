@@ -0,0 +1,97 @@
+"""Local stand-in for the Google Vision client (development, tests and benchmarks)"""
+import os
+import time
+import random
+import asyncio
+from types import SimpleNamespace
+
+FAKE_LATENCY = float(os.getenv('OCR_FAKE_LATENCY', '0'))
+# Extra uniform 0..jitter seconds per call, for a tail closer to the real service
+FAKE_JITTER = float(os.getenv('OCR_FAKE_JITTER', '0'))
+
+FAKE_TEXT = """DEALER PACKET
+Buyer Order
+Sold To: John Smith
+Email: john.smith@example.com
+We Own: Sunrise Motors
+Dealer License 12345
+Purchase Date: 03/15/2024
+VIN: 1HGCM82633A004352
+Odometer Reading: 45,000 miles
+Total Price: $12,500.00
+"""
+
+class ServiceUnavailable(ConnectionError):
+    """Transient error raised by fake clients configured with fail_every"""
+
+class Image:
+    """Mirror of vision.Image"""
+    def __init__(self, content=None):
+        self.content = content
+
+class Feature:
+    """Mirror of vision.Feature"""
+    class Type:
+        DOCUMENT_TEXT_DETECTION = 11
+    
+    def __init__(self, type_=None):
+        self.type_ = type_
+
+class AnnotateImageRequest:
+    """Mirror of vision.AnnotateImageRequest"""
+    def __init__(self, image=None, features=None):
+        self.image = image
+        self.features = features or []
+
+def _response(text):
+    return SimpleNamespace(
+        error=SimpleNamespace(message=''),
+        full_text_annotation=SimpleNamespace(text=text)
+    )
+
+class ImageAnnotatorClient:
+    """Returns canned OCR text after an optional simulated network latency"""
+    def __init__(self, latency=None, text=None, fail_every=0, jitter=None):
+        self.latency = FAKE_LATENCY if latency is None else latency
+        self.jitter = FAKE_JITTER if jitter is None else jitter
+        self.text = FAKE_TEXT if text is None else text
+        self.fail_every = fail_every
+        self.calls = 0
+
+    def _count_call(self):
+        self.calls += 1
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise ServiceUnavailable('fake Vision: 503 Service Unavailable')
+    
+    def _delay(self):
+        return self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+    
+    def _round_trip(self):
+        self._count_call()
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+    
+    def document_text_detection(self, image):
+        self._round_trip()
+        return _response(self.text)
+    
+    def batch_annotate_images(self, requests):
+        self._round_trip()
+        return SimpleNamespace(responses=[_response(self.text) for _ in requests])
+
+class ImageAnnotatorAsyncClient(ImageAnnotatorClient):
+    """Async mirror: latency is awaited, so many calls overlap on one event loop"""
+    async def _round_trip_async(self):
+        self._count_call()
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+    
+    async def document_text_detection(self, image):
+        await self._round_trip_async()
+        return _response(self.text)
+    
+    async def batch_annotate_images(self, requests):
+        await self._round_trip_async()
+        return SimpleNamespace(responses=[_response(self.text) for _ in requests])
@@ -0,0 +1,363 @@
+"""Background OCR job queue backed by the ocr_job table"""
+import os
+import time
+import threading
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models import Document, OcrJob
+from app.ocr import typed_fields
+from app.ocr_cache import lookup_or_process, record_results, evict
+from app.search import index_document
+from app.vin import link_vehicle
+from app.stats import contribution, apply_changes
+from app.metrics import OCR_JOBS, OCR_JOBS_IN_FLIGHT, OCR_WORKER_ERRORS
+
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', '4'))
+# thread: OCR_WORKERS threads in each web process. process: OCR_WORKERS child processes per web
+# process, so gunicorn -w N (WEB_CONCURRENCY) runs N x OCR_WORKERS of them, each with its own
+# render pool and Vision client. external: none, run worker.py separately; the one to pick
+# for multi-worker gunicorn, since OCR capacity then no longer scales with the web workers.
+OCR_WORKER_MODE = os.getenv('OCR_WORKER_MODE', 'thread')
+OCR_MAX_ATTEMPTS = int(os.getenv('OCR_MAX_ATTEMPTS', '3'))
+OCR_RETRY_BACKOFF = float(os.getenv('OCR_RETRY_BACKOFF', '5'))
+OCR_POLL_INTERVAL = float(os.getenv('OCR_POLL_INTERVAL', '1'))
+OCR_JOB_TIMEOUT = int(os.getenv('OCR_JOB_TIMEOUT', '600'))
+# Seconds between each worker's sweeps for jobs stuck running past OCR_JOB_TIMEOUT
+OCR_REQUEUE_INTERVAL = float(os.getenv('OCR_REQUEUE_INTERVAL', '60'))
+# Jobs a worker claims, and later completes, per transaction. The batch is OCR'd concurrently,
+# so OCR_WORKERS * OCR_CLAIM_BATCH documents are in flight, enough to fill VISION_CONCURRENCY
+OCR_CLAIM_BATCH = int(os.getenv('OCR_CLAIM_BATCH', '8'))
+
+_wakeup = threading.Event()
+_pool_lock = threading.Lock()
+
+# What a worker needs of a claimed job, read inside the claim transaction: the rows may be
+# deleted (documents.delete_documents) while their OCR runs
+ClaimedJob = namedtuple('ClaimedJob', ['job_id', 'document_id', 'file_path', 'content_hash'])
+
+def enqueue_ocr(doc):
+    """Queue OCR for a flushed document (caller commits)"""
+    job = OcrJob(document_id=doc.id)
+    db.session.add(job)
+    return job
+
+def notify_workers():
+    """Wake in-process workers instead of waiting for the next poll"""
+    _wakeup.set()
+
+def requeue_stale_jobs():
+    """Return jobs left 'running' by a crashed worker to the queue"""
+    cutoff = datetime.utcnow() - timedelta(seconds=OCR_JOB_TIMEOUT)
+    OcrJob.query.filter(
+        OcrJob.status == 'running',
+        OcrJob.updated_at < cutoff
+    ).update({'status': 'queued'}, synchronize_session=False)
+    db.session.commit()
+
+def claim_rows(job_ids, now):
+    """Conditional UPDATE of queued jobs to running, returns the ids this caller won"""
+    values = {'status': 'running', 'attempts': OcrJob.attempts + 1, 'updated_at': now}
+    if db.session.get_bind().dialect.update_returning:
+        stmt = db.update(OcrJob).where(
+            OcrJob.id.in_(job_ids),
+            OcrJob.status == 'queued'
+        ).values(**values).returning(OcrJob.id)
+        return [job_id for (job_id,) in db.session.execute(stmt, execution_options={'synchronize_session': False})]
+    
+    claimed = []
+    for job_id in job_ids:
+        if OcrJob.query.filter_by(id=job_id, status='queued').update(values, synchronize_session=False):
+            claimed.append(job_id)
+    return claimed
+
+def claim_jobs(limit=OCR_CLAIM_BATCH):
+    """Atomically claim due jobs and mark their documents processing in one transaction [ClaimedJob]"""
+    now = datetime.utcnow()
+    candidates = [job_id for (job_id,) in db.session.query(OcrJob.id).filter(
+        OcrJob.status == 'queued',
+        OcrJob.run_after <= now
+    ).order_by(OcrJob.run_after, OcrJob.id).limit(OCR_WORKERS * limit)]
+    if not candidates:
+        return []
+    
+    # A short queue is spread over the workers rather than claimed by the first one awake
+    share = min(limit, -(-len(candidates) // OCR_WORKERS))
+    claimed = []
+    for start in range(0, len(candidates), share):
+        # Conditional UPDATE so two workers can never claim the same row
+        claimed = claim_rows(candidates[start:start + share], now)
+        if claimed:
+            break
+    if not claimed:
+        db.session.commit()
+        return []
+    
+    jobs = OcrJob.query.filter(OcrJob.id.in_(claimed)).order_by(OcrJob.id).all()
+    docs = {doc.id: doc for doc in Document.query.filter(Document.id.in_([job.document_id for job in jobs]))}
+    
+    claims, changes = [], []
+    for job in jobs:
+        doc = docs.get(job.document_id)
+        if not doc:
+            job.status = 'failed'
+            job.last_error = 'Document not found'
+            continue
+        before = contribution(doc)
+        doc.status = 'processing'
+        changes.append((before, contribution(doc)))
+        claims.append(ClaimedJob(job.id, doc.id, doc.file_path, doc.content_hash))
+    apply_changes(changes)
+    db.session.commit()
+    return claims
+
+def apply_ocr_result(doc, ocr_result):
+    """Copy an OCR result onto its document, returns error message or None (caller commits)"""
+    if not ocr_result['success']:
+        return ocr_result['error'] or 'OCR failed'
+    
+    doc.status = 'completed'
+    doc.extracted_text = ocr_result['extracted_text']
+    doc.vin = ocr_result['extracted_data'].get('vin')
+    doc.buyer_name = ocr_result['extracted_data'].get('buyer_name')
+    doc.seller_name = ocr_result['extracted_data'].get('seller_name')
+    doc.sale_date = ocr_result['extracted_data'].get('sale_date')
+    doc.sale_amount = ocr_result['extracted_data'].get('sale_amount')
+    doc.odometer_reading = ocr_result['extracted_data'].get('odometer_reading')
+    doc.document_type = ocr_result['extracted_data'].get('document_type')
+    doc.parser_version = ocr_result.get('parser_version')
+    for name, value in typed_fields(ocr_result['extracted_data']).items():
+        setattr(doc, name, value)
+    index_document(doc)
+    link_vehicle(doc)
+    return None
+
+def load_claimed(claims):
+    """Current job and document rows of claims ({job_id: job}, {doc_id: doc}), deleted ones absent"""
+    jobs = OcrJob.query.filter(OcrJob.id.in_([claim.job_id for claim in claims])).all()
+    docs = Document.query.filter(Document.id.in_([claim.document_id for claim in claims])).all()
+    return {job.id: job for job in jobs}, {doc.id: doc for doc in docs}
+
+def finish_jobs(claims, results):
+    """Record every success, retry or failure of a batch, returns outcomes for metrics (caller commits)"""
+    stored = record_results([r for r in results if 'content_hash' in r])
+    jobs, docs = load_claimed(claims)
+    
+    now = datetime.utcnow()
+    changes, outcomes = [], []
+    for claim, ocr_result in zip(claims, results):
+        job, doc = jobs.get(claim.job_id), docs.get(claim.document_id)
+        if not job or not doc:
+            # Deleted while its OCR ran; the cached result above is all there is to keep
+            if job:
+                job.status = 'failed'
+                job.last_error = 'Document not found'
+                job.updated_at = now
+            outcomes.append('deleted')
+            continue
+        
+        before = contribution(doc)
+        error = apply_ocr_result(doc, ocr_result)
+        job.updated_at = now
+        job.last_error = error
+        
+        if error is None:
+            job.status = 'done'
+            doc.processed_at = now
+            outcomes.append('done')
+            preprocess = ocr_result.get('preprocess')
+            if preprocess and preprocess['images']:
+                current_app.logger.info(
+                    'Document %s: %d OCR images, %d bytes sent, %d saved, %.0f ms rendering/preprocessing',
+                    doc.id, preprocess['images'], preprocess['bytes_sent'], preprocess['bytes_saved'],
+                    preprocess['seconds'] * 1000
+                )
+        elif job.attempts < OCR_MAX_ATTEMPTS:
+            # Exponential backoff: 5s, 10s, 20s, ... with the default settings
+            job.status = 'queued'
+            job.run_after = now + timedelta(seconds=OCR_RETRY_BACKOFF * 2 ** (job.attempts - 1))
+            doc.status = 'pending'
+            outcomes.append('retry')
+        else:
+            job.status = 'failed'
+            doc.status = 'failed'
+            doc.processed_at = now
+            outcomes.append('failed')
+        changes.append((before, contribution(doc)))
+    
+    apply_changes(changes)
+    if stored:
+        evict()
+    return outcomes
+
+def fail_job(claim, error):
+    """Mark a job whose result could not be saved failed, without retrying (commits)"""
+    job, doc = db.session.get(OcrJob, claim.job_id), db.session.get(Document, claim.document_id)
+    now = datetime.utcnow()
+    if job:
+        job.status = 'failed'
+        job.last_error = f'Could not save OCR result: {error}'
+        job.updated_at = now
+    if doc:
+        before = contribution(doc)
+        doc.status = 'failed'
+        doc.processed_at = now
+        apply_changes([(before, contribution(doc))])
+    db.session.commit()
+    return ['failed' if job and doc else 'deleted']
+
+def finish_jobs_singly(claims, results):
+    """Record a batch one job per transaction, so one unsavable result cannot block the rest"""
+    outcomes = []
+    for claim, ocr_result in zip(claims, results):
+        try:
+            outcomes += finish_jobs([claim], [ocr_result])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.exception('Could not save OCR result for job %s: %s', claim.job_id, e)
+            outcomes += fail_job(claim, getattr(e, 'orig', None) or e)
+    return outcomes
+
+def ocr_documents(claims):
+    """Cached or fresh OCR results for claimed jobs, all looked up concurrently, in order"""
+    app = current_app._get_current_object()
+    
+    def ocr_one(file_path, content_hash):
+        # Own app context, and so own session, per thread
+        with app.app_context():
+            try:
+                return lookup_or_process(file_path, content_hash)
+            except Exception as e:
+                return {'success': False, 'error': str(e)}
+    
+    files = [(claim.file_path, claim.content_hash) for claim in claims]
+    if len(files) == 1:
+        return [ocr_one(*files[0])]
+    # One blocked thread per document keeps the shared async Vision client busy; a worker
+    # OCR'ing its batch serially never had more than one call in flight
+    with ThreadPoolExecutor(max_workers=len(files), thread_name_prefix='ocr-document') as executor:
+        return list(executor.map(lambda args: ocr_one(*args), files))
+
+def run_jobs(claims):
+    """OCR a claimed batch, then record every success, retry or failure in one transaction"""
+    # OCR first with no writes, so SQLite's write lock is never held across Vision calls
+    with OCR_JOBS_IN_FLIGHT.track(amount=len(claims)):
+        results = ocr_documents(claims)
+    
+    try:
+        outcomes = finish_jobs(claims, results)
+        db.session.commit()
+    except Exception as e:
+        # The claim already committed these jobs as running: a lost batch would never be retried
+        db.session.rollback()
+        current_app.logger.warning('Saving OCR batch failed (%s), saving its jobs one at a time', e)
+        outcomes = finish_jobs_singly(claims, results)
+    
+    for outcome in outcomes:
+        OCR_JOBS.inc(outcome)
+
+def worker_loop(app, stop_event):
+    """Drain the queue until stop_event is set"""
+    with app.app_context():
+        next_requeue = 0
+        while not stop_event.is_set():
+            claims = []
+            try:
+                # Not just at startup: a worker that dies mid-batch leaves its jobs running
+                if time.monotonic() >= next_requeue:
+                    requeue_stale_jobs()
+                    next_requeue = time.monotonic() + OCR_REQUEUE_INTERVAL
+                claims = claim_jobs()
+                if claims:
+                    run_jobs(claims)
+            except Exception as e:
+                db.session.rollback()
+                OCR_WORKER_ERRORS.inc()
+                app.logger.exception('OCR worker error: %s', e)
+            finally:
+                db.session.remove()
+            
+            if not claims:
+                _wakeup.wait(OCR_POLL_INTERVAL)
+                _wakeup.clear()
+
+def _process_worker_main():
+    """Entry point for process-mode workers"""
+    from app import create_app
+    app = create_app(start_workers=False)
+    worker_loop(app, threading.Event())
+
+class WorkerPool:
+    """Thread or process pool draining OCR jobs"""
+    def __init__(self, app, size=OCR_WORKERS, mode=OCR_WORKER_MODE):
+        self.app = app
+        self.size = size
+        self.mode = mode
+        self.stop_event = threading.Event()
+        self.workers = []
+        self.pid = None
+    
+    def start(self):
+        # Threads do not survive fork(): a pool belongs to the process that started it
+        self.pid = os.getpid()
+        for i in range(self.size):
+            if self.mode == 'process':
+                # spawn, not fork: children build their own app and DB connections
+                ctx = multiprocessing.get_context('spawn')
+                worker = ctx.Process(target=_process_worker_main, name=f'ocr-worker-{i}', daemon=True)
+            else:
+                worker = threading.Thread(
+                    target=worker_loop,
+                    args=(self.app, self.stop_event),
+                    name=f'ocr-worker-{i}',
+                    daemon=True
+                )
+            worker.start()
+            self.workers.append(worker)
+        return self
+    
+    def stop(self, timeout=5):
+        self.stop_event.set()
+        _wakeup.set()
+        for worker in self.workers:
+            if self.mode == 'process':
+                worker.terminate()
+            worker.join(timeout)
+        self.workers = []
+
+def ensure_worker_pool(app):
+    """This process's worker pool for app, started on first use"""
+    pool = app.extensions.get('ocr_workers')
+    if pool and pool.pid == os.getpid():
+        return pool
+    with _pool_lock:
+        pool = app.extensions.get('ocr_workers')
+        if not pool or pool.pid != os.getpid():
+            pool = WorkerPool(app).start()
+            app.extensions['ocr_workers'] = pool
+    return pool
+
+def start_worker_pool(app):
+    """Start the configured worker pool with each process's first request
+
+    Not from create_app itself: under gunicorn --preload that runs once, in the master,
+    and the forked workers would inherit a pool whose threads never made it across.
+    Jobs left queued by an earlier run are picked up once the first request arrives.
+    """
+    def start_workers():
+        ensure_worker_pool(app)
+    
+    app.before_request(start_workers)
+
+def run_workers(app, size=OCR_WORKERS):
+    """Run a standalone worker pool in the foreground"""
+    pool = WorkerPool(app, size=size, mode='thread').start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pool.stop()
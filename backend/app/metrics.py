@@ -0,0 +1,262 @@
+"""In-process request and OCR stage metrics, exported at /metrics in the Prometheus text format
+
+Disabled by default (METRICS_ENABLED=1 to turn on): no request hooks or SQL listeners are
+installed, and the timers used on the OCR path return a shared no-op context manager.
+Values are per process; with several gunicorn workers scrape each worker (or run one).
+"""
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+METRICS_PATH = os.getenv('METRICS_PATH', '/metrics')
+
+# Seconds: a cached list page at the low end, a long multi-page Vision document at the top
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REGISTRY = []
+NULL_TIMER = nullcontext()
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names, values, extra=()):
+    """{name="value",...} for a sample line, '' when there are no labels"""
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+class Metric:
+    """Named family of values keyed by label values"""
+    kind = 'untyped'
+    
+    def __init__(self, name, documentation, labels=(), collect=None):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        # Optional callable returning {label_values: value}, evaluated at scrape time
+        self.collect = collect
+        self.values = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+    
+    def samples(self):
+        if self.collect:
+            values = self.collect()
+        else:
+            with self.lock:
+                values = dict(self.values)
+        for label_values, value in sorted(values.items()):
+            yield f'{self.name}{format_labels(self.labels, label_values)} {value}'
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self.samples())
+        return lines
+
+class Counter(Metric):
+    kind = 'counter'
+    
+    def inc(self, *label_values, amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+class Gauge(Metric):
+    kind = 'gauge'
+    
+    def inc(self, *label_values, amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+    
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+    
+    @contextmanager
+    def track(self, *label_values, amount=1):
+        """Count the enclosed block as in flight"""
+        self.inc(*label_values, amount=amount)
+        try:
+            yield
+        finally:
+            self.dec(*label_values, amount=amount)
+
+class Histogram(Metric):
+    kind = 'histogram'
+    
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+    
+    def observe(self, value, *label_values):
+        if not METRICS_ENABLED:
+            return
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(label_values)
+            if entry is None:
+                # Per-bucket counts (made cumulative when rendered), +Inf last, then sum
+                entry = self.values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+    
+    def time(self, *label_values):
+        """Context manager observing the enclosed block's duration"""
+        if not METRICS_ENABLED:
+            return NULL_TIMER
+        return self._timer(label_values)
+    
+    @contextmanager
+    def _timer(self, label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+    
+    def samples(self):
+        with self.lock:
+            values = {key: list(entry) for key, entry in self.values.items()}
+        for label_values, entry in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), entry[:-1]):
+                cumulative += count
+                yield f'{self.name}_bucket{format_labels(self.labels, label_values, [("le", bound)])} {cumulative}'
+            labels = format_labels(self.labels, label_values)
+            yield f'{self.name}_sum{labels} {entry[-1]}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+# HTTP
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Request latency by route', ('endpoint', 'method', 'status'))
+REQUEST_SQL_QUERIES = Histogram('http_request_sql_queries', 'SQL statements executed per request', ('endpoint',), QUERY_COUNT_BUCKETS)
+REQUESTS_IN_FLIGHT = Gauge('http_requests_in_flight', 'Requests being handled by this process')
+RESPONSE_BYTES = Counter('http_response_compression_bytes_total', 'Bodies of compressed responses before and after compression', ('kind',))
+
+# OCR pipeline
+# Upload, OCR and commit stages: file_write, rasterize, preprocess, vision, parse, db_commit
+STAGE_SECONDS = Histogram('stage_duration_seconds', 'Time spent per pipeline stage', ('stage',))
+VISION_IN_FLIGHT = Gauge('vision_calls_in_flight', 'Vision batch_annotate_images calls awaiting a response')
+OCR_JOBS_IN_FLIGHT = Gauge('ocr_jobs_in_flight', 'Claimed OCR jobs being processed by this process')
+OCR_JOBS = Counter('ocr_jobs_total', 'Finished OCR job attempts by outcome', ('outcome',))
+OCR_WORKER_ERRORS = Counter('ocr_worker_errors_total', 'Unexpected errors in the OCR worker loop')
+PREPROCESS_BYTES = Counter('ocr_preprocess_bytes_total', 'OCR image bytes sent to backends, and saved against the uploaded originals', ('kind',))
+PARSE_ERRORS = Counter('ocr_parse_errors_total', 'parse_vehicle_data calls that raised')
+
+def stage_timer(stage):
+    """Time a block into stage_duration_seconds"""
+    return STAGE_SECONDS.time(stage)
+
+def timed_stage(stage):
+    """Decorator form of stage_timer"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS_ENABLED:
+                return func(*args, **kwargs)
+            with STAGE_SECONDS._timer((stage,)):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def collect_queue_depth():
+    """Queued and running jobs, read from ocr_job at scrape time"""
+    from app import db
+    from app.models import OcrJob
+    rows = db.session.query(OcrJob.status, db.func.count()).filter(
+        OcrJob.status.in_(('queued', 'running'))
+    ).group_by(OcrJob.status).all()
+    depth = {('queued',): 0, ('running',): 0}
+    depth.update({(status,): count for status, count in rows})
+    return depth
+
+def collect_backend(key):
+    def collect():
+        from app.ocr import backend_stats, _backend_stats_lock
+        with _backend_stats_lock:
+            return {(name,): entry[key] for name, entry in backend_stats.items()}
+    return collect
+
+def collect_cache():
+    from app import ocr_cache
+    with ocr_cache._stats_lock:
+        return {('hit',): ocr_cache.stats['hits'], ('miss',): ocr_cache.stats['misses']}
+
+OCR_QUEUE_DEPTH = Gauge('ocr_queue_jobs', 'OCR jobs waiting or running, all processes', ('status',), collect=collect_queue_depth)
+Counter('ocr_backend_pages_total', 'Pages sent to each OCR backend', ('backend',), collect=collect_backend('pages'))
+Counter('ocr_backend_accepted_pages_total', 'Pages each OCR backend resolved', ('backend',), collect=collect_backend('accepted_pages'))
+Counter('ocr_backend_errors_total', 'OCR backend runs that failed', ('backend',), collect=collect_backend('errors'))
+Counter('ocr_backend_seconds_total', 'Time spent in each OCR backend', ('backend',), collect=collect_backend('seconds'))
+Counter('ocr_cache_lookups_total', 'OCR result cache lookups by result', ('result',), collect=collect_cache)
+
+def render():
+    """Every registered metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    """Engine listener: count statements run inside a request (worker threads have none)"""
+    from flask import g, has_request_context
+    if has_request_context() and 'sql_queries' in g:
+        g.sql_queries += 1
+
+def start_commit_timer(session):
+    session.info['metrics_commit_start'] = time.perf_counter()
+
+def record_commit(session):
+    start = session.info.pop('metrics_commit_start', None)
+    if start is not None:
+        STAGE_SECONDS.observe(time.perf_counter() - start, 'db_commit')
+
+def init_metrics(app):
+    """Install request hooks, SQL and commit listeners and the /metrics route when enabled"""
+    if not METRICS_ENABLED:
+        return
+    
+    from flask import g, request
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+    from app import db
+    
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+        g.sql_queries = 0
+        REQUESTS_IN_FLIGHT.inc()
+    
+    @app.after_request
+    def record_request(response):
+        if 'metrics_start' in g:
+            endpoint = request.endpoint or 'unmatched'
+            REQUEST_SECONDS.observe(time.perf_counter() - g.metrics_start, endpoint, request.method, response.status_code)
+            REQUEST_SQL_QUERIES.observe(g.sql_queries, endpoint)
+        return response
+    
+    @app.teardown_request
+    def end_request(exc):
+        if g.pop('metrics_start', None) is not None:
+            REQUESTS_IN_FLIGHT.dec()
+    
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', count_query)
+    
+    # Session class events cover every app in the process, register them once
+    if not event.contains(Session, 'before_commit', start_commit_timer):
+        event.listen(Session, 'before_commit', start_commit_timer)
+        event.listen(Session, 'after_commit', record_commit)
+    
+    def metrics_view():
+        body = render()
+        return app.response_class(body, mimetype='text/plain; version=0.0.4')
+    
+    app.add_url_rule(METRICS_PATH, 'metrics', metrics_view)
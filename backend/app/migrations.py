@@ -0,0 +1,217 @@
+"""Versioned schema and data migrations, recorded in the schema_migration table"""
+import os
+import click
+from contextlib import contextmanager
+from sqlalchemy import inspect, text, update
+from app import db
+from app.models import Document, OcrResult, SchemaMigration, RevokedToken
+from app.ocr import typed_fields
+from app.search import setup_search_index
+from app.stats import rebuild_rollup
+
+BACKFILL_BATCH_SIZE = 1000
+MIGRATE_ON_START = os.getenv('DB_MIGRATE_ON_START', 'true').lower() in ('1', 'true', 'yes')
+# Arbitrary constant shared by every process migrating the same Postgres database
+MIGRATION_LOCK_ID = 7301945
+
+def add_missing_columns(model, names):
+    """ALTER TABLE ... ADD COLUMN for model columns an older database lacks"""
+    table = model.__table__
+    connection = db.session.connection()
+    existing = {column['name'] for column in inspect(connection).get_columns(table.name)}
+    for name in names:
+        if name not in existing:
+            type_sql = table.columns[name].type.compile(dialect=connection.dialect)
+            connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {name} {type_sql}'))
+
+def create_missing_indexes(model, names=None):
+    """Create indexes declared on the model that do not exist yet, all of them or just names"""
+    connection = db.session.connection()
+    for index in model.__table__.indexes:
+        if names is None or index.name in names:
+            index.create(connection, checkfirst=True)
+
+def backfill_typed_sale_columns():
+    """Parse existing display strings into the typed columns, one id range at a time"""
+    last_id, updated = 0, 0
+    while True:
+        rows = db.session.query(
+            Document.id, Document.sale_amount, Document.sale_date, Document.odometer_reading
+        ).filter(Document.id > last_id).order_by(Document.id).limit(BACKFILL_BATCH_SIZE).all()
+        if not rows:
+            return updated
+        
+        changes = []
+        for doc_id, sale_amount, sale_date, odometer_reading in rows:
+            fields = typed_fields({
+                'sale_amount': sale_amount,
+                'sale_date': sale_date,
+                'odometer_reading': odometer_reading
+            })
+            if any(value is not None for value in fields.values()):
+                changes.append({'id': doc_id, **fields})
+        
+        if changes:
+            db.session.execute(update(Document), changes)
+        db.session.commit()
+        updated += len(changes)
+        last_id = rows[-1][0]
+
+def migrate_ocr_cache():
+    """Content hash on documents and the ocr_result table it keys"""
+    OcrResult.__table__.create(db.session.connection(), checkfirst=True)
+    add_missing_columns(Document, ['content_hash'])
+    create_missing_indexes(Document, ['ix_document_content_hash'])
+    db.session.commit()
+
+def migrate_document_columns():
+    add_missing_columns(Document, ['sale_amount_cents', 'sale_date_value', 'odometer_miles'])
+    create_missing_indexes(Document)
+    db.session.commit()
+    backfill_typed_sale_columns()
+
+def migrate_dealer_rollup():
+    add_missing_columns(Document, ['processed_at'])
+    db.session.commit()
+    rebuild_rollup()
+    db.session.commit()
+
+def migrate_document_text():
+    """Move extracted_text out of the document row into document_text"""
+    connection = db.session.connection()
+    existing = {column['name'] for column in inspect(connection).get_columns('document')}
+    if 'extracted_text' not in existing:
+        return
+    
+    last_id = 0
+    while True:
+        ids = [row[0] for row in connection.execute(text(
+            'SELECT id FROM document WHERE id > :last AND extracted_text IS NOT NULL ORDER BY id LIMIT :n'
+        ), {'last': last_id, 'n': BACKFILL_BATCH_SIZE})]
+        if not ids:
+            break
+        
+        first, last_id = ids[0], ids[-1]
+        connection.execute(text(
+            'INSERT INTO document_text (document_id, extracted_text) '
+            'SELECT id, extracted_text FROM document '
+            'WHERE id BETWEEN :first AND :last AND extracted_text IS NOT NULL'
+        ), {'first': first, 'last': last_id})
+        # The old column stays (dropping columns is not portable) but no longer holds data
+        connection.execute(text(
+            'UPDATE document SET extracted_text = NULL WHERE id BETWEEN :first AND :last'
+        ), {'first': first, 'last': last_id})
+        db.session.commit()
+        connection = db.session.connection()
+
+def migrate_revoked_tokens():
+    RevokedToken.__table__.create(db.session.connection(), checkfirst=True)
+    db.session.commit()
+
+def migrate_parser_version():
+    # Existing rows stay NULL, which 'flask reextract' treats as stale
+    add_missing_columns(Document, ['parser_version'])
+    add_missing_columns(OcrResult, ['parser_version'])
+    db.session.commit()
+
+def migrate_file_path_index():
+    create_missing_indexes(Document)
+    db.session.commit()
+
+def migrate_search_index():
+    setup_search_index()
+
+def migrate_base_schema():
+    """Create every table and index the models define that the database lacks"""
+    db.create_all()
+
+# Applied in this order, which is also the order of their ids
+MIGRATIONS = [
+    ('0000_base_schema', migrate_base_schema),
+    ('0001_ocr_cache', migrate_ocr_cache),
+    ('0002_document_columns', migrate_document_columns),
+    ('0003_dealer_rollup', migrate_dealer_rollup),
+    ('0004_document_text', migrate_document_text),
+    ('0005_revoked_tokens', migrate_revoked_tokens),
+    ('0006_parser_version', migrate_parser_version),
+    ('0007_file_path_index', migrate_file_path_index),
+    ('0008_search_index', migrate_search_index),
+]
+# Ids recorded before 0001_ocr_cache was numbered into place, mapped to the current ones
+RENAMED_MIGRATIONS = {
+    '0000_ocr_cache': '0001_ocr_cache',
+    '0001_document_columns': '0002_document_columns',
+    '0002_dealer_rollup': '0003_dealer_rollup',
+    '0003_document_text': '0004_document_text',
+    '0004_revoked_tokens': '0005_revoked_tokens',
+    '0005_parser_version': '0006_parser_version',
+    '0006_file_path_index': '0007_file_path_index',
+    '0007_search_index': '0008_search_index',
+}
+
+@contextmanager
+def migration_lock():
+    """Serialize migrations across processes (gunicorn workers booting together)"""
+    engine = db.engine
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as connection:
+            connection.execute(text('SELECT pg_advisory_lock(:id)'), {'id': MIGRATION_LOCK_ID})
+            try:
+                yield
+            finally:
+                connection.execute(text('SELECT pg_advisory_unlock(:id)'), {'id': MIGRATION_LOCK_ID})
+    elif engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+        import fcntl
+        with open(f'{engine.url.database}.migrate.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    else:
+        yield
+
+def rename_recorded_migrations(applied):
+    """Rewrite old ids in schema_migration to their current names, returns the updated set"""
+    for old in applied & RENAMED_MIGRATIONS.keys():
+        new = RENAMED_MIGRATIONS[old]
+        query = SchemaMigration.query.filter_by(name=old)
+        if new in applied:
+            query.delete(synchronize_session=False)
+        else:
+            query.update({'name': new}, synchronize_session=False)
+    return {RENAMED_MIGRATIONS.get(name, name) for name in applied}
+
+def pending_migrations():
+    """Names not yet recorded in schema_migration"""
+    SchemaMigration.__table__.create(db.session.connection(), checkfirst=True)
+    applied = {name for (name,) in db.session.query(SchemaMigration.name)}
+    if applied & RENAMED_MIGRATIONS.keys():
+        applied = rename_recorded_migrations(applied)
+    db.session.commit()
+    return [name for name, _ in MIGRATIONS if name not in applied]
+
+def run_migrations():
+    """Apply pending migrations in order, returns names applied"""
+    # Fast path for every boot after the first: one query, no lock
+    if not pending_migrations():
+        return []
+    
+    ran = []
+    with migration_lock():
+        # Another process may have finished while we waited for the lock
+        pending = set(pending_migrations())
+        for name, migrate in MIGRATIONS:
+            if name not in pending:
+                continue
+            migrate()
+            db.session.add(SchemaMigration(name=name))
+            db.session.commit()
+            ran.append(name)
+    return ran
+
+@click.command('migrate')
+def migrate_command():
+    """Apply pending schema and data migrations"""
+    ran = run_migrations()
+    click.echo(f"Applied: {', '.join(ran)}" if ran else 'Up to date')
@@ -1,6 +1,23 @@
 from app import db
 from flask_login import UserMixin
 from datetime import datetime
+from functools import lru_cache
+from app.serialization import RowSerializer, isoformat
+
+def insert_ignore(model, values):
+    """Insert a row unless its primary key already exists (safe against concurrent inserts)"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        key = tuple(values[column.name] for column in model.__table__.primary_key.columns)
+        if not db.session.get(model, key):
+            db.session.add(model(**values))
+        return
+    
+    db.session.execute(insert(model).values(**values).on_conflict_do_nothing())
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -16,33 +33,165 @@ class Document(db.Model):
     original_filename = db.Column(db.String(255))
     file_type = db.Column(db.String(10))
     file_size = db.Column(db.Integer)
-    file_path = db.Column(db.String(500))
+    # Indexed for the 'is this stored file still referenced' checks on delete and migrate-storage
+    file_path = db.Column(db.String(500), index=True)
+    content_hash = db.Column(db.String(64), index=True)
     status = db.Column(db.String(20), default='pending')
-    notes = db.Column(db.Text)
-    extracted_text = db.Column(db.Text)
+    # Loaded on first access only, so list and ownership queries skip it
+    notes = db.deferred(db.Column(db.Text))
     vin = db.Column(db.String(100))
     buyer_name = db.Column(db.String(255))
     seller_name = db.Column(db.String(255))
     sale_date = db.Column(db.String(50))
     sale_amount = db.Column(db.String(50))
     odometer_reading = db.Column(db.String(50))
+    # Typed copies of the display strings above, for aggregates in SQL
+    sale_amount_cents = db.Column(db.BigInteger)
+    sale_date_value = db.Column(db.Date)
+    odometer_miles = db.Column(db.Integer)
     document_type = db.Column(db.String(100))
+    # PARSER_VERSION that produced the fields above, NULL before versioning
+    parser_version = db.Column(db.Integer)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    
+    # Full OCR output lives in document_text and is only fetched when asked for
+    # (deletes remove it explicitly, see documents.delete)
+    text_row = db.relationship('DocumentText', uselist=False, lazy='select', passive_deletes='all')
+    
+    # Keyset pagination walks (uploaded_by, [filter], uploaded_at, id) straight off these
+    __table_args__ = (
+        db.Index('ix_document_owner_uploaded', 'uploaded_by', 'uploaded_at', 'id'),
+        db.Index('ix_document_owner_status_uploaded', 'uploaded_by', 'status', 'uploaded_at', 'id'),
+        db.Index('ix_document_owner_type_uploaded', 'uploaded_by', 'document_type', 'uploaded_at', 'id'),
+        db.Index('ix_document_owner_vin', 'uploaded_by', 'vin'),
+        db.Index('ix_document_owner_sale_date', 'uploaded_by', 'sale_date_value', 'sale_amount_cents'),
+        db.Index('ix_document_owner_odometer', 'uploaded_by', 'odometer_miles'),
+    )
+    
+    # Fields of to_dict that list endpoints may select with ?fields=
+    LIST_FIELDS = (
+        'id', 'filename', 'original_filename', 'file_type', 'status', 'notes', 'vin',
+        'buyer_name', 'seller_name', 'sale_date', 'sale_amount', 'odometer_reading',
+        'sale_amount_cents', 'sale_date_value', 'odometer_miles', 'document_type', 'uploaded_at'
+    )
+    # Default list projection: everything except free-text notes
+    SUMMARY_FIELDS = tuple(f for f in LIST_FIELDS if f != 'notes')
+    
+    @property
+    def extracted_text(self):
+        return self.text_row.extracted_text if self.text_row else None
+    
+    @extracted_text.setter
+    def extracted_text(self, value):
+        if self.text_row:
+            self.text_row.extracted_text = value
+        else:
+            self.text_row = DocumentText(extracted_text=value)
+    
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def serializer(fields):
+        """RowSerializer for column-query rows selected with a tuple of fields, built once per field list"""
+        columns = Document.__table__.c
+        return RowSerializer(fields, {
+            field: isoformat for field in fields if isinstance(columns[field].type, (db.Date, db.DateTime))
+        })
+    
+    @staticmethod
+    def row_to_dict(row, fields):
+        """Serialize a column-query row selected with fields"""
+        return Document.serializer(tuple(fields)).one(row)
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'filename': self.filename,
-            'original_filename': self.original_filename,
-            'file_type': self.file_type,
-            'status': self.status,
-            'notes': self.notes,
-            'vin': self.vin,
-            'buyer_name': self.buyer_name,
-            'seller_name': self.seller_name,
-            'sale_date': self.sale_date,
-            'sale_amount': self.sale_amount,
-            'odometer_reading': self.odometer_reading,
-            'document_type': self.document_type,
-            'uploaded_at': self.uploaded_at.isoformat()
-        }
\ No newline at end of file
+        return Document.serializer(Document.LIST_FIELDS).one([getattr(self, f) for f in Document.LIST_FIELDS])
+
+class DocumentText(db.Model):
+    """Full OCR text, kept out of the document row"""
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), primary_key=True)
+    extracted_text = db.Column(db.Text)
+
+
+class OcrJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), index=True)
+    status = db.Column(db.String(20), default='queued')
+    attempts = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_ocr_job_status_run_after', 'status', 'run_after'),
+    )
+
+
+class OcrResult(db.Model):
+    """OCR output cached by SHA-256 of the uploaded bytes"""
+    content_hash = db.Column(db.String(64), primary_key=True)
+    extracted_text = db.Column(db.Text)
+    extracted_data = db.Column(db.Text)
+    parser_version = db.Column(db.Integer)
+    size_bytes = db.Column(db.Integer, default=0)
+    hits = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class UploadSession(db.Model):
+    """Resumable chunked upload in progress"""
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+    original_filename = db.Column(db.String(255))
+    file_type = db.Column(db.String(10))
+    total_size = db.Column(db.Integer)
+    received_bytes = db.Column(db.Integer, default=0)
+    temp_path = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class Vehicle(db.Model):
+    """Vehicle identified by a check-digit validated VIN"""
+    vin = db.Column(db.String(17), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class DocumentVehicle(db.Model):
+    """Link from a processed document to the vehicle its VIN names"""
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), primary_key=True)
+    vin = db.Column(db.String(17), db.ForeignKey('vehicle.vin'), primary_key=True)
+    uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    
+    # Deal history for one dealer and VIN is a single range scan
+    __table_args__ = (
+        db.Index('ix_document_vehicle_owner_vin', 'uploaded_by', 'vin', 'document_id'),
+    )
+
+
+class SchemaMigration(db.Model):
+    """Migrations already applied to this database"""
+    name = db.Column(db.String(100), primary_key=True)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class RevokedToken(db.Model):
+    """Access tokens revoked before they expire (logout), keyed by JWT id"""
+    jti = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, index=True)
+    # Rows past expires_at can be purged, the token is rejected by its own exp claim by then;
+    # NULL for tokens issued without exp, which stay revoked for good
+    expires_at = db.Column(db.DateTime, index=True)
+
+class DealerDailyRollup(db.Model):
+    """Per-dealer document counters by upload day, kept current as documents change state"""
+    uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    document_type = db.Column(db.String(100), primary_key=True, default='')
+    sale_month = db.Column(db.String(7), primary_key=True, default='')
+    doc_count = db.Column(db.Integer, default=0)
+    sale_count = db.Column(db.Integer, default=0)
+    sale_amount_cents = db.Column(db.BigInteger, default=0)
+    latency_count = db.Column(db.Integer, default=0)
+    latency_ms = db.Column(db.BigInteger, default=0)
@@ -1,8 +1,51 @@
-from google.cloud import vision
+import os
 import re
+import logging
+import time
+import threading
+import contextvars
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from app.rasterize import OCR_RASTER_WORKERS, get_executor, get_page_count, load_image, render_pages
+from app import tesseract
+from app.metrics import stage_timer, timed_stage, VISION_IN_FLIGHT, PARSE_ERRORS, PREPROCESS_BYTES
 
-client = vision.ImageAnnotatorClient()
+# Child of the Flask app's logger ('app'), and usable outside an app context in worker processes
+logger = logging.getLogger(__name__)
+
+# OCR_FAKE_VISION=1 swaps in a local stand-in so the pipeline runs without Vision credentials
+USE_FAKE_VISION = os.getenv('OCR_FAKE_VISION', 'false').lower() in ('1', 'true', 'yes')
+CREDENTIALS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'google-vision-key.json')
+
+# OCR_ASYNC=0 falls back to calling Vision serially from the worker thread
+OCR_ASYNC = os.getenv('OCR_ASYNC', 'true').lower() in ('1', 'true', 'yes')
+
+OCR_PDF_DPI = int(os.getenv('OCR_PDF_DPI', '144'))
+OCR_MAX_PAGES = int(os.getenv('OCR_MAX_PAGES', '50'))
+
+# Vision batch_annotate_images limits: 16 images and ~10 MB (base64 encoded) per request
+VISION_BATCH_SIZE = 16
+VISION_MAX_BATCH_BYTES = 7 * 1024 * 1024
+
+# Pages are joined with a form feed so page boundaries survive into parse_vehicle_data
+PAGE_SEPARATOR = '\n\f\n'
+
+# Bump whenever a change to parse_vehicle_data can change its output; documents record the
+# version that filled their fields and 'flask reextract' reparses the ones left behind
+PARSER_VERSION = 1
+
+# Largest values the typed columns hold: sale_amount_cents is a BigInteger, odometer_miles an Integer
+MAX_AMOUNT_CENTS = 2 ** 63 - 1
+MAX_ODOMETER_MILES = 2 ** 31 - 1
+
+# Backends tried in order; each later one only sees the pages earlier ones could not read
+OCR_BACKENDS = [name.strip() for name in os.getenv('OCR_BACKENDS', 'text_layer,tesseract,vision').split(',') if name.strip()]
+OCR_MIN_CONFIDENCE = float(os.getenv('OCR_MIN_CONFIDENCE', '0.8'))
+OCR_MIN_PAGE_CHARS = int(os.getenv('OCR_MIN_PAGE_CHARS', '40'))
+OCR_TESSERACT_DPI = int(os.getenv('OCR_TESSERACT_DPI', '300'))
+# DOCUMENT_TEXT_DETECTION list price per image, for the cost avoided report
+VISION_COST_PER_PAGE = float(os.getenv('VISION_COST_PER_PAGE', '0.0015'))
+READABLE_PUNCTUATION = set('.,:;!?$%&@#\'"()-/+*=_<>[]•')
 
 VIN_PATTERN = r'\b[A-HJ-NPR-Z0-9]{17}\b'
 
@@ -16,153 +59,589 @@ DOCUMENT_TYPES = {
     'invoice': ['invoice', 'bill of sale', 'receipt'],
 }
 
-def convert_pdf_to_image(pdf_path):
-    """Convert PDF to JPEG image using PyMuPDF"""
+# Field extraction patterns, compiled once at import
+VIN_RE = re.compile(VIN_PATTERN, re.IGNORECASE)
+BUYER_PATTERNS = [
+    re.compile(r'Sold\s+To[:\s]+([^\n]+?)(?:\nEmail|City|Address|$)', re.IGNORECASE | re.DOTALL),
+    re.compile(r'Sold\s+To[:\s]+([A-Za-z\s]+?)(?:\n|$)', re.IGNORECASE | re.DOTALL),
+]
+SELLER_PATTERNS = [
+    re.compile(r'We\s+Own[:\s]+([^\n]+?)(?:\n|Dealer|Address|$)', re.IGNORECASE | re.DOTALL),
+    re.compile(r'We\s+Own[:\s]+([A-Za-z\s]+?)(?:\n|$)', re.IGNORECASE | re.DOTALL),
+]
+PURCHASE_DATE_RE = re.compile(r'Purchase\s+Date[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', re.IGNORECASE)
+DATE_RE = re.compile(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', re.IGNORECASE)
+MONTH_DATE_RE = re.compile(
+    r'(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{4}',
+    re.IGNORECASE
+)
+AMOUNT_RE = re.compile(r'\$\s*([\d,]+\.?\d*)')
+ODOMETER_READING_RE = re.compile(r'Odometer\s+Reading[:\s]+([0-9,]+)\s*(?:miles|mi)?', re.IGNORECASE)
+ODOMETER_LABEL_RE = re.compile(r'(?:Odometer|Mileage)[:\s]+([0-9,]+)\s*(?:miles|mi)?', re.IGNORECASE)
+MILES_RE = re.compile(r'([0-9,]+)\s+miles', re.IGNORECASE)
+NON_WORD_RE = re.compile(r'[^\w\s]')
+
+# Every labelled field pattern above starts with the first of these words and contains
+# the rest, so a substring search tells each extractor whether and where to start.
+# str.find per label beats one pass of ANCHOR_RE: re cannot prefix-scan an IGNORECASE
+# alternation, so the merged pattern is only used for non-ASCII text
+ANCHOR_WORDS = {
+    'sold_to': ('sold', 'to'),
+    'we_own': ('we', 'own'),
+    'purchase_date': ('purchase', 'date'),
+    'odometer': ('odometer',),
+    'mileage': ('mileage',),
+    'miles': ('miles',),
+    'dollar': ('$',),
+}
+# Same labels as a regex, used when the text is not plain ASCII
+ANCHOR_RE = re.compile(
+    r'(?P<sold_to>sold\s+to)|(?P<we_own>we\s+own)|(?P<purchase_date>purchase\s+date)'
+    r'|(?P<odometer>odometer)|(?P<mileage>mileage)|(?P<miles>miles)|(?P<dollar>\$)',
+    re.IGNORECASE
+)
+
+# Keywords flattened in priority order; a substring check per keyword on one lowercased
+# copy measured faster than a combined regex alternation
+DOCUMENT_TYPE_KEYWORDS = tuple(
+    (keyword, doc_type)
+    for doc_type, keywords in DOCUMENT_TYPES.items()
+    for keyword in keywords
+)
+
+# The Vision library, its gRPC channel and credentials are only touched by the first Vision
+# call, so app boot (every gunicorn worker, every create_app) never pays for them
+_vision_client = None
+_vision_client_pid = None
+_vision_client_lock = threading.Lock()
+_credentials_checked = False
+
+def get_vision():
+    """google.cloud.vision, or the fake under OCR_FAKE_VISION, imported on first use"""
+    if USE_FAKE_VISION:
+        from app import fake_vision as vision
+    else:
+        from google.cloud import vision
+    return vision
+
+def vision_installed():
+    """Vision can be imported, checked without importing it"""
+    if USE_FAKE_VISION:
+        return True
+    import importlib.util
     try:
-        import fitz
-        
-        pdf_document = fitz.open(pdf_path)
-        first_page = pdf_document[0]
-        pix = first_page.get_pixmap(matrix=fitz.Matrix(2, 2))
-        image_bytes = pix.tobytes("jpeg")
-        pdf_document.close()
+        return importlib.util.find_spec('google.cloud.vision') is not None
+    except ModuleNotFoundError:
+        return False
+
+def configure_credentials():
+    """Point the Google client libraries at the bundled key file, once per process"""
+    global _credentials_checked
+    if _credentials_checked or USE_FAKE_VISION:
+        return
+    _credentials_checked = True
+    if os.path.exists(CREDENTIALS_PATH):
+        os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = CREDENTIALS_PATH
+        logger.info('Google Cloud credentials loaded from %s', CREDENTIALS_PATH)
+    elif not os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
+        logger.warning('Google Cloud credentials not found at %s and GOOGLE_APPLICATION_CREDENTIALS is not set', CREDENTIALS_PATH)
+
+def create_vision_client(async_client=False):
+    """New Vision client (ImageAnnotatorAsyncClient with async_client)"""
+    configure_credentials()
+    vision = get_vision()
+    return vision.ImageAnnotatorAsyncClient() if async_client else vision.ImageAnnotatorClient()
+
+def get_vision_client():
+    """This process's sync Vision client; rebuilt after fork since gRPC channels cannot be shared"""
+    global _vision_client, _vision_client_pid
+    with _vision_client_lock:
+        if _vision_client is None or _vision_client_pid != os.getpid():
+            _vision_client = create_vision_client()
+            _vision_client_pid = os.getpid()
+        return _vision_client
+
+# Totals for the document process_document is working on; the dict is shared with the threads
+# and event loop tasks it hands pages to, which inherit the context
+_preprocess_report = contextvars.ContextVar('preprocess_report', default=None)
+
+def record_preprocess(images, seconds, saved_bytes=0):
+    """Count images prepared for OCR into metrics and the current document's report"""
+    sent_bytes = sum(len(content) for content in images)
+    PREPROCESS_BYTES.inc('sent', amount=sent_bytes)
+    PREPROCESS_BYTES.inc('saved', amount=saved_bytes)
+    report = _preprocess_report.get()
+    if report is not None:
+        report['images'] += len(images)
+        report['bytes_sent'] += sent_bytes
+        report['bytes_saved'] += saved_bytes
+        report['seconds'] += seconds
+
+def convert_pdf_to_images(pdf_path, page_numbers, dpi=OCR_PDF_DPI):
+    """Convert PDF pages to JPEG images using PyMuPDF"""
+    try:
+        start = time.perf_counter()
+        with stage_timer('rasterize'):
+            images = render_pages(pdf_path, page_numbers, dpi)
+        record_preprocess(images, time.perf_counter() - start)
+        return images, None
         
-        return image_bytes, None
+    except ImportError:
+        return None, "PyMuPDF not installed. Install with: pip install PyMuPDF"
+    except Exception as e:
+        return None, str(e)
+
+def load_image_content(image_path):
+    """An uploaded image, preprocessed for OCR"""
+    start = time.perf_counter()
+    with stage_timer('preprocess'):
+        content = load_image(image_path)
+    record_preprocess([content], time.perf_counter() - start, os.path.getsize(image_path) - len(content))
+    return content
+
+def get_pdf_page_count(pdf_path):
+    """Count PDF pages, capped at OCR_MAX_PAGES"""
+    try:
+        return min(get_page_count(pdf_path), OCR_MAX_PAGES), None
         
     except ImportError:
         return None, "PyMuPDF not installed. Install with: pip install PyMuPDF"
     except Exception as e:
         return None, str(e)
 
+def chunk_images(images):
+    """Split images into batches within Vision's per-request image and size limits"""
+    batch, batch_bytes = [], 0
+    for content in images:
+        if batch and (len(batch) >= VISION_BATCH_SIZE or batch_bytes + len(content) > VISION_MAX_BATCH_BYTES):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(content)
+        batch_bytes += len(content)
+    if batch:
+        yield batch
+
+def annotate_images(images):
+    """Run document text detection on images with batched Vision calls"""
+    vision = get_vision()
+    client = get_vision_client()
+    feature = vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)
+    texts = []
+    
+    for batch in chunk_images(images):
+        requests = [
+            vision.AnnotateImageRequest(image=vision.Image(content=content), features=[feature])
+            for content in batch
+        ]
+        with stage_timer('vision'), VISION_IN_FLIGHT.track():
+            response = client.batch_annotate_images(requests=requests)
+        
+        for page_response in response.responses:
+            if page_response.error.message:
+                return None, page_response.error.message
+            texts.append(page_response.full_text_annotation.text)
+    
+    return texts, None
+
+def annotate_pdf_pages(pdf_path, page_numbers):
+    """Vision text for the given PDF pages, rendering one Vision batch at a time (texts, error)"""
+    page_numbers = list(page_numbers)
+    texts = []
+    for start in range(0, len(page_numbers), VISION_BATCH_SIZE):
+        images, error = convert_pdf_to_images(pdf_path, page_numbers[start:start + VISION_BATCH_SIZE])
+        if error:
+            return None, error
+        
+        page_texts, error = annotate_images(images)
+        if error:
+            return None, error
+        texts.extend(page_texts)
+    
+    return texts, None
+
+def extract_text_from_pdf(pdf_path):
+    """Extract text from every PDF page with Vision"""
+    page_count, error = get_pdf_page_count(pdf_path)
+    if error:
+        return None, error
+    
+    texts, error = annotate_pdf_pages(pdf_path, range(page_count))
+    if error:
+        return None, error
+    return PAGE_SEPARATOR.join(texts), None
+
 def extract_text_from_image(image_path):
     """Extract text from image or PDF using Google Vision API"""
     try:
         if image_path.lower().endswith('.pdf'):
-            content, error = convert_pdf_to_image(image_path)
-            if error:
-                return None, error
-        else:
-            with open(image_path, 'rb') as image_file:
-                content = image_file.read()
-        
-        image = vision.Image(content=content)
-        response = client.document_text_detection(image=image)
+            return extract_text_from_pdf(image_path)
         
-        if response.error.message:
-            return None, response.error.message
+        texts, error = annotate_images([load_image_content(image_path)])
+        if error:
+            return None, error
         
-        return response.full_text_annotation.text, None
+        return texts[0], None
         
     except Exception as e:
         return None, str(e)
 
-def extract_vin(text):
+def text_quality(text):
+    """Share of readable characters, 0 when a page has too little text to trust"""
+    stripped = text.strip()
+    if len(stripped) < OCR_MIN_PAGE_CHARS:
+        return 0.0
+    readable = sum(1 for ch in stripped if ch.isalnum() or ch.isspace() or ch in READABLE_PUNCTUATION)
+    return readable / len(stripped)
+
+class OcrBackend:
+    """One way of turning document pages into text"""
+    name = None
+    cost_per_page = 0.0
+    
+    def available(self):
+        return True
+    
+    def supports(self, file_path):
+        return True
+    
+    def extract_pages(self, file_path, page_numbers):
+        """[(text, confidence 0..1)] for each requested page (pages, error)"""
+        raise NotImplementedError
+
+class TextLayerBackend(OcrBackend):
+    """Text already embedded in digitally generated PDFs, read with PyMuPDF"""
+    name = 'text_layer'
+    
+    def supports(self, file_path):
+        return file_path.lower().endswith('.pdf')
+    
+    def extract_pages(self, file_path, page_numbers):
+        try:
+            import fitz
+            with fitz.open(file_path) as pdf_document:
+                texts = [pdf_document[n].get_text() for n in page_numbers]
+            return [(text, text_quality(text)) for text in texts], None
+        except Exception as e:
+            return None, str(e)
+
+class TesseractBackend(OcrBackend):
+    """Local Tesseract, one page per task on the rasterize process pool"""
+    name = 'tesseract'
+    
+    def __init__(self):
+        self._available = None
+    
+    def available(self):
+        if self._available is None:
+            self._available = tesseract.is_available()
+        return self._available
+    
+    def extract_pages(self, file_path, page_numbers):
+        try:
+            page_numbers = list(page_numbers)
+            if OCR_RASTER_WORKERS <= 1 or len(page_numbers) <= 1:
+                results = [tesseract.ocr_page(file_path, n, OCR_TESSERACT_DPI) for n in page_numbers]
+            else:
+                executor = get_executor()
+                futures = [executor.submit(tesseract.ocr_page, file_path, n, OCR_TESSERACT_DPI) for n in page_numbers]
+                results = [future.result() for future in futures]
+            return [(text, min(confidence, text_quality(text))) for text, confidence in results], None
+        except Exception as e:
+            return None, str(e)
+
+class VisionBackend(OcrBackend):
+    """Google Vision document text detection, the paid fallback"""
+    name = 'vision'
+    cost_per_page = VISION_COST_PER_PAGE
+    
+    def available(self):
+        return vision_installed()
+    
+    def extract_pages(self, file_path, page_numbers):
+        if OCR_ASYNC:
+            # Vision calls from every worker thread share one event loop and one set of limits
+            from app.ocr_async import run_sync, extract_pages_async
+            texts, error = run_sync(extract_pages_async(file_path, page_numbers))
+        elif file_path.lower().endswith('.pdf'):
+            texts, error = annotate_pdf_pages(file_path, page_numbers)
+        else:
+            text, error = extract_text_from_image(file_path)
+            texts = [text]
+        if error:
+            return None, error
+        return [(text, 1.0) for text in texts], None
+
+OCR_BACKEND_CLASSES = {
+    'text_layer': TextLayerBackend,
+    'tesseract': TesseractBackend,
+    'vision': VisionBackend,
+}
+
+_backends = None
+backend_stats = {}
+_backend_stats_lock = threading.Lock()
+
+def get_backends():
+    """Configured backends that can run on this host, in OCR_BACKENDS order"""
+    global _backends
+    if _backends is None:
+        backends = [OCR_BACKEND_CLASSES[name]() for name in OCR_BACKENDS]
+        _backends = [backend for backend in backends if backend.available()]
+    return _backends
+
+def record_backend(backend, pages, accepted, seconds, failed=False):
+    """Add one backend run to this process's counters"""
+    with _backend_stats_lock:
+        entry = backend_stats.setdefault(backend.name, {
+            'runs': 0, 'errors': 0, 'pages': 0, 'accepted_pages': 0, 'seconds': 0.0, 'cost': 0.0
+        })
+        entry['runs'] += 1
+        entry['errors'] += 1 if failed else 0
+        entry['pages'] += pages
+        entry['accepted_pages'] += accepted
+        entry['seconds'] += seconds
+        entry['cost'] += 0 if failed else pages * backend.cost_per_page
+
+def get_backend_stats():
+    """Per-backend latency, acceptance and cost for this process, plus Vision pages avoided"""
+    with _backend_stats_lock:
+        backends = {name: dict(entry) for name, entry in backend_stats.items()}
+    
+    for entry in backends.values():
+        entry['ms_per_page'] = round(entry['seconds'] * 1000 / entry['pages'], 2) if entry['pages'] else 0.0
+        entry['seconds'] = round(entry['seconds'], 3)
+        entry['cost'] = round(entry['cost'], 4)
+    
+    avoided = sum(entry['accepted_pages'] for name, entry in backends.items() if name != 'vision')
+    return {
+        'backends': backends,
+        'order': [backend.name for backend in get_backends()],
+        'vision_pages_avoided': avoided,
+        'vision_cost_avoided': round(avoided * VISION_COST_PER_PAGE, 4)
+    }
+
+def extract_text(file_path):
+    """Run the backend chain page by page; pages below OCR_MIN_CONFIDENCE move on to the next backend"""
+    if file_path.lower().endswith('.pdf'):
+        page_count, error = get_pdf_page_count(file_path)
+        if error:
+            return None, error
+    else:
+        page_count = 1
+    
+    best = [None] * page_count
+    pending = list(range(page_count))
+    last_error = None
+    for backend in get_backends():
+        if not pending:
+            break
+        if not backend.supports(file_path):
+            continue
+        
+        start = time.perf_counter()
+        pages, error = backend.extract_pages(file_path, pending)
+        seconds = time.perf_counter() - start
+        if error:
+            record_backend(backend, len(pending), 0, seconds, failed=True)
+            last_error = error
+            continue
+        
+        # Keep the most confident text per page, so a weak text layer still beats nothing
+        unresolved = []
+        for page_number, (text, confidence) in zip(pending, pages):
+            if best[page_number] is None or confidence > best[page_number][1]:
+                best[page_number] = (text, confidence)
+            if confidence < OCR_MIN_CONFIDENCE:
+                unresolved.append(page_number)
+        record_backend(backend, len(pending), len(pending) - len(unresolved), seconds)
+        pending = unresolved
+    
+    if any(page is None for page in best):
+        return None, last_error or 'No OCR backend available for this file'
+    return PAGE_SEPARATOR.join(text for text, _ in best), None
+
+def scan_anchors(text, text_lower=None):
+    """Find where each field label first appears so extractors skip absent fields"""
+    if not text.isascii():
+        # Unicode case folding can change lengths, so positions come from the regex itself
+        anchors = {}
+        for match in ANCHOR_RE.finditer(text):
+            anchors.setdefault(match.lastgroup, match.start())
+            if len(anchors) == len(ANCHOR_WORDS):
+                break
+        return anchors
+    
+    text_lower = text.lower() if text_lower is None else text_lower
+    anchors = {}
+    for name, words in ANCHOR_WORDS.items():
+        position = text_lower.find(words[0])
+        if position >= 0 and all(word in text_lower for word in words[1:]):
+            anchors[name] = position
+    return anchors
+
+def search_from(pattern, text, anchors, *names):
+    """Search starting at the earliest anchor a match could begin at"""
+    positions = [anchors[name] for name in names if name in anchors]
+    if not positions:
+        return None
+    return pattern.search(text, min(positions))
+
+def clean_name(match, rejected):
+    """Strip punctuation from a captured name and drop placeholder labels"""
+    name = match.group(1).strip()
+    if name and len(name) > 2 and len(name) < 100:
+        name = NON_WORD_RE.sub('', name).strip()
+        if name and name.upper() not in rejected:
+            return name
+    return None
+
+def extract_vin(text, anchors=None):
     """Extract VIN (17-character code)"""
-    matches = re.findall(VIN_PATTERN, text, re.IGNORECASE)
-    if matches:
-        return matches[0].upper()
+    match = VIN_RE.search(text)
+    if match:
+        return match.group(0).upper()
     return None
 
-def extract_buyer_name(text):
+def extract_buyer_name(text, anchors=None):
     """Extract buyer name from 'Sold To:' field"""
-    patterns = [
-        r'Sold\s+To[:\s]+([^\n]+?)(?:\nEmail|City|Address|$)',
-        r'Sold\s+To[:\s]+([A-Za-z\s]+?)(?:\n|$)',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+    anchors = scan_anchors(text) if anchors is None else anchors
+    for pattern in BUYER_PATTERNS:
+        match = search_from(pattern, text, anchors, 'sold_to')
         if match:
-            name = match.group(1).strip()
-            if name and len(name) > 2 and len(name) < 100:
-                name = re.sub(r'[^\w\s]', '', name).strip()
-                if name and name.upper() not in ['INFORMATION', 'DETAILS', 'CUSTOMER']:
-                    return name
+            name = clean_name(match, ('INFORMATION', 'DETAILS', 'CUSTOMER'))
+            if name:
+                return name
     return None
 
-def extract_seller_name(text):
+def extract_seller_name(text, anchors=None):
     """Extract seller/dealer name from 'We Own:' field"""
-    patterns = [
-        r'We\s+Own[:\s]+([^\n]+?)(?:\n|Dealer|Address|$)',
-        r'We\s+Own[:\s]+([A-Za-z\s]+?)(?:\n|$)',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+    anchors = scan_anchors(text) if anchors is None else anchors
+    for pattern in SELLER_PATTERNS:
+        match = search_from(pattern, text, anchors, 'we_own')
         if match:
-            name = match.group(1).strip()
-            if name and len(name) > 2 and len(name) < 100:
-                name = re.sub(r'[^\w\s]', '', name).strip()
-                if name and name.upper() not in ['INFORMATION', 'DETAILS', 'DEAL']:
-                    return name
+            name = clean_name(match, ('INFORMATION', 'DETAILS', 'DEAL'))
+            if name:
+                return name
     return None
 
-def extract_date(text):
+def extract_date(text, anchors=None):
     """Extract purchase date"""
-    patterns = [
-        r'Purchase\s+Date[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-        r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-        r'(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{4}'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(1)
+    anchors = scan_anchors(text) if anchors is None else anchors
+    match = (
+        search_from(PURCHASE_DATE_RE, text, anchors, 'purchase_date')
+        or DATE_RE.search(text)
+        or MONTH_DATE_RE.search(text)
+    )
+    if match:
+        return match.group(1)
     return None
 
-def extract_amount(text):
+def extract_amount(text, anchors=None):
     """Extract only the amount with $ sign"""
-    pattern = r'\$\s*([\d,]+\.?\d*)'
-    match = re.search(pattern, text)
+    anchors = scan_anchors(text) if anchors is None else anchors
+    match = search_from(AMOUNT_RE, text, anchors, 'dollar')
     if match:
         return match.group(0).strip()
     return None
 
-def extract_odometer(text):
+def extract_odometer(text, anchors=None):
     """Extract odometer reading with 'miles' suffix"""
-    patterns = [
-        r'Odometer\s+Reading[:\s]+([0-9,]+)\s*(?:miles|mi)?',
-        r'(?:Odometer|Mileage)[:\s]+([0-9,]+)\s*(?:miles|mi)?',
-        r'([0-9,]+)\s+miles',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    anchors = scan_anchors(text) if anchors is None else anchors
+    candidates = (
+        (ODOMETER_READING_RE, ('odometer',)),
+        (ODOMETER_LABEL_RE, ('odometer', 'mileage')),
+        (MILES_RE, ('miles',)),
+    )
+    
+    for pattern, names in candidates:
+        if names == ('miles',):
+            # The number precedes 'miles', so only use the anchor as a presence check
+            match = pattern.search(text) if 'miles' in anchors else None
+        else:
+            match = search_from(pattern, text, anchors, *names)
         if match:
             odometer = match.group(1).replace(',', '').strip()
             if len(odometer) > 2 and len(odometer) < 8:
                 return f"{odometer} miles"
     return None
 
-def identify_document_type(text):
+def identify_document_type(text, text_lower=None):
     """Identify type of document"""
-    text_lower = text.lower()
-    for doc_type, keywords in DOCUMENT_TYPES.items():
-        for keyword in keywords:
-            if keyword in text_lower:
-                return doc_type
+    text_lower = text.lower() if text_lower is None else text_lower
+    for keyword, doc_type in DOCUMENT_TYPE_KEYWORDS:
+        if keyword in text_lower:
+            return doc_type
     return 'unknown'
 
+@timed_stage('parse')
 def parse_vehicle_data(text):
     """Parse extracted text to find vehicle-related data"""
     try:
+        text_lower = text.lower()
+        anchors = scan_anchors(text, text_lower)
         return {
-            'vin': extract_vin(text),
-            'buyer_name': extract_buyer_name(text),
-            'seller_name': extract_seller_name(text),
-            'sale_date': extract_date(text),
-            'sale_amount': extract_amount(text),
-            'odometer_reading': extract_odometer(text),
-            'document_type': identify_document_type(text)
+            'vin': extract_vin(text, anchors),
+            'buyer_name': extract_buyer_name(text, anchors),
+            'seller_name': extract_seller_name(text, anchors),
+            'sale_date': extract_date(text, anchors),
+            'sale_amount': extract_amount(text, anchors),
+            'odometer_reading': extract_odometer(text, anchors),
+            'document_type': identify_document_type(text, text_lower)
         }
     except Exception as e:
+        PARSE_ERRORS.inc()
         return {}
 
-def process_document(file_path):
-    """Main function to process a document"""
-    extracted_text, error = extract_text_from_image(file_path)
+def parse_amount_cents(sale_amount):
+    """'$12,500.00' -> 1250000"""
+    if not sale_amount:
+        return None
+    try:
+        amount = Decimal(sale_amount.replace('$', '').replace(',', '').strip().rstrip('.'))
+    except InvalidOperation:
+        return None
+    # Out of range would fail the whole OCR batch's commit, not just this field
+    if not amount.is_finite() or abs(amount) * 100 > MAX_AMOUNT_CENTS:
+        return None
+    return int((amount * 100).quantize(Decimal(1)))
+
+def parse_sale_date(sale_date):
+    """'03/15/2024' or '3-15-24' (month first) -> date"""
+    if not sale_date:
+        return None
+    parts = re.split(r'[/-]', sale_date)
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        return None
     
+    month, day, year = (int(part) for part in parts)
+    if len(parts[2]) == 2:
+        year += 1900 if year >= 70 else 2000
+    elif len(parts[2]) != 4:
+        return None
+    try:
+        return datetime(year, month, day).date()
+    except ValueError:
+        return None
+
+def parse_odometer_miles(odometer_reading):
+    """'45000 miles' -> 45000"""
+    if not odometer_reading:
+        return None
+    digits = odometer_reading.split()[0]
+    if not digits.isdecimal() or int(digits) > MAX_ODOMETER_MILES:
+        return None
+    return int(digits)
+
+def typed_fields(extracted_data):
+    """Numeric/date columns derived from the extracted display strings"""
+    return {
+        'sale_amount_cents': parse_amount_cents(extracted_data.get('sale_amount')),
+        'sale_date_value': parse_sale_date(extracted_data.get('sale_date')),
+        'odometer_miles': parse_odometer_miles(extracted_data.get('odometer_reading'))
+    }
+
+def build_result(extracted_text, error):
+    """process_document result for OCR text or an OCR error"""
     if error:
         return {
             'success': False,
@@ -178,5 +657,23 @@ def process_document(file_path):
         'error': None,
         'extracted_text': extracted_text,
         'extracted_data': extracted_data,
+        'parser_version': PARSER_VERSION,
         'processed_at': datetime.utcnow().isoformat()
-    }
\ No newline at end of file
+    }
+
+def process_document(file_path):
+    """Main function to process a document
+    
+    The result's 'preprocess' reports the images sent to OCR backends, the bytes saved against
+    uploaded originals (PDF pages have none; see benchmarks/bench_preprocess.py) and the time taken.
+    """
+    report = {'images': 0, 'bytes_sent': 0, 'bytes_saved': 0, 'seconds': 0.0}
+    token = _preprocess_report.set(report)
+    try:
+        extracted_text, error = extract_text(file_path)
+    finally:
+        _preprocess_report.reset(token)
+    
+    result = build_result(extracted_text, error)
+    result['preprocess'] = {**report, 'seconds': round(report['seconds'], 4)}
+    return result
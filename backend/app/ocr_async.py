@@ -0,0 +1,185 @@
+"""Asyncio OCR path: bounded concurrency, quota rate limiting, timeouts and retries for Vision calls"""
+import os
+import time
+import random
+import asyncio
+import threading
+from app import ocr
+from app.metrics import stage_timer, VISION_IN_FLIGHT
+
+def default_vision_processes():
+    """Processes running OCR, going by the worker settings
+
+    Thread-mode pools run inside every gunicorn worker (WEB_CONCURRENCY is gunicorn's
+    default -w), process mode starts OCR_WORKERS processes per app. Standalone worker.py
+    deployments should set VISION_PROCESSES to the number of worker processes.
+    """
+    web = int(os.getenv('WEB_CONCURRENCY', '1'))
+    mode = os.getenv('OCR_WORKER_MODE', 'thread')
+    if mode == 'process':
+        return web * int(os.getenv('OCR_WORKERS', '4'))
+    return web if mode == 'thread' else 1
+
+# Process-wide limits shared by every thread that goes through run_sync
+VISION_CONCURRENCY = int(os.getenv('VISION_CONCURRENCY', '32'))
+# Vision's default quota is 1800 requests/minute per project. VISION_RATE_LIMIT is that project-wide
+# rate; every process has its own bucket, so each gets an equal share of it
+VISION_PROCESSES = max(1, int(os.getenv('VISION_PROCESSES', str(default_vision_processes()))))
+VISION_RATE_LIMIT = float(os.getenv('VISION_RATE_LIMIT', '30'))
+VISION_PROCESS_RATE_LIMIT = VISION_RATE_LIMIT / VISION_PROCESSES
+VISION_RATE_BURST = int(os.getenv('VISION_RATE_BURST', str(max(1, int(VISION_PROCESS_RATE_LIMIT)))))
+VISION_TIMEOUT = float(os.getenv('VISION_TIMEOUT', '60'))
+VISION_MAX_RETRIES = int(os.getenv('VISION_MAX_RETRIES', '3'))
+VISION_RETRY_BACKOFF = float(os.getenv('VISION_RETRY_BACKOFF', '0.5'))
+
+TRANSIENT_ERRORS = (asyncio.TimeoutError, ConnectionError)
+try:
+    from google.api_core import exceptions as api_exceptions
+    TRANSIENT_ERRORS += (
+        api_exceptions.ServiceUnavailable,
+        api_exceptions.DeadlineExceeded,
+        api_exceptions.InternalServerError,
+        api_exceptions.TooManyRequests,
+        api_exceptions.Aborted,
+    )
+except ImportError:
+    pass
+
+class TokenBucket:
+    """Async token bucket: rate tokens per second, at most burst saved up"""
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+    
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class AsyncVisionClient:
+    """Vision batch_annotate_images behind a semaphore, token bucket, per-call timeout and retries"""
+    def __init__(self, client=None, concurrency=VISION_CONCURRENCY, rate=VISION_PROCESS_RATE_LIMIT,
+                 burst=VISION_RATE_BURST, timeout=VISION_TIMEOUT, max_retries=VISION_MAX_RETRIES):
+        self.client = client if client is not None else ocr.create_vision_client(async_client=True)
+        # Sync clients (or anything without a coroutine method) run on the default executor
+        self.native = asyncio.iscoroutinefunction(self.client.batch_annotate_images)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.calls = 0
+        self.retries = 0
+    
+    async def _call(self, requests):
+        if self.native:
+            return await self.client.batch_annotate_images(requests=requests)
+        return await asyncio.to_thread(self.client.batch_annotate_images, requests=requests)
+    
+    async def batch_annotate_images(self, requests):
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                async with self.semaphore:
+                    self.calls += 1
+                    with stage_timer('vision'), VISION_IN_FLIGHT.track():
+                        return await asyncio.wait_for(self._call(requests), self.timeout)
+            except TRANSIENT_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                # Exponential backoff with jitter so throttled callers do not retry in lockstep
+                await asyncio.sleep(VISION_RETRY_BACKOFF * 2 ** attempt * (0.5 + random.random()))
+
+async def annotate_images_async(images, client):
+    """Document text detection on images, every Vision batch in flight at once (texts, error)"""
+    vision = ocr.get_vision()
+    feature = vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)
+    batches = [
+        [vision.AnnotateImageRequest(image=vision.Image(content=content), features=[feature]) for content in batch]
+        for batch in ocr.chunk_images(images)
+    ]
+    responses = await asyncio.gather(*(client.batch_annotate_images(batch) for batch in batches))
+    
+    texts = []
+    for response in responses:
+        for page_response in response.responses:
+            if page_response.error.message:
+                return None, page_response.error.message
+            texts.append(page_response.full_text_annotation.text)
+    return texts, None
+
+async def extract_pages_async(file_path, page_numbers, client=None):
+    """Vision text for PDF pages (or an image); batches are rendered off-loop and annotated concurrently (texts, error)"""
+    client = client or get_client()
+    try:
+        if not file_path.lower().endswith('.pdf'):
+            content = await asyncio.to_thread(ocr.load_image_content, file_path)
+            return await annotate_images_async([content], client)
+        
+        page_numbers = list(page_numbers)
+        
+        async def render_and_annotate(batch):
+            images, error = await asyncio.to_thread(ocr.convert_pdf_to_images, file_path, batch)
+            if error:
+                return None, error
+            return await annotate_images_async(images, client)
+        
+        results = await asyncio.gather(*(
+            render_and_annotate(page_numbers[start:start + ocr.VISION_BATCH_SIZE])
+            for start in range(0, len(page_numbers), ocr.VISION_BATCH_SIZE)
+        ))
+        texts = []
+        for page_texts, error in results:
+            if error:
+                return None, error
+            texts.extend(page_texts)
+        return texts, None
+    
+    except Exception as e:
+        # Timeouts stringify to '', keep the job's last_error useful
+        return None, str(e) or type(e).__name__
+
+# One event loop per process, shared by the synchronous OCR workers
+_loop = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+_client = None
+
+def get_loop():
+    """Background event loop for this process (recreated after fork)"""
+    global _loop, _loop_pid, _client
+    with _loop_lock:
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            _client = None
+            threading.Thread(target=_loop.run_forever, name='ocr-event-loop', daemon=True).start()
+        return _loop
+
+def get_client():
+    """Shared limiter-wrapped client, built on the loop it is used from"""
+    global _client
+    if _client is None:
+        _client = AsyncVisionClient()
+    return _client
+
+def set_client(client):
+    """Swap the shared client, e.g. for a fake_vision client in tests and load benchmarks"""
+    global _client
+    get_loop()
+    _client = client
+
+def run_sync(coro):
+    """Run a coroutine on the shared loop from a worker thread and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
@@ -0,0 +1,173 @@
+"""Content-addressed OCR result cache keyed by SHA-256 of the file bytes"""
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from sqlalchemy import func
+from app import db
+from app.models import OcrResult, insert_ignore
+from app.ocr import PARSER_VERSION, parse_vehicle_data, process_document
+from app.storage import local_copy
+
+OCR_CACHE_MAX_BYTES = int(os.getenv('OCR_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+HASH_CHUNK_SIZE = 1024 * 1024
+
+stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+def _count(key):
+    with _stats_lock:
+        stats[key] += 1
+
+def hash_file(file_path):
+    """SHA-256 of a file, streamed in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_cached_result(content_hash, touch=True):
+    """Cached process_document result for these bytes, or None
+
+    touch=False only reads, so callers batching their writes can record the hit later
+    with record_results.
+    """
+    entry = db.session.get(OcrResult, content_hash)
+    if not entry:
+        _count('misses')
+        return None
+    
+    _count('hits')
+    if touch:
+        touch_results([content_hash])
+    
+    if entry.parser_version == PARSER_VERSION:
+        extracted_data = json.loads(entry.extracted_data or '{}')
+    else:
+        # Cached by an older parser: the OCR text is still good, the fields may not be
+        extracted_data = parse_vehicle_data(entry.extracted_text or '')
+    
+    return {
+        'success': True,
+        'error': None,
+        'extracted_text': entry.extracted_text,
+        'extracted_data': extracted_data,
+        'parser_version': PARSER_VERSION,
+        'processed_at': entry.created_at.isoformat(),
+        'cached': True
+    }
+
+def touch_results(content_hashes):
+    """Count cache hits and refresh LRU order, one UPDATE per distinct hit count (caller commits)"""
+    counts = {}
+    for content_hash in content_hashes:
+        counts[content_hash] = counts.get(content_hash, 0) + 1
+    
+    by_count = {}
+    for content_hash, count in counts.items():
+        by_count.setdefault(count, []).append(content_hash)
+    
+    now = datetime.utcnow()
+    for count, hashes in by_count.items():
+        OcrResult.query.filter(OcrResult.content_hash.in_(hashes)).update({
+            'hits': OcrResult.hits + count,
+            'last_used_at': now
+        }, synchronize_session=False)
+
+def store_result(content_hash, ocr_result):
+    """Cache a successful process_document result (caller commits)"""
+    extracted_text = ocr_result['extracted_text'] or ''
+    extracted_data = json.dumps(ocr_result['extracted_data'] or {})
+    now = datetime.utcnow()
+    
+    insert_ignore(OcrResult, {
+        'content_hash': content_hash,
+        'extracted_text': extracted_text,
+        'extracted_data': extracted_data,
+        'parser_version': ocr_result.get('parser_version'),
+        'size_bytes': len(extracted_text.encode('utf-8')) + len(extracted_data),
+        'hits': 0,
+        'created_at': now,
+        'last_used_at': now
+    })
+
+def evict(max_bytes=OCR_CACHE_MAX_BYTES):
+    """Drop least recently used entries until the cache fits in max_bytes"""
+    total = db.session.query(func.coalesce(func.sum(OcrResult.size_bytes), 0)).scalar()
+    if total <= max_bytes:
+        return 0
+    
+    evicted = 0
+    while total > max_bytes:
+        oldest = db.session.query(OcrResult.content_hash, OcrResult.size_bytes).order_by(OcrResult.last_used_at).limit(500).all()
+        if not oldest:
+            break
+        
+        doomed = []
+        for content_hash, size_bytes in oldest:
+            if total <= max_bytes:
+                break
+            doomed.append(content_hash)
+            total -= size_bytes or 0
+        
+        evicted += OcrResult.query.filter(OcrResult.content_hash.in_(doomed)).delete(synchronize_session=False)
+    return evicted
+
+def lookup_or_process(file_path, content_hash=None):
+    """Cached result or a fresh OCR run, without writing to the database
+
+    The result carries content_hash and cached; pass it to record_results in the
+    transaction that applies it. Remote files are only fetched on a cache miss.
+    """
+    ocr_result = get_cached_result(content_hash, touch=False) if content_hash else None
+    if ocr_result is None:
+        with local_copy(file_path) as path:
+            if not content_hash:
+                content_hash = hash_file(path)
+                ocr_result = get_cached_result(content_hash, touch=False)
+            ocr_result = ocr_result or process_document(path)
+    ocr_result['content_hash'] = content_hash
+    return ocr_result
+
+def record_results(ocr_results):
+    """Write hits and new successful results for a batch of lookups (caller commits)
+
+    Returns True when new entries were stored and the cache may need evicting.
+    """
+    touch_results([r['content_hash'] for r in ocr_results if r.get('cached')])
+    stored = False
+    for ocr_result in ocr_results:
+        if ocr_result['success'] and not ocr_result.get('cached'):
+            store_result(ocr_result['content_hash'], ocr_result)
+            stored = True
+    return stored
+
+def process_document_cached(file_path, content_hash=None):
+    """process_document with the content-hash cache in front"""
+    ocr_result = lookup_or_process(file_path, content_hash)
+    record_results([ocr_result])
+    return ocr_result
+
+def get_stats():
+    """Hit/miss counters for this process plus cache size"""
+    entries, size_bytes, total_hits = db.session.query(
+        func.count(OcrResult.content_hash),
+        func.coalesce(func.sum(OcrResult.size_bytes), 0),
+        func.coalesce(func.sum(OcrResult.hits), 0)
+    ).one()
+    
+    with _stats_lock:
+        hits, misses = stats['hits'], stats['misses']
+    lookups = hits + misses
+    
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+        'entries': entries,
+        'size_bytes': size_bytes,
+        'max_bytes': OCR_CACHE_MAX_BYTES,
+        'total_hits': total_hits
+    }
@@ -0,0 +1,28 @@
+"""Password hashing policy: configurable werkzeug method, with stored hashes upgraded on login"""
+import os
+from functools import lru_cache
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Any werkzeug method string, e.g. scrypt:16384:8:1 or pbkdf2:sha256:600000.
+# scrypt:32768:8:1 (werkzeug's default) costs ~0.1s of CPU per login on one core.
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+PASSWORD_SALT_LENGTH = int(os.getenv('PASSWORD_SALT_LENGTH', '16'))
+
+@lru_cache(maxsize=None)
+def method_prefix(method):
+    """Fully expanded method string werkzeug stores in front of the salt (e.g. 'pbkdf2' -> 'pbkdf2:sha256:1000000')"""
+    return generate_password_hash('', method, salt_length=1).split('$', 1)[0]
+
+def hash_password(password, method=None):
+    """Hash a password with the configured policy"""
+    return generate_password_hash(password, method or PASSWORD_HASH_METHOD, salt_length=PASSWORD_SALT_LENGTH)
+
+def needs_rehash(password_hash, method=None):
+    """Stored hash was made with a different method or cost than the current policy"""
+    return password_hash.split('$', 1)[0] != method_prefix(method or PASSWORD_HASH_METHOD)
+
+def verify_password(password_hash, password):
+    """Check a password, returns (ok, needs_rehash)"""
+    if not check_password_hash(password_hash, password):
+        return False, False
+    return True, needs_rehash(password_hash)
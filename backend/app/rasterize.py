@@ -0,0 +1,122 @@
+"""PDF page rasterization and OCR image preprocessing, fanned out over a process pool"""
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+OCR_RASTER_WORKERS = int(os.getenv('OCR_RASTER_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# Images are preprocessed for OCR: pages render at the requested DPI and photos keep their own
+# resolution, both scaled down to at most OCR_MAX_PIXELS, in grayscale, re-encoded at
+# OCR_JPEG_QUALITY. OCR_PREPROCESS=0 restores full-colour renders and raw uploads.
+OCR_PREPROCESS = os.getenv('OCR_PREPROCESS', 'true').lower() in ('1', 'true', 'yes')
+OCR_GRAYSCALE = os.getenv('OCR_GRAYSCALE', 'true').lower() in ('1', 'true', 'yes')
+OCR_JPEG_QUALITY = int(os.getenv('OCR_JPEG_QUALITY', '80'))
+# About a US Letter page at 300 DPI; Vision gains nothing from more
+OCR_MAX_PIXELS = int(os.getenv('OCR_MAX_PIXELS', '8500000'))
+MIN_JPEG_QUALITY = 40
+# Vision rejects requests over 10 MB and base64 adds a third, so one image must stay under this
+VISION_MAX_IMAGE_BYTES = 7 * 1024 * 1024
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+def get_page_count(pdf_path):
+    """Number of pages in a PDF"""
+    import fitz
+    with fitz.open(pdf_path) as pdf_document:
+        return pdf_document.page_count
+
+def limit_zoom(width, height, zoom, max_pixels=OCR_MAX_PIXELS):
+    """zoom, reduced so a width x height rect renders to at most max_pixels"""
+    pixels = width * height * zoom * zoom
+    if max_pixels and pixels > max_pixels:
+        zoom *= (max_pixels / pixels) ** 0.5
+    return zoom
+
+def encode_jpeg(pix, quality=OCR_JPEG_QUALITY, max_bytes=VISION_MAX_IMAGE_BYTES):
+    """JPEG bytes within max_bytes, lowering quality and then halving the resolution as needed"""
+    while True:
+        content = pix.tobytes("jpeg", jpg_quality=quality)
+        if len(content) <= max_bytes or min(pix.width, pix.height) < 64:
+            return content
+        if quality > MIN_JPEG_QUALITY:
+            quality = max(MIN_JPEG_QUALITY, quality - 20)
+        else:
+            pix.shrink(1)
+
+def render_ocr_image(page, zoom):
+    """Render a page (or an opened image) for OCR at zoom, preprocessed unless OCR_PREPROCESS=0"""
+    import fitz
+    if not OCR_PREPROCESS:
+        return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom)).tobytes("jpeg")
+    
+    zoom = limit_zoom(page.rect.width, page.rect.height, zoom, OCR_MAX_PIXELS)
+    colorspace = fitz.csGRAY if OCR_GRAYSCALE else fitz.csRGB
+    return encode_jpeg(page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace), OCR_JPEG_QUALITY)
+
+def render_page(pdf_path, page_number, dpi):
+    """Render one PDF page to JPEG bytes"""
+    import fitz
+    with fitz.open(pdf_path) as pdf_document:
+        return render_ocr_image(pdf_document[page_number], dpi / 72)
+
+def prepare_image(image_path):
+    """Uploaded JPEG/PNG as OCR input bytes
+    
+    Photos are never scaled up; the original is kept when preprocessing would not make it smaller.
+    """
+    with open(image_path, 'rb') as image_file:
+        original = image_file.read()
+    if not OCR_PREPROCESS:
+        return original
+    
+    import fitz
+    with fitz.open(image_path) as image_document:
+        page = image_document[0]
+        # The page rect is in points at the image's DPI; zoom to its native pixels instead
+        info = page.get_image_info()
+        native = info[0]['width'] / page.rect.width if info and page.rect.width else 1
+        content = render_ocr_image(page, native)
+    if len(original) <= len(content) and len(original) <= VISION_MAX_IMAGE_BYTES:
+        return original
+    return content
+
+def get_executor():
+    """Per-process render pool (recreated after fork)"""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            # spawn, not fork: the parent runs threaded OCR workers
+            _executor = ProcessPoolExecutor(
+                max_workers=OCR_RASTER_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+def render_pages(pdf_path, page_numbers, dpi):
+    """Render several pages concurrently, returns JPEG bytes in page order"""
+    page_numbers = list(page_numbers)
+    if OCR_RASTER_WORKERS <= 1 or len(page_numbers) <= 1:
+        return [render_page(pdf_path, n, dpi) for n in page_numbers]
+    
+    executor = get_executor()
+    futures = [executor.submit(render_page, pdf_path, n, dpi) for n in page_numbers]
+    return [future.result() for future in futures]
+
+def load_image(image_path):
+    """prepare_image on the render pool, keeping large photo decodes off the worker threads"""
+    if OCR_RASTER_WORKERS <= 1:
+        return prepare_image(image_path)
+    return get_executor().submit(prepare_image, image_path).result()
+
+def render_thumbnail(file_path, page_number, width, quality=80):
+    """Render one page (or an image) scaled to width pixels as JPEG bytes"""
+    import fitz
+    with fitz.open(file_path) as pdf_document:
+        page = pdf_document[page_number]
+        zoom = width / page.rect.width
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        return pix.tobytes("jpeg", jpg_quality=quality)
@@ -0,0 +1,150 @@
+"""Offline re-extraction: reparse stored OCR text with the current parser, without calling Vision
+
+Documents record the PARSER_VERSION that filled their fields. 'flask reextract' walks completed
+documents with an older (or no) version in id order, parses their text on a process pool and
+writes the fields back with one executemany UPDATE per batch, committing as it goes. Rewritten
+rows carry the current version, so an interrupted run resumes by simply running again.
+"""
+import os
+import time
+import click
+import multiprocessing
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import func, or_, update
+from app import db
+from app.models import Document, DocumentText
+from app.ocr import PARSER_VERSION, parse_vehicle_data, typed_fields
+from app.stats import apply_changes, contribution
+from app.vin import link_vehicle
+
+REEXTRACT_BATCH_SIZE = int(os.getenv('REEXTRACT_BATCH_SIZE', '1000'))
+REEXTRACT_WORKERS = int(os.getenv('REEXTRACT_WORKERS', str(os.cpu_count() or 1)))
+
+# Every column parse_texts produces, plus what contribution() reads to move the rollup
+COLUMNS = (
+    Document.id, Document.uploaded_by, Document.uploaded_at, Document.processed_at, Document.status,
+    Document.vin, Document.buyer_name, Document.seller_name, Document.sale_date, Document.sale_amount,
+    Document.odometer_reading, Document.document_type,
+    Document.sale_amount_cents, Document.sale_date_value, Document.odometer_miles
+)
+
+def stale_filter():
+    return or_(Document.parser_version.is_(None), Document.parser_version != PARSER_VERSION)
+
+def fetch_batch(after_id, batch_size):
+    """Next batch of stale completed documents past after_id, with their text"""
+    return db.session.query(*COLUMNS, DocumentText.extracted_text).join(
+        DocumentText, DocumentText.document_id == Document.id
+    ).filter(
+        Document.id > after_id,
+        Document.status == 'completed',
+        stale_filter()
+    ).order_by(Document.id).limit(batch_size).all()
+
+def count_stale(after_id=0):
+    return db.session.query(func.count(Document.id)).join(
+        DocumentText, DocumentText.document_id == Document.id
+    ).filter(
+        Document.id > after_id,
+        Document.status == 'completed',
+        stale_filter()
+    ).scalar()
+
+def parse_texts(texts):
+    """Extracted fields plus typed columns for each text (runs in pool workers)"""
+    parsed = []
+    for text in texts:
+        data = parse_vehicle_data(text or '')
+        parsed.append({**data, **typed_fields(data)})
+    return parsed
+
+def submit_batch(executor, rows, chunks):
+    """Start parsing a batch, returns a callable that waits for the results"""
+    texts = [row.extracted_text for row in rows]
+    if executor is None:
+        return lambda: parse_texts(texts)
+    
+    size = -(-len(texts) // chunks)
+    futures = [executor.submit(parse_texts, texts[i:i + size]) for i in range(0, len(texts), size)]
+    return lambda: [fields for future in futures for fields in future.result()]
+
+def write_batch(rows, parsed):
+    """Write reparsed fields back and move rollups and vehicle links, returns rows changed (caller commits)"""
+    updates, moves, changed = [], [], 0
+    for row, fields in zip(rows, parsed):
+        before = row._asdict()
+        after = SimpleNamespace(**{**before, **fields})
+        updates.append({'id': row.id, **fields, 'parser_version': PARSER_VERSION})
+        moves.append((contribution(row), contribution(after)))
+        if after.vin != row.vin:
+            link_vehicle(after)
+        if any(before[name] != value for name, value in fields.items()):
+            changed += 1
+    
+    db.session.execute(update(Document), updates)
+    apply_changes(moves)
+    return changed
+
+def reextract(batch_size=REEXTRACT_BATCH_SIZE, workers=REEXTRACT_WORKERS, after_id=0, limit=None, progress=None):
+    """Reparse every stale document past after_id, returns (rows, changed)
+    
+    Parsing batch n+1 overlaps writing batch n, so at most two batches are held in memory.
+    progress(rows, changed, last_id) is called after each commit.
+    """
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    
+    done, changed, fetched, last_id, pending = 0, 0, 0, after_id, None
+    try:
+        while True:
+            size = batch_size if limit is None else min(batch_size, limit - fetched)
+            rows = fetch_batch(last_id, size) if size > 0 else []
+            upcoming = None
+            if rows:
+                upcoming = (rows, submit_batch(executor, rows, workers))
+                fetched += len(rows)
+                last_id = rows[-1].id
+            
+            if pending:
+                pending_rows, results = pending
+                changed += write_batch(pending_rows, results())
+                db.session.commit()
+                done += len(pending_rows)
+                if progress:
+                    progress(done, changed, pending_rows[-1].id)
+            
+            if not upcoming:
+                return done, changed
+            pending = upcoming
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+@click.command('reextract')
+@click.option('--batch-size', default=REEXTRACT_BATCH_SIZE, show_default=True, help='Documents per read and UPDATE')
+@click.option('--workers', default=REEXTRACT_WORKERS, show_default=True, help='Parser processes, 1 parses in-process')
+@click.option('--after-id', default=0, help='Skip documents up to this id, e.g. the last id of an interrupted run')
+@click.option('--limit', type=int, help='Stop after this many documents')
+def reextract_command(batch_size, workers, after_id, limit):
+    """Reparse stored OCR text of documents extracted by an older parser version"""
+    total = count_stale(after_id)
+    if limit is not None:
+        total = min(total, limit)
+    click.echo(f'{total} documents to reparse with parser version {PARSER_VERSION}')
+    if not total:
+        return
+    
+    start = time.perf_counter()
+    
+    def report(done, changed, last_id):
+        elapsed = time.perf_counter() - start
+        rate = done / elapsed if elapsed else 0
+        remaining = (total - done) / rate if rate else 0
+        click.echo(f'{done}/{total} reparsed, {changed} changed, {rate:.0f} docs/s, '
+                   f'~{remaining:.0f}s left, last id {last_id}')
+    
+    done, changed = reextract(batch_size, workers, after_id, limit, report)
+    elapsed = time.perf_counter() - start
+    click.echo(f'Done: {done} reparsed, {changed} changed in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.0f} docs/s)')
@@ -0,0 +1,346 @@
+"""Full-text search over extracted OCR text with pluggable backends"""
+import os
+import re
+import html
+import threading
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.database import read_session
+from app.models import Document, DocumentText
+
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND')  # sqlite, postgresql or like; default from DATABASE_URL
+REINDEX_BATCH_SIZE = 1000
+# Backends mark matches with private control characters; mark_snippet escapes the OCR text first and
+# only then turns them into <mark> tags, so nothing in a scanned document can become markup
+SNIPPET_START, SNIPPET_END = '\x02', '\x03'
+
+QUERY_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+WORD_RE = re.compile(r'\w+')
+
+def parse_query(query):
+    """Split a user query into terms: (text, is_phrase, is_prefix)"""
+    terms = []
+    for phrase, word in QUERY_TOKEN_RE.findall(query or ''):
+        if phrase:
+            words = WORD_RE.findall(phrase)
+            if words:
+                terms.append((' '.join(words), True, False))
+        else:
+            words = WORD_RE.findall(word)
+            for i, part in enumerate(words):
+                # 'smi*' is a prefix query on its last word
+                terms.append((part, False, word.endswith('*') and i == len(words) - 1))
+    return terms
+
+class SearchBackend:
+    """Interface every search backend implements"""
+    name = None
+    
+    def setup(self):
+        """Create and fill the index structures if missing (run by migrations, never at boot)"""
+    
+    def available(self):
+        """Index structures exist in this database (a read, safe at boot)"""
+        return True
+    
+    def index_text(self, doc_id, uploaded_by, body):
+        """Add or refresh one document's text (caller commits)"""
+    
+    def remove_documents(self, doc_ids):
+        """Drop documents from the index (caller commits)"""
+    
+    def search(self, user_id, terms, limit, offset):
+        """Ranked rows for the caller's documents, each with a snippet"""
+        raise NotImplementedError
+    
+    def reindex(self):
+        """Index every processed document, in id order and bounded batches"""
+        last_id, indexed = 0, 0
+        while True:
+            rows = db.session.query(
+                Document.id, Document.uploaded_by, DocumentText.extracted_text
+            ).join(DocumentText, DocumentText.document_id == Document.id).filter(
+                Document.id > last_id,
+                DocumentText.extracted_text.isnot(None)
+            ).order_by(Document.id).limit(REINDEX_BATCH_SIZE).all()
+            if not rows:
+                return indexed
+            for doc_id, uploaded_by, body in rows:
+                self.index_text(doc_id, uploaded_by, body)
+            db.session.commit()
+            indexed += len(rows)
+            last_id = rows[-1][0]
+
+RESULT_COLUMNS = 'd.id, d.original_filename, d.document_type, d.vin, d.status, d.uploaded_at'
+
+def mark_snippet(snippet):
+    """HTML-escaped snippet with its matches wrapped in <mark>"""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>')
+
+def result_row(row):
+    """Raw SQL row to a response dict with an ISO uploaded_at and a safe snippet"""
+    data = dict(row._mapping)
+    data['snippet'] = mark_snippet(data.get('snippet'))
+    uploaded_at = data.get('uploaded_at')
+    if isinstance(uploaded_at, str):
+        # SQLite hands back its stored text form for raw queries
+        data['uploaded_at'] = uploaded_at.replace(' ', 'T', 1)
+    elif uploaded_at is not None:
+        data['uploaded_at'] = uploaded_at.isoformat()
+    return data
+
+# Owner-scoped rows for the FTS5 index to read its text from, rather than keeping its own copy
+SQLITE_FTS_SOURCE = (
+    "SELECT t.document_id AS document_id, 'u' || d.uploaded_by AS owner, t.extracted_text AS extracted_text "
+    "FROM document_text t JOIN document d ON d.id = t.document_id"
+)
+# An external-content index must be told the exact values it indexed to delete them, which
+# only triggers on document_text still have once the text has changed
+SQLITE_FTS_INSERT = (
+    "INSERT INTO document_fts (rowid, owner, extracted_text) "
+    "SELECT new.document_id, 'u' || d.uploaded_by, new.extracted_text FROM document d WHERE d.id = new.document_id;"
+)
+SQLITE_FTS_DELETE = (
+    "INSERT INTO document_fts (document_fts, rowid, owner, extracted_text) "
+    "SELECT 'delete', old.document_id, 'u' || d.uploaded_by, old.extracted_text FROM document d WHERE d.id = old.document_id;"
+)
+SQLITE_FTS_TRIGGERS = {
+    'document_fts_insert': f'AFTER INSERT ON document_text BEGIN {SQLITE_FTS_INSERT} END',
+    'document_fts_delete': f'AFTER DELETE ON document_text BEGIN {SQLITE_FTS_DELETE} END',
+    'document_fts_update': f'AFTER UPDATE OF extracted_text ON document_text BEGIN {SQLITE_FTS_DELETE} {SQLITE_FTS_INSERT} END',
+}
+
+class SQLiteFTSBackend(SearchBackend):
+    """SQLite FTS5 table with the owner as an indexed column, so scoping happens inside the index
+
+    The table is external-content over document_fts_source: it stores only the index, and
+    snippets read the text from document_text. Triggers keep it in step with that table.
+    """
+    name = 'sqlite'
+    
+    def available(self):
+        return bool(db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'document_fts' AND sql LIKE '%document_fts_source%'"
+        )).first())
+    
+    def setup(self):
+        if self.available():
+            return
+        # Tables from before external content kept a second copy of every text
+        db.session.execute(text('DROP TABLE IF EXISTS document_fts'))
+        for name in SQLITE_FTS_TRIGGERS:
+            db.session.execute(text(f'DROP TRIGGER IF EXISTS {name}'))
+        db.session.execute(text(f'CREATE VIEW IF NOT EXISTS document_fts_source AS {SQLITE_FTS_SOURCE}'))
+        db.session.execute(text(
+            "CREATE VIRTUAL TABLE document_fts USING fts5("
+            "owner, extracted_text, content = 'document_fts_source', content_rowid = 'document_id', "
+            "tokenize = 'porter unicode61')"
+        ))
+        for name, body in SQLITE_FTS_TRIGGERS.items():
+            db.session.execute(text(f'CREATE TRIGGER {name} {body}'))
+        # Index every existing row straight from the source view
+        db.session.execute(text("INSERT INTO document_fts (document_fts) VALUES ('rebuild')"))
+        db.session.commit()
+    
+    def index_text(self, doc_id, uploaded_by, body):
+        """Nothing to do: the document_text triggers index the row when it is written"""
+    
+    def remove_documents(self, doc_ids):
+        """Nothing to do: deleting the document_text rows removes them from the index"""
+    
+    @staticmethod
+    def build_match(user_id, terms):
+        parts = []
+        for term, is_phrase, is_prefix in terms:
+            quoted = '"' + term.replace('"', '""') + '"'
+            parts.append(quoted + '*' if is_prefix else quoted)
+        return f'owner : u{user_id} AND (' + ' AND '.join(parts) + ')'
+    
+    def search(self, user_id, terms, limit, offset):
+        rows = read_session().execute(text(
+            f"SELECT {RESULT_COLUMNS}, "
+            f"snippet(document_fts, 1, :start, :end, '…', 16) AS snippet "
+            "FROM document_fts JOIN document d ON d.id = document_fts.rowid "
+            "WHERE document_fts MATCH :match "
+            "ORDER BY rank LIMIT :limit OFFSET :offset"
+        ), {
+            'match': self.build_match(user_id, terms),
+            'start': SNIPPET_START,
+            'end': SNIPPET_END,
+            'limit': limit,
+            'offset': offset
+        })
+        return [result_row(row) for row in rows]
+
+class PostgresSearchBackend(SearchBackend):
+    """tsvector side table with a GIN index, ranked with ts_rank_cd"""
+    name = 'postgresql'
+    
+    def available(self):
+        return db.session.execute(text("SELECT to_regclass('document_search')")).scalar() is not None
+    
+    def setup(self):
+        if self.available():
+            return
+        db.session.execute(text(
+            'CREATE TABLE IF NOT EXISTS document_search ('
+            'document_id integer PRIMARY KEY, uploaded_by integer NOT NULL, tsv tsvector NOT NULL)'
+        ))
+        db.session.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_document_search_tsv ON document_search USING gin (tsv)'
+        ))
+        db.session.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_document_search_owner ON document_search (uploaded_by)'
+        ))
+        db.session.commit()
+        self.reindex()
+    
+    def index_text(self, doc_id, uploaded_by, body):
+        if not body:
+            self.remove_documents([doc_id])
+            return
+        db.session.execute(text(
+            "INSERT INTO document_search (document_id, uploaded_by, tsv) "
+            "VALUES (:id, :owner, to_tsvector('english', :text)) "
+            "ON CONFLICT (document_id) DO UPDATE SET uploaded_by = EXCLUDED.uploaded_by, tsv = EXCLUDED.tsv"
+        ), {'id': doc_id, 'owner': uploaded_by, 'text': body})
+    
+    def remove_documents(self, doc_ids):
+        if doc_ids:
+            db.session.execute(
+                text('DELETE FROM document_search WHERE document_id = ANY(:ids)'),
+                {'ids': list(doc_ids)}
+            )
+    
+    @staticmethod
+    def build_tsquery(terms, params):
+        parts = []
+        for i, (term, is_phrase, is_prefix) in enumerate(terms):
+            params[f't{i}'] = term
+            if is_phrase:
+                parts.append(f"phraseto_tsquery('english', :t{i})")
+            elif is_prefix:
+                parts.append(f"to_tsquery('english', :t{i} || ':*')")
+            else:
+                parts.append(f"plainto_tsquery('english', :t{i})")
+        return ' && '.join(parts)
+    
+    def search(self, user_id, terms, limit, offset):
+        params = {
+            'user_id': user_id,
+            'limit': limit,
+            'offset': offset,
+            'headline_options': f'StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxWords=30, MinWords=10'
+        }
+        tsquery = self.build_tsquery(terms, params)
+        rows = read_session().execute(text(
+            f"SELECT {RESULT_COLUMNS}, "
+            "ts_headline('english', t.extracted_text, q.query, :headline_options) AS snippet "
+            f"FROM document_search s CROSS JOIN (SELECT {tsquery} AS query) q "
+            "JOIN document d ON d.id = s.document_id "
+            "JOIN document_text t ON t.document_id = s.document_id "
+            "WHERE s.uploaded_by = :user_id AND s.tsv @@ q.query "
+            "ORDER BY ts_rank_cd(s.tsv, q.query) DESC, s.document_id DESC "
+            "LIMIT :limit OFFSET :offset"
+        ), params)
+        return [result_row(row) for row in rows]
+
+def escape_like(term):
+    """term with LIKE wildcards matched literally, for patterns using escape='\\'"""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+class LikeSearchBackend(SearchBackend):
+    """Unindexed fallback for databases without a full-text engine"""
+    name = 'like'
+    
+    def search(self, user_id, terms, limit, offset):
+        query = read_session().query(Document, DocumentText.extracted_text).join(
+            DocumentText, DocumentText.document_id == Document.id
+        ).filter(Document.uploaded_by == user_id)
+        for term, is_phrase, is_prefix in terms:
+            query = query.filter(DocumentText.extracted_text.ilike(f'%{escape_like(term)}%', escape='\\'))
+        rows = query.order_by(Document.uploaded_at.desc(), Document.id.desc()).limit(limit).offset(offset).all()
+        
+        results = []
+        for doc, body in rows:
+            results.append({
+                'id': doc.id,
+                'original_filename': doc.original_filename,
+                'document_type': doc.document_type,
+                'vin': doc.vin,
+                'status': doc.status,
+                'uploaded_at': doc.uploaded_at.isoformat(),
+                'snippet': self.snippet(body or '', terms[0][0])
+            })
+        return results
+    
+    @staticmethod
+    def snippet(body, term, width=80):
+        start = body.lower().find(term.lower())
+        if start < 0:
+            return mark_snippet(body[:width])
+        end = start + len(term)
+        return mark_snippet(body[max(0, start - width // 2):start] + SNIPPET_START + body[start:end]
+                            + SNIPPET_END + body[end:end + width // 2])
+
+BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresSearchBackend,
+    'like': LikeSearchBackend,
+}
+
+_backend_lock = threading.Lock()
+
+def configured_backend():
+    """Backend for this database, whether or not its index exists yet"""
+    name = SEARCH_BACKEND or db.engine.dialect.name
+    return BACKENDS.get(name, LikeSearchBackend)()
+
+def setup_search_index():
+    """Create and fill the configured backend's index (migrations and 'flask migrate' only)"""
+    try:
+        configured_backend().setup()
+    except OperationalError as e:
+        # e.g. SQLite built without FTS5; search falls back to LIKE
+        db.session.rollback()
+        current_app.logger.warning('Full-text search index not created (%s)', e)
+
+def get_backend():
+    """Backend for this app, chosen on first use from the index the migrations left
+
+    Not at boot: create_app stays free of schema work, and every gunicorn worker would
+    otherwise race to create and backfill the index.
+    """
+    backend = current_app.extensions.get('search_backend')
+    if backend is None:
+        with _backend_lock:
+            backend = current_app.extensions.get('search_backend')
+            if backend is None:
+                backend = configured_backend()
+                if not backend.available():
+                    current_app.logger.warning('Full-text search index missing, using LIKE search until restart')
+                    backend = LikeSearchBackend()
+                current_app.extensions['search_backend'] = backend
+    return backend
+
+def index_document(doc):
+    """Refresh a document in the search index (caller commits)"""
+    get_backend().index_text(doc.id, doc.uploaded_by, doc.extracted_text)
+
+def remove_documents(doc_ids):
+    """Drop documents from the search index (caller commits)"""
+    get_backend().remove_documents(doc_ids)
+
+def search_documents(user_id, query, limit, offset):
+    """Ranked search over the caller's documents (rows, next_offset)"""
+    terms = parse_query(query)
+    if not terms:
+        return [], None
+    
+    rows = get_backend().search(user_id, terms, limit + 1, offset)
+    next_offset = offset + limit if len(rows) > limit else None
+    return rows[:limit], next_offset
@@ -0,0 +1,89 @@
+"""Fast JSON for API responses: an orjson-backed Flask JSON provider and precomputed row serializers
+
+JSON_PROVIDER=auto (default) uses orjson when it is installed and Flask's json module otherwise;
+'orjson' or 'std' pick one explicitly. Both produce the same values: anything orjson cannot encode
+natively (datetime, Decimal, ...) goes through Flask's default hook, so datetimes left in a
+payload still come out as HTTP dates. orjson writes UTF-8 instead of \\u escapes and, unless
+JSON_SORT_KEYS=1, keeps keys in insertion order.
+"""
+import os
+from operator import methodcaller
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'auto')  # auto, orjson or std
+# Sorting costs orjson more than half its speed; serialized rows already have a fixed key order
+JSON_SORT_KEYS = os.getenv('JSON_SORT_KEYS', 'false').lower() in ('1', 'true', 'yes')
+
+isoformat = methodcaller('isoformat')
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson doing the encoding and decoding"""
+    sort_keys = JSON_SORT_KEYS
+    
+    def option(self, indent=False):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+    
+    def dumps_bytes(self, obj, indent=False):
+        try:
+            return orjson.dumps(obj, default=self.default, option=self.option(indent))
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits and the like: slower, but not an error
+            return super().dumps(obj).encode()
+    
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b'\n', mimetype=self.mimetype)
+
+PROVIDERS = {
+    'std': DefaultJSONProvider,
+    'orjson': OrjsonProvider,
+}
+
+def init_json(app):
+    """Install the JSON_PROVIDER provider, falling back to Flask's when orjson is missing"""
+    name = JSON_PROVIDER
+    if name == 'auto':
+        name = 'orjson' if orjson else 'std'
+    if name == 'orjson' and orjson is None:
+        app.logger.warning('JSON_PROVIDER=orjson but orjson is not installed, using the standard json module')
+        name = 'std'
+    app.json = PROVIDERS.get(name, DefaultJSONProvider)(app)
+    return app.json
+
+class RowSerializer:
+    """Turns column-query rows into dicts, with keys and conversions worked out once up front"""
+    def __init__(self, keys, converters=None):
+        self.keys = tuple(keys)
+        # {key: function} applied to non-null values, e.g. isoformat for dates
+        self.converters = dict(converters or {})
+    
+    def many(self, rows):
+        keys = self.keys
+        items = [dict(zip(keys, row)) for row in rows]
+        # Column by column: one lookup per converted value instead of a type check per value
+        for key, convert in self.converters.items():
+            for item in items:
+                value = item[key]
+                if value is not None:
+                    item[key] = convert(value)
+        return items
+    
+    def one(self, row):
+        return self.many((row,))[0]
@@ -0,0 +1,189 @@
+"""Dealer dashboard statistics served from an incrementally maintained daily rollup"""
+from datetime import date
+from sqlalchemy import func, tuple_
+from app import db
+from app.database import read_session
+from app.models import DealerDailyRollup, Document
+
+ROLLUP_KEYS = ('uploaded_by', 'day', 'status', 'document_type', 'sale_month')
+ROLLUP_MEASURES = ('doc_count', 'sale_count', 'sale_amount_cents', 'latency_count', 'latency_ms')
+
+def contribution(doc):
+    """What one document adds to the rollup in its current state (key, measures)"""
+    if doc.uploaded_by is None or doc.uploaded_at is None:
+        return None
+    
+    latency_ms = None
+    if doc.processed_at:
+        latency_ms = int((doc.processed_at - doc.uploaded_at).total_seconds() * 1000)
+    
+    key = (
+        doc.uploaded_by,
+        doc.uploaded_at.date(),
+        doc.status or 'pending',
+        doc.document_type or '',
+        doc.sale_date_value.strftime('%Y-%m') if doc.sale_date_value else ''
+    )
+    measures = (
+        1,
+        1 if doc.sale_amount_cents is not None else 0,
+        doc.sale_amount_cents or 0,
+        1 if latency_ms is not None else 0,
+        latency_ms or 0
+    )
+    return key, measures
+
+def add_to_rollup(key, measures, sign=1):
+    """Upsert-increment one rollup bucket (caller commits)"""
+    values = dict(zip(ROLLUP_KEYS, key))
+    values.update({name: sign * value for name, value in zip(ROLLUP_MEASURES, measures)})
+    
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        row = db.session.get(DealerDailyRollup, key)
+        if not row:
+            row = DealerDailyRollup(**{name: values[name] for name in ROLLUP_KEYS})
+            for name in ROLLUP_MEASURES:
+                setattr(row, name, 0)
+            db.session.add(row)
+        for name in ROLLUP_MEASURES:
+            setattr(row, name, getattr(row, name) + values[name])
+        return
+    
+    table = DealerDailyRollup.__table__
+    stmt = insert(table).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(ROLLUP_KEYS),
+        set_={name: table.c[name] + stmt.excluded[name] for name in ROLLUP_MEASURES}
+    )
+    db.session.execute(stmt)
+
+def prune_empty_buckets(keys):
+    """Delete buckets among keys whose last document left them (caller commits)"""
+    if not keys:
+        return
+    R = DealerDailyRollup
+    R.query.filter(
+        tuple_(*(getattr(R, name) for name in ROLLUP_KEYS)).in_(list(keys)),
+        R.doc_count <= 0
+    ).delete(synchronize_session=False)
+
+def apply_change(before, after):
+    """Move a document's contribution from one bucket to another (caller commits)"""
+    if before == after:
+        return
+    if before:
+        add_to_rollup(*before, sign=-1)
+        prune_empty_buckets([before[0]])
+    if after:
+        add_to_rollup(*after)
+
+def apply_changes(changes):
+    """Apply many (before, after) moves, netted to one upsert per affected bucket (caller commits)"""
+    buckets = {}
+    for before, after in changes:
+        if before == after:
+            continue
+        for current, sign in ((before, -1), (after, 1)):
+            if not current:
+                continue
+            key, measures = current
+            totals = buckets.get(key, (0,) * len(measures))
+            buckets[key] = tuple(total + sign * value for total, value in zip(totals, measures))
+    
+    for key, measures in buckets.items():
+        if any(measures):
+            add_to_rollup(key, measures)
+    # Emptied buckets would otherwise stay behind as zero rows every stats query scans
+    prune_empty_buckets([key for key, measures in buckets.items() if measures[0] < 0])
+
+def remove_documents_from_rollup(docs):
+    """Subtract many documents with one upsert per affected bucket (caller commits)"""
+    apply_changes([(contribution(doc), None) for doc in docs])
+
+def rebuild_rollup():
+    """Recompute every bucket from documents with one grouped query"""
+    DealerDailyRollup.query.delete(synchronize_session=False)
+    
+    day = func.date(Document.uploaded_at)
+    rows = db.session.query(
+        Document.uploaded_by, day, Document.status, Document.document_type, Document.sale_date_value,
+        func.count(Document.id),
+        func.count(Document.sale_amount_cents),
+        func.coalesce(func.sum(Document.sale_amount_cents), 0)
+    ).filter(
+        Document.uploaded_by.isnot(None),
+        Document.uploaded_at.isnot(None)
+    ).group_by(
+        Document.uploaded_by, day, Document.status, Document.document_type, Document.sale_date_value
+    ).yield_per(1000)
+    
+    # Fold sale dates into months; grouped rows are already far fewer than documents
+    buckets = {}
+    for uploaded_by, doc_day, status, document_type, sale_date, count, sale_count, sale_cents in rows:
+        if isinstance(doc_day, str):
+            doc_day = date.fromisoformat(doc_day[:10])
+        key = (uploaded_by, doc_day, status or 'pending', document_type or '',
+               sale_date.strftime('%Y-%m') if sale_date else '')
+        totals = buckets.setdefault(key, [0, 0, 0, 0, 0])
+        totals[0] += count
+        totals[1] += sale_count
+        totals[2] += sale_cents
+    
+    # Latency needs processed_at, which only newer rows have
+    latency_rows = db.session.query(
+        Document.uploaded_at, Document.processed_at, Document.uploaded_by,
+        Document.status, Document.document_type, Document.sale_date_value
+    ).filter(Document.processed_at.isnot(None)).yield_per(1000)
+    for uploaded_at, processed_at, uploaded_by, status, document_type, sale_date in latency_rows:
+        key = (uploaded_by, uploaded_at.date(), status or 'pending', document_type or '',
+               sale_date.strftime('%Y-%m') if sale_date else '')
+        if key in buckets:
+            buckets[key][3] += 1
+            buckets[key][4] += int((processed_at - uploaded_at).total_seconds() * 1000)
+    
+    if buckets:
+        db.session.execute(DealerDailyRollup.__table__.insert(), [
+            {**dict(zip(ROLLUP_KEYS, key)), **dict(zip(ROLLUP_MEASURES, totals))}
+            for key, totals in buckets.items()
+        ])
+    return len(buckets)
+
+def get_dealer_stats(user_id, since=None):
+    """Dashboard numbers for one dealer from grouped queries over the rollup"""
+    R = DealerDailyRollup
+    base = [R.uploaded_by == user_id]
+    if since:
+        base.append(R.day >= since)
+    session = read_session()
+    
+    by_status = dict(session.query(R.status, func.sum(R.doc_count)).filter(*base).group_by(R.status).all())
+    by_type = dict(session.query(R.document_type, func.sum(R.doc_count)).filter(*base).group_by(R.document_type).all())
+    
+    sales = session.query(
+        R.sale_month, func.sum(R.sale_count), func.sum(R.sale_amount_cents)
+    ).filter(*base, R.sale_month != '').group_by(R.sale_month).order_by(R.sale_month).all()
+    
+    latency_count, latency_ms = session.query(
+        func.coalesce(func.sum(R.latency_count), 0), func.coalesce(func.sum(R.latency_ms), 0)
+    ).filter(*base).one()
+    
+    completed = by_status.get('completed', 0)
+    failed = by_status.get('failed', 0)
+    finished = completed + failed
+    
+    return {
+        'total_documents': sum(by_status.values()),
+        'by_status': {status: count for status, count in by_status.items() if count},
+        'by_document_type': {(doc_type or 'unknown'): count for doc_type, count in by_type.items() if count},
+        'sales_by_month': [
+            {'month': month, 'deals': deals, 'sale_amount_cents': cents}
+            for month, deals, cents in sales if deals
+        ],
+        'ocr_failure_rate': round(failed / finished, 4) if finished else 0.0,
+        'avg_processing_ms': round(latency_ms / latency_count) if latency_count else None
+    }
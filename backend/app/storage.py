@@ -0,0 +1,474 @@
+"""Uploaded files behind a pluggable store: sharded local disk or an S3-compatible bucket
+
+Documents point at their file by storage key, '<h[:2]>/<h[2:4]>/<sha256>.<ext>', so equal content
+is stored once and no directory grows past a few entries per 65536 shards. Rows written before
+keys hold absolute paths under UPLOAD_FOLDER; those are read from disk as before until
+'flask migrate-storage' moves the files and rewrites Document.file_path.
+"""
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import click
+from flask import g, has_request_context
+from sqlalchemy import update
+from app import db
+from app.models import Document
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'uploads'))
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')  # local or s3
+# Uploads are written here first; on the upload filesystem so local saves are a rename
+STAGING_FOLDER = os.getenv('STORAGE_STAGING_FOLDER', os.path.join(UPLOAD_FOLDER, 'tmp'))
+
+S3_BUCKET = os.getenv('S3_BUCKET', 'dealership-uploads')
+S3_PREFIX = os.getenv('S3_PREFIX', '')
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL') or None  # MinIO, Ceph, R2, ...
+S3_REGION = os.getenv('S3_REGION') or None
+# STORAGE_FAKE_S3=1 swaps in a local stand-in for the S3 client, see fake_s3.py
+USE_FAKE_S3 = os.getenv('STORAGE_FAKE_S3', 'false').lower() in ('1', 'true', 'yes')
+
+# Key locks order uploads of shared content against deletes of it. They are flock()s, so they
+# cover one host; with S3 and several web hosts put this on a filesystem that supports flock
+STORAGE_LOCK_FOLDER = os.getenv('STORAGE_LOCK_FOLDER', os.path.join(STAGING_FOLDER, 'locks'))
+# Keys hash onto this many lock files rather than one file per key
+STORAGE_LOCK_STRIPES = 256
+
+STORAGE_MIGRATE_WORKERS = int(os.getenv('STORAGE_MIGRATE_WORKERS', '8'))
+STORAGE_MIGRATE_BATCH_SIZE = 500
+
+CONTENT_TYPES = {'pdf': 'application/pdf', 'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+
+os.makedirs(STAGING_FOLDER, exist_ok=True)
+os.makedirs(STORAGE_LOCK_FOLDER, exist_ok=True)
+
+def storage_key(content_hash, ext):
+    """Key a file with this content is stored under"""
+    return f'{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.{ext}'
+
+def is_legacy_path(file_path):
+    """file_path predates storage keys and names a file on local disk"""
+    return os.path.isabs(file_path)
+
+def staging_file():
+    """New temp file for an incoming upload (fd, path)"""
+    return tempfile.mkstemp(dir=STAGING_FOLDER, suffix='.part')
+
+class StorageBackend:
+    """Interface every storage backend implements; keys are relative, '/'-separated"""
+    name = None
+    
+    def save(self, temp_path, key):
+        """Move a finished staging file to key, keeping the existing copy if there is one"""
+        raise NotImplementedError
+    
+    def exists(self, key):
+        raise NotImplementedError
+    
+    def size(self, key):
+        raise NotImplementedError
+    
+    def open(self, key):
+        """Readable binary stream of the stored bytes"""
+        raise NotImplementedError
+    
+    def delete(self, key):
+        """Remove a stored file, missing files are not an error"""
+        raise NotImplementedError
+    
+    def local_path(self, key):
+        """Path on this host's disk, or None when the bytes live elsewhere"""
+        return None
+    
+    def local_copy(self, key):
+        """Context manager yielding a local file with the stored bytes for the duration of the block"""
+        raise NotImplementedError
+
+class LocalStorage(StorageBackend):
+    """Files under root in two levels of hash-prefix directories"""
+    name = 'local'
+    
+    def __init__(self, root=UPLOAD_FOLDER):
+        self.root = root
+    
+    def path(self, key):
+        # Legacy rows already hold the full path
+        return key if is_legacy_path(key) else os.path.join(self.root, *key.split('/'))
+    
+    def save(self, temp_path, key):
+        path = self.path(key)
+        if os.path.exists(path):
+            os.remove(temp_path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Atomic: readers see the whole file or nothing, and concurrent saves of equal content agree
+        os.replace(temp_path, path)
+    
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+    
+    def size(self, key):
+        return os.path.getsize(self.path(key))
+    
+    def open(self, key):
+        return open(self.path(key), 'rb')
+    
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+    
+    def local_path(self, key):
+        return self.path(key)
+    
+    @contextmanager
+    def local_copy(self, key):
+        yield self.path(key)
+
+def is_missing_error(error):
+    """botocore ClientError (or the fake's) for an object that does not exist"""
+    code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+    return code in ('404', 'NoSuchKey', 'NotFound')
+
+class S3Storage(StorageBackend):
+    """Objects in an S3-compatible bucket under S3_PREFIX; the client is created per process"""
+    name = 's3'
+    
+    def __init__(self, bucket=S3_BUCKET, prefix=S3_PREFIX, client=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client = client
+        self._client_pid = os.getpid() if client is not None else None
+        self._client_lock = threading.Lock()
+    
+    @property
+    def client(self):
+        # boto3 clients are thread-safe but must not cross a fork
+        with self._client_lock:
+            if self._client is None or self._client_pid != os.getpid():
+                self._client = create_s3_client()
+                self._client_pid = os.getpid()
+            return self._client
+    
+    def object_key(self, key):
+        return self.prefix + key
+    
+    def head(self, key):
+        """head_object response, or None if there is no such object"""
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+        except Exception as e:
+            if is_missing_error(e):
+                return None
+            raise
+    
+    def save(self, temp_path, key):
+        try:
+            if self.head(key) is None:
+                ext = key.rsplit('.', 1)[-1]
+                # A single PUT: the object appears whole or not at all
+                self.client.upload_file(temp_path, self.bucket, self.object_key(key), ExtraArgs={
+                    'ContentType': CONTENT_TYPES.get(ext, 'application/octet-stream')
+                })
+        finally:
+            os.remove(temp_path)
+    
+    def exists(self, key):
+        return self.head(key) is not None
+    
+    def size(self, key):
+        return self.head(key)['ContentLength']
+    
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self.object_key(key))['Body']
+    
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(key))
+    
+    @contextmanager
+    def local_copy(self, key):
+        fd, temp_path = staging_file()
+        os.close(fd)
+        try:
+            self.client.download_file(self.bucket, self.object_key(key), temp_path)
+            yield temp_path
+        finally:
+            os.remove(temp_path)
+
+def create_s3_client():
+    """boto3 S3 client for S3_ENDPOINT_URL/S3_REGION, or the local stand-in under STORAGE_FAKE_S3"""
+    if USE_FAKE_S3:
+        from app import fake_s3
+        return fake_s3.S3Client()
+    import boto3
+    return boto3.client('s3', endpoint_url=S3_ENDPOINT_URL, region_name=S3_REGION)
+
+BACKENDS = {
+    'local': LocalStorage,
+    's3': S3Storage,
+}
+
+_storage = None
+_legacy = LocalStorage()
+
+def get_storage():
+    """The configured backend, shared by every thread of this process"""
+    global _storage
+    if _storage is None:
+        _storage = BACKENDS[STORAGE_BACKEND]()
+    return _storage
+
+def backend_for(file_path):
+    """Backend holding a Document.file_path, legacy paths are always local"""
+    return _legacy if is_legacy_path(file_path) else get_storage()
+
+def lock_key(key, shared=False):
+    """Block until this process holds key's lock, returns the handle for unlock_key
+    
+    Uploads hold it shared and deletes exclusively, so concurrent uploads of equal content
+    never wait on each other and a delete never runs while one is in progress.
+    """
+    stripe = int(hashlib.sha256(key.encode()).hexdigest(), 16) % STORAGE_LOCK_STRIPES
+    lock_file = open(os.path.join(STORAGE_LOCK_FOLDER, f'{stripe:03d}.lock'), 'a')
+    if fcntl:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+    return lock_file
+
+def unlock_key(lock_file):
+    if fcntl:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+    lock_file.close()
+
+def release_key_locks(exception=None):
+    """Drop the key locks save_upload took for this request, once its commit is done"""
+    for lock_file in g.pop('storage_key_locks', []):
+        unlock_key(lock_file)
+
+def init_storage(app):
+    """Release upload key locks when each request ends"""
+    app.teardown_request(release_key_locks)
+
+def save_upload(temp_path, content_hash, ext):
+    """Store a finished staging file by content, returns its key
+    
+    Equal content shares one key, and another user's delete may be about to remove it. Inside a
+    request the key stays share-locked until the request ends, after the caller has committed the
+    row that points at it: delete_unused_file either runs first, and this save stores the file
+    again, or runs after and finds the new row.
+    """
+    key = storage_key(content_hash, ext)
+    lock_file = lock_key(key, shared=True)
+    try:
+        get_storage().save(temp_path, key)
+    except Exception:
+        unlock_key(lock_file)
+        raise
+    if has_request_context():
+        g.setdefault('storage_key_locks', []).append(lock_file)
+    else:
+        unlock_key(lock_file)
+    return key
+
+def file_exists(file_path):
+    return backend_for(file_path).exists(file_path)
+
+def file_size(file_path):
+    return backend_for(file_path).size(file_path)
+
+def open_file(file_path):
+    return backend_for(file_path).open(file_path)
+
+def delete_file(file_path):
+    backend_for(file_path).delete(file_path)
+
+def delete_unused_file(file_path):
+    """Delete a stored file unless a committed document still points at it, after commit (True if deleted)"""
+    lock_file = lock_key(file_path)
+    try:
+        # Rechecked under the lock: an upload of the same content may have committed since
+        if db.session.query(Document.id).filter_by(file_path=file_path).first():
+            return False
+        delete_file(file_path)
+        return True
+    finally:
+        # End the read, so the next file's recheck sees rows committed since
+        db.session.rollback()
+        unlock_key(lock_file)
+
+def local_path(file_path):
+    """Path on local disk when the backend has one (for X-Sendfile and send_file ranges)"""
+    return backend_for(file_path).local_path(file_path)
+
+def local_copy(file_path):
+    """Context manager yielding a local path with the file's bytes (OCR, previews)"""
+    return backend_for(file_path).local_copy(file_path)
+
+def migrate_file(source_path, key, storage):
+    """Copy one legacy file to key, returns bytes copied (0 if already there) or None if missing"""
+    if not os.path.exists(source_path):
+        return None
+    if storage.exists(key):
+        return 0
+    
+    size = os.path.getsize(source_path)
+    fd, temp_path = staging_file()
+    os.close(fd)
+    try:
+        # A hard link is instant on the same filesystem; the source goes once no row needs it
+        os.remove(temp_path)
+        os.link(source_path, temp_path)
+    except OSError:
+        shutil.copyfile(source_path, temp_path)
+    storage.save(temp_path, key)
+    return size
+
+def legacy_key(row):
+    """Storage key for a legacy row, hashing the file when the row has no content_hash"""
+    content_hash = row.content_hash
+    if not content_hash:
+        from app.ocr_cache import hash_file
+        content_hash = hash_file(row.file_path)
+    ext = row.file_type or row.file_path.rsplit('.', 1)[-1].lower()
+    return content_hash, storage_key(content_hash, ext)
+
+def migrate_batch(rows, storage, executor):
+    """Move one batch of legacy files in parallel and point their rows at the keys (caller commits)
+    
+    Returns (rows updated, bytes copied, missing files, source paths to remove after commit).
+    """
+    # Documents deduplicated onto one legacy file share it: copy each path once
+    by_path = {}
+    for row in rows:
+        by_path.setdefault(row.file_path, []).append(row)
+    
+    def move(path):
+        if not os.path.exists(path):
+            return path, None, None, None
+        content_hash, key = legacy_key(by_path[path][0])
+        return path, content_hash, key, migrate_file(path, key, storage)
+    
+    updates, copied, missing, moved = [], 0, 0, []
+    for path, content_hash, key, size in executor.map(move, by_path):
+        if size is None:
+            missing += len(by_path[path])
+            continue
+        copied += size
+        moved.append(path)
+        updates.extend({'id': row.id, 'file_path': key, 'content_hash': content_hash} for row in by_path[path])
+    
+    if updates:
+        db.session.execute(update(Document), updates)
+    return len(updates), copied, missing, moved
+
+def remove_migrated_sources(paths):
+    """Delete legacy files no document points at any more"""
+    still_used = {path for (path,) in db.session.query(Document.file_path).filter(Document.file_path.in_(paths))}
+    for path in paths:
+        if path not in still_used:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def migrate_legacy_files(workers=STORAGE_MIGRATE_WORKERS, batch_size=STORAGE_MIGRATE_BATCH_SIZE, keep_sources=False, progress=None):
+    """Move every legacy file into the configured backend, returns (rows, bytes, missing)
+    
+    Batches walk document ids, so rows whose file is missing are skipped rather than retried;
+    every batch commits before its sources are removed, so an interrupted run is safe to repeat.
+    progress(rows, bytes, missing, last_id) is called after each batch.
+    """
+    storage = get_storage()
+    last_id, rows_done, bytes_done, missing_total = 0, 0, 0, 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            rows = db.session.query(
+                Document.id, Document.file_path, Document.file_type, Document.content_hash
+            ).filter(
+                Document.id > last_id,
+                Document.file_path.like('/%')
+            ).order_by(Document.id).limit(batch_size).all()
+            if not rows:
+                return rows_done, bytes_done, missing_total
+            
+            updated, copied, missing, moved = migrate_batch(rows, storage, executor)
+            db.session.commit()
+            if not keep_sources:
+                remove_migrated_sources(moved)
+            
+            rows_done += updated
+            bytes_done += copied
+            missing_total += missing
+            last_id = rows[-1].id
+            if progress:
+                progress(rows_done, bytes_done, missing_total, last_id)
+
+def copy_local_keys(workers=STORAGE_MIGRATE_WORKERS, batch_size=STORAGE_MIGRATE_BATCH_SIZE, keep_sources=False, progress=None):
+    """Copy keyed files from the local layout into a remote backend, returns (files, bytes, missing)
+    
+    Keys do not change between backends, so no rows are rewritten; this is the step after
+    switching STORAGE_BACKEND from local to s3.
+    """
+    storage, local = get_storage(), LocalStorage()
+    last_id, files_done, bytes_done, missing_total = 0, 0, 0, 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            rows = db.session.query(Document.id, Document.file_path).filter(
+                Document.id > last_id,
+                ~Document.file_path.like('/%')
+            ).order_by(Document.id).limit(batch_size).all()
+            if not rows:
+                return files_done, bytes_done, missing_total
+            
+            keys = list(dict.fromkeys(key for _, key in rows))
+            for key, size in zip(keys, executor.map(lambda key: migrate_file(local.path(key), key, storage), keys)):
+                if size is None:
+                    # Not on local disk: copied and removed by an earlier run, or lost
+                    if not storage.exists(key):
+                        missing_total += 1
+                    continue
+                files_done += 1
+                bytes_done += size
+                if not keep_sources:
+                    local.delete(key)
+            
+            last_id = rows[-1].id
+            if progress:
+                progress(files_done, bytes_done, missing_total, last_id)
+
+@click.command('migrate-storage')
+@click.option('--workers', default=STORAGE_MIGRATE_WORKERS, show_default=True, help='Files copied in parallel')
+@click.option('--batch-size', default=STORAGE_MIGRATE_BATCH_SIZE, show_default=True, help='Documents per transaction')
+@click.option('--keep-sources', is_flag=True, help='Leave the legacy files in place after copying')
+@click.option('--from-local', is_flag=True, help='Also copy files already under storage keys on local disk (after switching to s3)')
+def migrate_storage_command(workers, batch_size, keep_sources, from_local):
+    """Move uploads stored under legacy paths into the configured storage backend"""
+    if from_local and get_storage().name != 'local':
+        start = time.perf_counter()
+        files, copied, missing = copy_local_keys(workers, batch_size, keep_sources)
+        click.echo(f'Copied {files} local files ({copied / 1024 / 1024:.1f} MB) to {get_storage().name} '
+                   f'in {time.perf_counter() - start:.1f}s, {missing} not found anywhere')
+    
+    total = db.session.query(Document.id).filter(Document.file_path.like('/%')).count()
+    click.echo(f'{total} documents with legacy file paths, moving to {get_storage().name} storage')
+    if not total:
+        return
+    
+    start = time.perf_counter()
+    
+    def report(rows, copied, missing, last_id):
+        elapsed = time.perf_counter() - start
+        click.echo(f'{rows}/{total} moved, {missing} missing, {copied / 1024 / 1024:.1f} MB, '
+                   f'{rows / elapsed:.0f} docs/s, {copied / 1024 / 1024 / elapsed:.1f} MB/s, last id {last_id}')
+    
+    rows, copied, missing = migrate_legacy_files(workers, batch_size, keep_sources, report)
+    click.echo(f'Done: {rows} moved, {missing} missing files left on legacy paths, '
+               f'{copied / 1024 / 1024:.1f} MB in {time.perf_counter() - start:.1f}s')
@@ -0,0 +1,52 @@
+"""Local Tesseract OCR, run inside the rasterize process pool (no Vision client or app state)"""
+import io
+import os
+
+TESSERACT_LANG = os.getenv('TESSERACT_LANG', 'eng')
+
+def is_available():
+    """pytesseract importable and the tesseract binary on PATH"""
+    import shutil
+    try:
+        import pytesseract  # noqa: F401
+    except ImportError:
+        return False
+    return shutil.which('tesseract') is not None
+
+def ocr_image_bytes(content, lang=TESSERACT_LANG):
+    """OCR one image, returns (text, mean word confidence 0..1)"""
+    import pytesseract
+    from PIL import Image
+    
+    image = Image.open(io.BytesIO(content))
+    data = pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT)
+    
+    lines, current, confidences = [], [], []
+    last_line = None
+    for word, conf, block, par, line in zip(
+        data['text'], data['conf'], data['block_num'], data['par_num'], data['line_num']
+    ):
+        if not word.strip():
+            continue
+        if (block, par, line) != last_line and current:
+            lines.append(' '.join(current))
+            current = []
+        last_line = (block, par, line)
+        current.append(word)
+        if float(conf) >= 0:
+            confidences.append(float(conf))
+    if current:
+        lines.append(' '.join(current))
+    
+    confidence = sum(confidences) / len(confidences) / 100 if confidences else 0.0
+    return '\n'.join(lines), confidence
+
+def ocr_page(file_path, page_number, dpi, lang=TESSERACT_LANG):
+    """Render one PDF page (or read an image) and OCR it, returns (text, confidence)"""
+    if file_path.lower().endswith('.pdf'):
+        from app.rasterize import render_page
+        content = render_page(file_path, page_number, dpi)
+    else:
+        with open(file_path, 'rb') as image_file:
+            content = image_file.read()
+    return ocr_image_bytes(content, lang)
@@ -0,0 +1,58 @@
+"""Page previews, rendered once per stored file and cached on disk"""
+import os
+import glob
+import tempfile
+from app.rasterize import get_page_count, render_thumbnail
+from app.storage import local_copy
+
+THUMBNAIL_FOLDER = os.getenv('THUMBNAIL_FOLDER', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'thumbnails'
+))
+THUMBNAIL_WIDTHS = (160, 320, 640)
+DEFAULT_THUMBNAIL_WIDTH = 320
+THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', '80'))
+
+def thumbnail_key(doc):
+    """Cache key shared by documents pointing at the same stored file"""
+    return doc.content_hash or f'doc{doc.id}'
+
+def thumbnail_path(key, page_number, width):
+    """Location of a cached preview"""
+    return os.path.join(THUMBNAIL_FOLDER, key[:2], f'{key}_p{page_number}_w{width}.jpg')
+
+def get_thumbnail(doc, page_number, width):
+    """Path of the cached preview, rendering it on first request (path, error, code)"""
+    if width not in THUMBNAIL_WIDTHS:
+        return None, f"width must be one of {', '.join(map(str, THUMBNAIL_WIDTHS))}", 400
+    
+    path = thumbnail_path(thumbnail_key(doc), page_number, width)
+    if os.path.exists(path):
+        return path, None, 200
+    
+    with local_copy(doc.file_path) as file_path:
+        page_count = get_page_count(file_path) if doc.file_type == 'pdf' else 1
+        if page_number < 1 or page_number > page_count:
+            return None, 'Page not found', 404
+        
+        data = render_thumbnail(file_path, page_number - 1, width, THUMBNAIL_QUALITY)
+    
+    # Concurrent renders of the same page are harmless: the rename is atomic
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            out.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return path, None, 200
+
+def remove_thumbnails(doc):
+    """Drop every cached preview of a document's stored file"""
+    key = thumbnail_key(doc)
+    for path in glob.glob(os.path.join(THUMBNAIL_FOLDER, key[:2], f'{key}_p*.jpg')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
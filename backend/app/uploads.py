@@ -0,0 +1,217 @@
+"""Streaming upload helpers: incremental hashing, size limits and resumable chunked sessions"""
+import os
+import glob
+import uuid
+import shutil
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from app import db
+from app.models import UploadSession
+from app.storage import STAGING_FOLDER, save_upload, staging_file
+from app.metrics import timed_stage
+
+ALLOWED_TYPES = {'pdf', 'jpg', 'jpeg', 'png'}
+MAX_FILE_SIZE = 100 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))
+UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', '86400'))
+STREAM_BUFFER_SIZE = 1024 * 1024
+
+FILE_SIGNATURES = {
+    'pdf': b'%PDF-',
+    'jpg': b'\xff\xd8\xff',
+    'jpeg': b'\xff\xd8\xff',
+    'png': b'\x89PNG\r\n\x1a\n',
+}
+
+# Running SHA-256 per chunked upload, so each chunk is hashed once as it arrives
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+class UploadError(Exception):
+    """Upload rejected with an HTTP status code"""
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+def get_extension(filename):
+    """Allowed lowercase extension of a filename, or None"""
+    if not filename or '.' not in filename:
+        return None
+    ext = filename.rsplit('.', 1)[1].lower()
+    return ext if ext in ALLOWED_TYPES else None
+
+def check_signature(ext, head):
+    """Check the leading bytes seen so far agree with the claimed file type"""
+    signature = FILE_SIGNATURES[ext]
+    return signature.startswith(head[:len(signature)])
+
+def stream_to_file(stream, out, digest, limit, ext=None, head=b''):
+    """Copy stream to out while hashing, failing as soon as limit is crossed (bytes written)
+
+    head is whatever precedes the stream in the file, so the type check holds when
+    the signature is split across reads or chunks.
+    """
+    signature_size = len(FILE_SIGNATURES[ext]) if ext else 0
+    written = 0
+    for piece in iter(lambda: stream.read(STREAM_BUFFER_SIZE), b''):
+        if len(head) < signature_size:
+            head += piece[:signature_size - len(head)]
+            if not check_signature(ext, head):
+                raise UploadError('File content does not match its type', 415)
+        
+        written += len(piece)
+        if written > limit:
+            raise UploadError('File too large', 413)
+        
+        digest.update(piece)
+        out.write(piece)
+    return written
+
+@timed_stage('file_write')
+def save_file(file, ext):
+    """Stream a multipart upload into storage (storage key, content_hash, size)"""
+    digest = hashlib.sha256()
+    fd, temp_path = staging_file()
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            size = stream_to_file(file.stream, out, digest, MAX_FILE_SIZE, ext)
+        
+        if size == 0:
+            raise UploadError('Empty file')
+        if size < len(FILE_SIGNATURES[ext]):
+            raise UploadError('File content does not match its type', 415)
+        
+        content_hash = digest.hexdigest()
+        return save_upload(temp_path, content_hash, ext), content_hash, size
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def expire_sessions():
+    """Delete chunked uploads abandoned for longer than UPLOAD_SESSION_TTL"""
+    cutoff = datetime.utcnow() - timedelta(seconds=UPLOAD_SESSION_TTL)
+    for session in UploadSession.query.filter(UploadSession.created_at < cutoff).limit(100):
+        discard_session(session)
+    
+    # Hashes of uploads finished, cancelled or expired through another process
+    with _hashers_lock:
+        upload_ids = list(_hashers)
+    if upload_ids:
+        live = {upload_id for (upload_id,) in db.session.query(UploadSession.id).filter(UploadSession.id.in_(upload_ids))}
+        with _hashers_lock:
+            for upload_id in upload_ids:
+                if upload_id not in live:
+                    _hashers.pop(upload_id, None)
+
+def create_session(user_id, filename, total_size):
+    """Start a resumable upload (caller commits)"""
+    ext = get_extension(filename)
+    if not ext:
+        raise UploadError('Invalid type')
+    # bool is an int subclass: {"size": true} is not a one-byte upload
+    if type(total_size) is not int or total_size <= 0:
+        raise UploadError('Size required')
+    if total_size > MAX_FILE_SIZE:
+        raise UploadError('File too large', 413)
+    if total_size < len(FILE_SIGNATURES[ext]):
+        raise UploadError('File content does not match its type', 415)
+    
+    upload_id = uuid.uuid4().hex
+    temp_path = os.path.join(STAGING_FOLDER, f'{upload_id}.part')
+    open(temp_path, 'wb').close()
+    
+    session = UploadSession(
+        id=upload_id,
+        user_id=user_id,
+        original_filename=filename,
+        file_type=ext,
+        total_size=total_size,
+        received_bytes=0,
+        temp_path=temp_path
+    )
+    db.session.add(session)
+    return session
+
+def _get_hasher(session):
+    """Running hash for the bytes received so far, rebuilt from disk if this process lacks it"""
+    with _hashers_lock:
+        entry = _hashers.get(session.id)
+    if entry and entry[1] == session.received_bytes:
+        return entry[0]
+    
+    digest = hashlib.sha256()
+    remaining = session.received_bytes
+    with open(session.temp_path, 'rb') as f:
+        while remaining:
+            piece = f.read(min(STREAM_BUFFER_SIZE, remaining))
+            if not piece:
+                break
+            digest.update(piece)
+            remaining -= len(piece)
+    return digest
+
+@timed_stage('file_write')
+def append_chunk(session, stream, offset):
+    """Write one chunk at offset, returns True once the file is complete (caller commits)"""
+    if offset != session.received_bytes:
+        raise UploadError('Offset mismatch', 409)
+    
+    # A copy, since another request in this process may be hashing from the same state
+    digest = _get_hasher(session).copy()
+    limit = min(UPLOAD_CHUNK_SIZE, session.total_size - offset)
+    ext = session.file_type if offset < len(FILE_SIGNATURES[session.file_type]) else None
+    head = b''
+    if ext:
+        with open(session.temp_path, 'rb') as f:
+            head = f.read(offset)
+    
+    # The chunk lands in its own part file and reaches the upload only once its offset is
+    # claimed, so a concurrent request for the same offset cannot overwrite accepted bytes
+    part_path = f'{session.temp_path}.{uuid.uuid4().hex}'
+    try:
+        with open(part_path, 'wb') as part:
+            written = stream_to_file(stream, part, digest, limit, ext, head)
+        
+        # Conditional update: matches nothing once another request has claimed this offset,
+        # and holds the row's write lock until the caller commits
+        updated = UploadSession.query.filter_by(id=session.id, received_bytes=offset).update(
+            {'received_bytes': offset + written}, synchronize_session=False
+        )
+        if not updated:
+            raise UploadError('Offset mismatch', 409)
+        
+        with open(session.temp_path, 'r+b') as out, open(part_path, 'rb') as part:
+            out.seek(offset)
+            shutil.copyfileobj(part, out, STREAM_BUFFER_SIZE)
+            out.truncate(offset + written)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    session.received_bytes = offset + written
+    
+    with _hashers_lock:
+        _hashers[session.id] = (digest, session.received_bytes)
+    return session.received_bytes == session.total_size
+
+def finish_session(session):
+    """Move a complete upload into storage (storage key, content_hash), caller commits"""
+    content_hash = _get_hasher(session).hexdigest()
+    with _hashers_lock:
+        _hashers.pop(session.id, None)
+    
+    key = save_upload(session.temp_path, content_hash, session.file_type)
+    db.session.delete(session)
+    return key, content_hash
+
+def discard_session(session):
+    """Cancel an upload and remove its partial file (caller commits)"""
+    with _hashers_lock:
+        _hashers.pop(session.id, None)
+    # Part files too, in case a request died between writing a chunk and merging it
+    for path in [session.temp_path] + glob.glob(f'{glob.escape(session.temp_path)}.*'):
+        if os.path.exists(path):
+            os.remove(path)
+    db.session.delete(session)
@@ -0,0 +1,72 @@
+import click
+from flask import Blueprint, request, jsonify
+from app import db
+from app.models import Document, DocumentVehicle
+from app.documents import verify_auth, handle_options
+from app.vin import normalize_vin, is_valid_vin, backfill_links
+
+bp = Blueprint('vehicles', __name__)
+
+HISTORY_FIELDS = (
+    'id', 'original_filename', 'document_type', 'status', 'buyer_name', 'seller_name',
+    'sale_date', 'sale_amount', 'odometer_reading', 'uploaded_at'
+)
+
+def summarize(history):
+    """Aggregate a VIN's documents into counts and first/last activity"""
+    by_type = {}
+    for doc in history:
+        doc_type = doc['document_type'] or 'unknown'
+        by_type[doc_type] = by_type.get(doc_type, 0) + 1
+    
+    latest_sale = next((doc for doc in reversed(history) if doc['sale_amount']), None)
+    return {
+        'document_count': len(history),
+        'document_types': by_type,
+        'first_seen': history[0]['uploaded_at'] if history else None,
+        'last_seen': history[-1]['uploaded_at'] if history else None,
+        'latest_sale_amount': latest_sale['sale_amount'] if latest_sale else None,
+        'latest_buyer': latest_sale['buyer_name'] if latest_sale else None
+    }
+
+@bp.route('/<vin>', methods=['GET', 'OPTIONS'])
+def vehicle_history(vin):
+    """Get every document for a VIN"""
+    if request.method == 'OPTIONS':
+        return handle_options()
+    
+    user_id, auth_error = verify_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        vin = normalize_vin(vin)
+        if not is_valid_vin(vin):
+            return jsonify({'error': 'Invalid VIN'}), 400
+        
+        columns = [getattr(Document, f) for f in HISTORY_FIELDS]
+        rows = db.session.query(*columns).join(
+            DocumentVehicle, DocumentVehicle.document_id == Document.id
+        ).filter(
+            DocumentVehicle.uploaded_by == user_id,
+            DocumentVehicle.vin == vin
+        ).order_by(Document.uploaded_at, Document.id).all()
+        
+        if not rows:
+            return jsonify({'error': 'Vehicle not found'}), 404
+        
+        history = Document.serializer(HISTORY_FIELDS).many(rows)
+        return jsonify({
+            'success': True,
+            'vin': vin,
+            'summary': summarize(history),
+            'documents': history
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.cli.command('backfill')
+def backfill_command():
+    """Link existing documents to vehicles by VIN"""
+    click.echo(f'Linked {backfill_links()} document(s)')
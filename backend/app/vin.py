@@ -0,0 +1,62 @@
+"""VIN normalization, check-digit validation and document-to-vehicle links"""
+from app import db
+from app.models import Document, DocumentVehicle, Vehicle, insert_ignore
+
+BACKFILL_BATCH_SIZE = 1000
+
+VIN_TRANSLITERATION = {
+    **{str(d): d for d in range(10)},
+    'A': 1, 'B': 2, 'C': 3, 'D': 4, 'E': 5, 'F': 6, 'G': 7, 'H': 8,
+    'J': 1, 'K': 2, 'L': 3, 'M': 4, 'N': 5, 'P': 7, 'R': 9,
+    'S': 2, 'T': 3, 'U': 4, 'V': 5, 'W': 6, 'X': 7, 'Y': 8, 'Z': 9,
+}
+VIN_WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2)
+
+def normalize_vin(vin):
+    """Uppercase VIN without surrounding whitespace, or None"""
+    if not vin:
+        return None
+    return vin.strip().upper()
+
+def is_valid_vin(vin):
+    """17 legal characters with a correct position-9 check digit"""
+    if not vin or len(vin) != 17:
+        return False
+    try:
+        total = sum(VIN_TRANSLITERATION[c] * w for c, w in zip(vin, VIN_WEIGHTS))
+    except KeyError:
+        return False
+    remainder = total % 11
+    return vin[8] == ('X' if remainder == 10 else str(remainder))
+
+def link_vehicle(doc):
+    """Point a document at the vehicle for its VIN, dropping stale links (caller commits)"""
+    DocumentVehicle.query.filter_by(document_id=doc.id).delete(synchronize_session=False)
+    
+    vin = normalize_vin(doc.vin)
+    if not is_valid_vin(vin):
+        return None
+    
+    insert_ignore(Vehicle, {'vin': vin})
+    db.session.add(DocumentVehicle(document_id=doc.id, vin=vin, uploaded_by=doc.uploaded_by))
+    return vin
+
+def unlink_documents(doc_ids):
+    """Remove vehicle links for deleted documents (caller commits)"""
+    DocumentVehicle.query.filter(DocumentVehicle.document_id.in_(doc_ids)).delete(synchronize_session=False)
+
+def backfill_links():
+    """Link every document that already has a VIN, in id-ordered batches"""
+    last_id, linked = 0, 0
+    while True:
+        docs = Document.query.filter(
+            Document.id > last_id,
+            Document.vin.isnot(None)
+        ).order_by(Document.id).limit(BACKFILL_BATCH_SIZE).all()
+        if not docs:
+            return linked
+        for doc in docs:
+            if link_vehicle(doc):
+                linked += 1
+        db.session.commit()
+        last_id = docs[-1].id
@@ -0,0 +1,188 @@
+"""Concurrent-user scaling of the API under gunicorn, against a seeded database and fake Vision
+
+Usage (from backend/):
+    python -m benchmarks.bench_gunicorn --workers 1,2,4 --concurrency 1,8,32 --duration 10
+
+Seeds --users dealers with --docs documents each, then for every gunicorn worker count starts
+`gunicorn run:app` on a local port and, at each concurrency level, has that many simulated
+users (keep-alive HTTP connections, one per thread, spread over the dealers) issue a request
+mix for --duration seconds:
+  list    GET /api/documents?limit=50
+  stats   GET /api/documents/stats
+  search  GET /api/documents/search?q=odometer
+  upload  POST /api/documents/upload of a sample PDF (only with --upload-ratio > 0; an OCR
+          worker process using the fake Vision client with OCR_FAKE_LATENCY drains the queue)
+Reports requests/sec, p50/p99 overall and per request kind, and errors as JSON. The load
+generator shares the machine with the server; pin or move it for absolute numbers.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+
+from benchmarks.common import (
+    BACKEND_DIR, access_tokens, configure_env, environment, sample_pdfs, seed_database, summarize
+)
+
+REQUEST_MIX = {'list': 0.6, 'stats': 0.2, 'search': 0.2}
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_server(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/documents/stats')
+            conn.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def multipart(filename, content):
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="files"; filename="{filename}"\r\n'
+        f'Content-Type: application/pdf\r\n\r\n'
+    ).encode() + content + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+def simulated_user(port, token, mix, pdf, deadline, seed, results):
+    rng = random.Random(seed)
+    kinds, weights = zip(*mix.items())
+    headers = {'Authorization': f'Bearer {token}'}
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    latencies = {kind: [] for kind in kinds}
+    errors = 0
+    while time.monotonic() < deadline:
+        kind = rng.choices(kinds, weights)[0]
+        start = time.perf_counter()
+        try:
+            if kind == 'upload':
+                # Unique trailing bytes so every upload is a new file rather than a dedup hit
+                body, content_type = multipart('bench.pdf', pdf + b'\n%' + uuid.uuid4().hex.encode() + b'\n')
+                conn.request('POST', '/api/documents/upload', body=body,
+                             headers={**headers, 'Content-Type': content_type})
+            else:
+                path = {
+                    'list': '/api/documents?limit=50',
+                    'stats': '/api/documents/stats',
+                    'search': '/api/documents/search?q=odometer'
+                }[kind]
+                conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        if ok:
+            latencies[kind].append((time.perf_counter() - start) * 1000)
+        else:
+            errors += 1
+    conn.close()
+    results.append((latencies, errors))
+
+def run_level(port, tokens, mix, pdf, concurrency, duration):
+    results = []
+    deadline = time.monotonic() + duration
+    user_ids = sorted(tokens)
+    threads = [
+        threading.Thread(target=simulated_user, args=(
+            port, tokens[user_ids[i % len(user_ids)]], mix, pdf, deadline, i, results
+        ))
+        for i in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    
+    by_kind = {kind: [l for latencies, _ in results for l in latencies[kind]] for kind in mix}
+    every = [l for values in by_kind.values() for l in values]
+    return {
+        'concurrency': concurrency,
+        'requests_per_sec': round(len(every) / elapsed, 1),
+        **summarize(every),
+        'errors': sum(errors for _, errors in results),
+        'by_kind': {kind: summarize(values) for kind, values in by_kind.items()}
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4', help='comma-separated gunicorn worker counts')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn --threads per worker')
+    parser.add_argument('--concurrency', default='1,8,32', help='comma-separated simulated user counts')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per concurrency level')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--docs', type=int, default=500, help='documents per user')
+    parser.add_argument('--upload-ratio', type=float, default=0.0, help='share of requests that are uploads')
+    parser.add_argument('--vision-latency', type=float, default=0.3, help='fake Vision seconds per call')
+    args = parser.parse_args()
+    
+    mix = {kind: round(weight * (1 - args.upload_ratio), 3) for kind, weight in REQUEST_MIX.items()}
+    if args.upload_ratio:
+        mix['upload'] = args.upload_ratio
+    pdf = open(sample_pdfs()[0], 'rb').read()
+    
+    results = {
+        'benchmark': 'gunicorn',
+        'environment': environment(),
+        'users': args.users,
+        'docs_per_user': args.docs,
+        'mix': mix,
+        'runs': []
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_env(workdir, OCR_FAKE_LATENCY=args.vision_latency)
+        from app import create_app
+        app = create_app(start_workers=False)
+        seed_database(app, args.users, args.docs)
+        tokens = access_tokens(app, range(1, args.users + 1))
+        
+        ocr_worker = None
+        if args.upload_ratio:
+            ocr_worker = subprocess.Popen([sys.executable, 'worker.py'], cwd=BACKEND_DIR,
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            for workers in args.workers.split(','):
+                port = free_port()
+                server = subprocess.Popen(
+                    [sys.executable, '-m', 'gunicorn', '-w', workers, '--threads', str(args.threads),
+                     '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'run:app'],
+                    cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+                try:
+                    if not wait_for_server(port):
+                        raise RuntimeError(f'gunicorn with {workers} workers did not start')
+                    for concurrency in args.concurrency.split(','):
+                        run = run_level(port, tokens, mix, pdf, int(concurrency), args.duration)
+                        results['runs'].append({'workers': int(workers), 'threads': args.threads, **run})
+                finally:
+                    server.terminate()
+                    server.wait(10)
+        finally:
+            if ocr_worker:
+                ocr_worker.terminate()
+                ocr_worker.wait(10)
+    
+    print(json.dumps(results, indent=2))
+    return 1 if any(run['errors'] for run in results['runs']) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
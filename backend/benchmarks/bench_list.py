@@ -0,0 +1,221 @@
+"""List latency and memory for a large dealer: inline OCR text vs the slim list projection
+
+Usage (from backend/):
+    python -m benchmarks.bench_list --docs 10000 --text-kb 32
+
+Each mode runs in its own subprocess so peak RSS is measured independently:
+  legacy   the old layout and endpoint body (OCR text and notes inline in the document row,
+           Document.query.filter_by(uploaded_by=...).all() + to_dict)
+  current  GET /api/documents through the app (keyset pages, no text or notes loaded)
+Results are printed as JSON.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_BATCH_SIZE = 500
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def fake_text(rng, size):
+    words = ['VIN', 'odometer', 'buyer', 'seller', 'title', 'lien', 'dealer', 'signature', 'miles', 'date']
+    out, length = [], 0
+    while length < size:
+        word = rng.choice(words)
+        out.append(word)
+        length += len(word) + 1
+    return ' '.join(out)
+
+def seed_rows(count, text_kb, seed=1):
+    """Yield batches of synthetic document rows for one dealer"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    batch = []
+    for i in range(1, count + 1):
+        batch.append({
+            'id': i,
+            'uploaded_by': 1,
+            'filename': f'20240101_000000_doc{i}.pdf',
+            'original_filename': f'doc{i}.pdf',
+            'file_type': 'pdf',
+            'file_size': 250000,
+            'file_path': f'/uploads/user_1/doc{i}.pdf',
+            'status': 'completed',
+            'notes': 'Follow up with lender. ' * 20,
+            'extracted_text': fake_text(rng, text_kb * 1024),
+            'vin': '1HGCM82633A004352',
+            'buyer_name': 'John Smith',
+            'seller_name': 'Sunrise Motors',
+            'sale_date': '03/15/2024',
+            'sale_amount': '$12,500.00',
+            'odometer_reading': '45000 miles',
+            'document_type': 'buyer_order',
+            'uploaded_at': start + timedelta(minutes=i)
+        })
+        if len(batch) == SEED_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def run_legacy(args, db_path):
+    from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
+    from sqlalchemy.orm import declarative_base, Session
+    
+    Base = declarative_base()
+    
+    class LegacyDocument(Base):
+        __tablename__ = 'document'
+        id = Column(Integer, primary_key=True)
+        uploaded_by = Column(Integer)
+        filename = Column(String(255))
+        original_filename = Column(String(255))
+        file_type = Column(String(10))
+        file_size = Column(Integer)
+        file_path = Column(String(500))
+        status = Column(String(20))
+        notes = Column(Text)
+        extracted_text = Column(Text)
+        vin = Column(String(100))
+        buyer_name = Column(String(255))
+        seller_name = Column(String(255))
+        sale_date = Column(String(50))
+        sale_amount = Column(String(50))
+        odometer_reading = Column(String(50))
+        document_type = Column(String(100))
+        uploaded_at = Column(DateTime)
+        
+        def to_dict(self):
+            return {
+                'id': self.id, 'filename': self.filename, 'original_filename': self.original_filename,
+                'file_type': self.file_type, 'status': self.status, 'notes': self.notes, 'vin': self.vin,
+                'buyer_name': self.buyer_name, 'seller_name': self.seller_name, 'sale_date': self.sale_date,
+                'sale_amount': self.sale_amount, 'odometer_reading': self.odometer_reading,
+                'document_type': self.document_type, 'uploaded_at': self.uploaded_at.isoformat()
+            }
+    
+    engine = create_engine(f'sqlite:///{db_path}')
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for batch in seed_rows(args.docs, args.text_kb):
+            conn.execute(LegacyDocument.__table__.insert(), batch)
+    
+    def list_all():
+        with Session(engine) as session:
+            docs = session.query(LegacyDocument).filter_by(uploaded_by=1).all()
+            json.dumps({'success': True, 'documents': [doc.to_dict() for doc in docs]})
+    
+    def ownership_check():
+        with Session(engine) as session:
+            doc = session.get(LegacyDocument, args.docs // 2)
+            assert doc.uploaded_by == 1
+    
+    rss_before = peak_rss_mb()
+    list_ms = timed(list_all, args.repeat)
+    return {
+        'first_page_ms': statistics.median(list_ms),
+        'all_documents_ms': statistics.median(list_ms),
+        'ownership_check_ms': statistics.median(timed(ownership_check, 50)),
+        'rss_growth_mb': round(peak_rss_mb() - rss_before, 1)
+    }
+
+def run_current(args, db_path):
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ.setdefault('OCR_FAKE_VISION', '1')
+    os.environ['OCR_WORKER_MODE'] = 'external'
+    sys.path.insert(0, BACKEND_DIR)
+    
+    from flask_jwt_extended import create_access_token
+    from app import create_app, db
+    from app.models import Document, DocumentText, User
+    from app.documents import get_owned_document
+    
+    app = create_app()
+    with app.app_context():
+        db.session.add(User(id=1, email='bench@example.com', password='x'))
+        db.session.commit()
+        for batch in seed_rows(args.docs, args.text_kb):
+            db.session.execute(Document.__table__.insert(), [
+                {k: v for k, v in row.items() if k != 'extracted_text'} for row in batch
+            ])
+            db.session.execute(DocumentText.__table__.insert(), [
+                {'document_id': row['id'], 'extracted_text': row['extracted_text']} for row in batch
+            ])
+        db.session.commit()
+        token = create_access_token(identity='1')
+    
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    
+    def first_page():
+        assert client.get('/api/documents', headers=headers).status_code == 200
+    
+    def all_pages():
+        cursor = None
+        while True:
+            query = {'limit': 500, **({'cursor': cursor} if cursor else {})}
+            cursor = client.get('/api/documents', headers=headers, query_string=query).json['next_cursor']
+            if not cursor:
+                return
+    
+    def ownership_check():
+        with app.app_context():
+            assert get_owned_document(args.docs // 2, 1) is not None
+    
+    rss_before = peak_rss_mb()
+    first_ms = timed(first_page, args.repeat)
+    all_ms = timed(all_pages, args.repeat)
+    return {
+        'first_page_ms': statistics.median(first_ms),
+        'all_documents_ms': statistics.median(all_ms),
+        'ownership_check_ms': statistics.median(timed(ownership_check, 50)),
+        'rss_growth_mb': round(peak_rss_mb() - rss_before, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=10000)
+    parser.add_argument('--text-kb', type=int, default=32, help='OCR text per document')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--mode', choices=['legacy', 'current'])
+    args = parser.parse_args()
+    
+    if args.mode:
+        with tempfile.TemporaryDirectory() as tmp:
+            run = run_legacy if args.mode == 'legacy' else run_current
+            result = run(args, os.path.join(tmp, 'bench.db'))
+        result = {k: round(v, 2) for k, v in result.items()}
+        print(json.dumps(result))
+        return 0
+    
+    results = {'benchmark': 'list_documents', 'docs': args.docs, 'text_kb': args.text_kb}
+    for mode in ('legacy', 'current'):
+        out = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_list', '--mode', mode, '--docs', str(args.docs),
+             '--text-kb', str(args.text_kb), '--repeat', str(args.repeat)],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        )
+        results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
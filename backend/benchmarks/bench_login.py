@@ -0,0 +1,144 @@
+"""Login throughput per password hashing policy, to size workers for a shift-start login storm
+
+Usage (from backend/):
+    python -m benchmarks.bench_login --workers 4 --logins 40
+
+Each worker is a separate process with its own app (like gunicorn workers) posting logins
+for seeded dealer accounts. Runs once per --methods entry with PASSWORD_HASH_METHOD set to
+it; with --rehash-from the accounts start out hashed with that method instead, so the first
+login of each account also pays for the upgrade. Also times token-authenticated requests
+(GET /api/auth/me) with the revocation cache on and off. Reports JSON.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'correct horse battery staple'
+
+def configure_env(workdir, method):
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(workdir, "bench.db")}'
+    os.environ['PASSWORD_HASH_METHOD'] = method
+    os.environ.setdefault('OCR_FAKE_VISION', '1')
+    os.environ['OCR_WORKER_MODE'] = 'external'
+    sys.path.insert(0, BACKEND_DIR)
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def login_worker(index, workdir, method, args, start_event, results):
+    configure_env(workdir, method)
+    from app import create_app
+    
+    app = create_app(start_workers=False)
+    client = app.test_client()
+    latencies, failures = [], 0
+    start_event.wait()
+    for i in range(args.logins):
+        email = f'dealer{(index * args.logins + i) % args.users}@example.com'
+        start = time.perf_counter()
+        response = client.post('/api/auth/login', json={'email': email, 'password': PASSWORD})
+        latencies.append((time.perf_counter() - start) * 1000)
+        failures += response.status_code != 200
+    results.put({'latencies': latencies, 'failures': failures})
+
+def run_method(args, method):
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_env(workdir, method)
+        from app import create_app, db
+        from app.models import User
+        from app.passwords import hash_password, needs_rehash
+        
+        app = create_app(start_workers=False)
+        with app.app_context():
+            # One hash shared by every account; the cost being measured is verification
+            stored = hash_password(PASSWORD, args.rehash_from or method)
+            db.session.add_all([User(email=f'dealer{i}@example.com', password=stored, role='dealer',
+                                     dealership_name=f'Dealer {i}') for i in range(args.users)])
+            db.session.commit()
+        
+        start_event, results = ctx.Event(), ctx.Queue()
+        procs = [ctx.Process(target=login_worker, args=(i, workdir, method, args, start_event, results))
+                 for i in range(args.workers)]
+        for proc in procs:
+            proc.start()
+        time.sleep(args.warmup)
+        started = time.perf_counter()
+        start_event.set()
+        collected = [results.get() for _ in procs]
+        elapsed = time.perf_counter() - started
+        for proc in procs:
+            proc.join()
+        
+        with app.app_context():
+            upgraded = sum(not needs_rehash(u.password, method) for u in User.query.all())
+    
+    latencies = sorted(l for r in collected for l in r['latencies'])
+    return {
+        'logins': len(latencies),
+        'seconds': round(elapsed, 2),
+        'logins_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies), 1),
+        'p99_ms': round(percentile(latencies, 0.99), 1),
+        'failures': sum(r['failures'] for r in collected),
+        'accounts_on_policy': f'{upgraded}/{args.users}'
+    }
+
+def run_authenticated(args):
+    """Requests/sec through token verification, revocation cache on vs off"""
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_env(workdir, args.methods.split(',')[0])
+        from flask_jwt_extended import create_access_token
+        from app import create_app, auth
+        
+        app = create_app(start_workers=False)
+        with app.app_context():
+            token = create_access_token(identity='1', additional_claims={'role': 'dealer', 'dealership': 'Dealer 1'})
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        
+        results = {}
+        for name, ttl in (('revocation_cache', auth.REVOCATION_CACHE_TTL), ('no_cache', 0)):
+            auth.revocation_cache = auth.RevocationCache(ttl=ttl)
+            start = time.perf_counter()
+            for _ in range(args.me_requests):
+                client.get('/api/auth/me', headers=headers)
+            elapsed = time.perf_counter() - start
+            results[name] = {
+                'requests_per_sec': round(args.me_requests / elapsed, 1),
+                'revocation_queries': auth.revocation_cache.misses
+            }
+        return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--logins', type=int, default=40, help='logins per worker')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--methods', default='scrypt:32768:8:1,scrypt:16384:8:1,pbkdf2:sha256:600000',
+                        help='comma-separated PASSWORD_HASH_METHOD values')
+    parser.add_argument('--rehash-from', default=None, help='method the seeded accounts are hashed with')
+    parser.add_argument('--me-requests', type=int, default=2000)
+    parser.add_argument('--warmup', type=float, default=3, help='seconds to let processes boot')
+    args = parser.parse_args()
+    
+    results = {
+        'benchmark': 'login',
+        'workers': args.workers,
+        'cpus': os.cpu_count(),
+        'rehash_from': args.rehash_from
+    }
+    for method in args.methods.split(','):
+        results[method] = run_method(args, method)
+    results['authenticated'] = run_authenticated(args)
+    print(json.dumps(results, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Load benchmark for the async OCR path against a latency-injecting fake Vision client
+
+Usage (from backend/):
+    python -m benchmarks.bench_ocr_async --docs 200 --pages 4 --latency 0.2 --rate 100
+
+Compares the serial path (one blocking Vision call per batch, one document at a time, as a
+single OCR_ASYNC=0 worker thread does) with every document submitted to the shared event loop.
+Reports docs/sec, peak calls in flight, achieved request rate against the token bucket limit and
+retries caused by injected transient errors, as JSON.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+os.environ.setdefault('OCR_FAKE_VISION', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import fake_vision
+from app.ocr_async import AsyncVisionClient, annotate_images_async
+
+# Rasterization is measured elsewhere; these stand in for rendered page JPEGs
+PAGE_BYTES = b'\xff\xd8' + b'\0' * 200 * 1024
+
+class InFlightClient(fake_vision.ImageAnnotatorAsyncClient):
+    """Fake async client that records how many calls overlap"""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+    
+    async def batch_annotate_images(self, requests):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await super().batch_annotate_images(requests)
+        finally:
+            self.in_flight -= 1
+
+def run_serial(args, documents):
+    client = fake_vision.ImageAnnotatorClient(latency=args.latency)
+    start = time.perf_counter()
+    for images in documents:
+        requests = [fake_vision.AnnotateImageRequest(image=fake_vision.Image(content=c)) for c in images]
+        for i in range(0, len(requests), 16):
+            client.batch_annotate_images(requests=requests[i:i + 16])
+    elapsed = time.perf_counter() - start
+    return {'docs_per_sec': round(len(documents) / elapsed, 1), 'calls': client.calls, 'seconds': round(elapsed, 2)}
+
+async def run_async(args, documents):
+    fake = InFlightClient(latency=args.latency, fail_every=args.fail_every)
+    client = AsyncVisionClient(fake, concurrency=args.concurrency, rate=args.rate, burst=args.burst, timeout=args.timeout)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(annotate_images_async(images, client) for images in documents))
+    elapsed = time.perf_counter() - start
+    errors = sum(1 for _, error in results if error)
+    return {
+        'docs_per_sec': round(len(documents) / elapsed, 1),
+        'calls': fake.calls,
+        'seconds': round(elapsed, 2),
+        'peak_in_flight': fake.peak_in_flight,
+        'requests_per_sec': round(fake.calls / elapsed, 1),
+        'retries': client.retries,
+        'errors': errors
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=200)
+    parser.add_argument('--pages', type=int, default=4, help='pages per document (<=16 is one Vision call)')
+    parser.add_argument('--latency', type=float, default=0.2, help='simulated Vision round trip in seconds')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--rate', type=float, default=100, help='token bucket requests/sec')
+    parser.add_argument('--burst', type=int, default=10)
+    parser.add_argument('--timeout', type=float, default=5)
+    parser.add_argument('--fail-every', type=int, default=0, help='inject a 503 every N calls')
+    parser.add_argument('--skip-serial', action='store_true')
+    args = parser.parse_args()
+    
+    documents = [[PAGE_BYTES] * args.pages for _ in range(args.docs)]
+    results = {
+        'benchmark': 'ocr_async',
+        'docs': args.docs,
+        'pages': args.pages,
+        'latency': args.latency,
+        'concurrency': args.concurrency,
+        'rate_limit': args.rate
+    }
+    if not args.skip_serial:
+        results['serial'] = run_serial(args, documents)
+    results['async'] = asyncio.run(run_async(args, documents))
+    if 'serial' in results:
+        results['speedup'] = round(results['async']['docs_per_sec'] / results['serial']['docs_per_sec'], 2)
+    print(json.dumps(results, indent=2))
+    return 1 if results['async']['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
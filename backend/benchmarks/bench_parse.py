@@ -0,0 +1,213 @@
+"""Micro-benchmark for parse_vehicle_data: compiled engine vs the original per-field regexes
+
+Usage (from backend/):
+    python -m benchmarks.bench_parse --docs 500 --pages 8
+    python -m benchmarks.bench_parse --samples
+
+Generates synthetic multi-page OCR texts (or, with --samples, uses the text of the sample
+PDFs under uploads/), checks both implementations return identical fields for every
+document, then reports throughput in docs/sec as JSON.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+
+os.environ.setdefault('OCR_FAKE_VISION', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ocr import DOCUMENT_TYPES, PAGE_SEPARATOR, VIN_PATTERN, parse_vehicle_data
+
+# --- Original implementation, kept verbatim as the baseline ---
+
+def legacy_extract_vin(text):
+    """Extract VIN (17-character code)"""
+    matches = re.findall(VIN_PATTERN, text, re.IGNORECASE)
+    if matches:
+        return matches[0].upper()
+    return None
+
+def legacy_extract_buyer_name(text):
+    """Extract buyer name from 'Sold To:' field"""
+    patterns = [
+        r'Sold\s+To[:\s]+([^\n]+?)(?:\nEmail|City|Address|$)',
+        r'Sold\s+To[:\s]+([A-Za-z\s]+?)(?:\n|$)',
+    ]
+    
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        if match:
+            name = match.group(1).strip()
+            if name and len(name) > 2 and len(name) < 100:
+                name = re.sub(r'[^\w\s]', '', name).strip()
+                if name and name.upper() not in ['INFORMATION', 'DETAILS', 'CUSTOMER']:
+                    return name
+    return None
+
+def legacy_extract_seller_name(text):
+    """Extract seller/dealer name from 'We Own:' field"""
+    patterns = [
+        r'We\s+Own[:\s]+([^\n]+?)(?:\n|Dealer|Address|$)',
+        r'We\s+Own[:\s]+([A-Za-z\s]+?)(?:\n|$)',
+    ]
+    
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        if match:
+            name = match.group(1).strip()
+            if name and len(name) > 2 and len(name) < 100:
+                name = re.sub(r'[^\w\s]', '', name).strip()
+                if name and name.upper() not in ['INFORMATION', 'DETAILS', 'DEAL']:
+                    return name
+    return None
+
+def legacy_extract_date(text):
+    """Extract purchase date"""
+    patterns = [
+        r'Purchase\s+Date[:\s]+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
+        r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
+        r'(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{4}'
+    ]
+    
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            return match.group(1)
+    return None
+
+def legacy_extract_amount(text):
+    """Extract only the amount with $ sign"""
+    pattern = r'\$\s*([\d,]+\.?\d*)'
+    match = re.search(pattern, text)
+    if match:
+        return match.group(0).strip()
+    return None
+
+def legacy_extract_odometer(text):
+    """Extract odometer reading with 'miles' suffix"""
+    patterns = [
+        r'Odometer\s+Reading[:\s]+([0-9,]+)\s*(?:miles|mi)?',
+        r'(?:Odometer|Mileage)[:\s]+([0-9,]+)\s*(?:miles|mi)?',
+        r'([0-9,]+)\s+miles',
+    ]
+    
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            odometer = match.group(1).replace(',', '').strip()
+            if len(odometer) > 2 and len(odometer) < 8:
+                return f"{odometer} miles"
+    return None
+
+def legacy_identify_document_type(text):
+    """Identify type of document"""
+    text_lower = text.lower()
+    for doc_type, keywords in DOCUMENT_TYPES.items():
+        for keyword in keywords:
+            if keyword in text_lower:
+                return doc_type
+    return 'unknown'
+
+def legacy_parse_vehicle_data(text):
+    """parse_vehicle_data as it was before the compiled engine"""
+    try:
+        return {
+            'vin': legacy_extract_vin(text),
+            'buyer_name': legacy_extract_buyer_name(text),
+            'seller_name': legacy_extract_seller_name(text),
+            'sale_date': legacy_extract_date(text),
+            'sale_amount': legacy_extract_amount(text),
+            'odometer_reading': legacy_extract_odometer(text),
+            'document_type': legacy_identify_document_type(text)
+        }
+    except Exception as e:
+        return {}
+
+FIRST_NAMES = ['John', 'Maria', 'Wei', 'Aisha', 'Carlos', 'Priya', 'Olu', 'Sven']
+LAST_NAMES = ['Smith', 'Garcia', 'Chen', 'Khan', 'Lopez', 'Patel', 'Adeyemi', 'Berg']
+DEALERS = ['Sunrise Motors', 'Valley Auto Group', 'Metro Cars LLC', 'Lakeside Ford']
+VIN_CHARS = 'ABCDEFGHJKLMNPRSTUVWXYZ0123456789'
+FILLER = [
+    'The undersigned certifies the information above is true and correct.',
+    'Federal and state law require that you state the mileage upon transfer of ownership.',
+    'Failure to complete or providing a false statement may result in fines and/or imprisonment.',
+    'Lienholder: First National Bank, 100 Main Street, Springfield.',
+    'Trade-in allowance applied to balance. Taxes and fees itemized separately.',
+    'Signature of buyer ______________________   Date ____________',
+]
+KEYWORDS = [k for keywords in DOCUMENT_TYPES.values() for k in keywords]
+
+def synthetic_page(rng):
+    """One page of OCR-like text with a random subset of labelled fields"""
+    lines = [rng.choice(FILLER) for _ in range(rng.randint(10, 40))]
+    fields = [
+        f'Sold To: {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+        f'Email: buyer{rng.randint(1, 999)}@example.com',
+        f'We Own: {rng.choice(DEALERS)}',
+        f'Purchase Date: {rng.randint(1, 12)}/{rng.randint(1, 28)}/20{rng.randint(10, 25)}',
+        f'VIN: {"".join(rng.choice(VIN_CHARS) for _ in range(17))}',
+        f'Odometer Reading: {rng.randint(100, 250000):,} miles',
+        f'Mileage: {rng.randint(10, 99999)}',
+        f'Total Price: ${rng.randint(1000, 90000):,}.{rng.randint(0, 99):02d}',
+        f'{rng.choice(["March", "July", "December"])} {rng.randint(1, 28)}, 20{rng.randint(10, 25)}',
+        rng.choice(KEYWORDS).upper(),
+    ]
+    for field in rng.sample(fields, rng.randint(0, len(fields))):
+        lines.insert(rng.randint(0, len(lines)), field)
+    return '\n'.join(lines)
+
+def synthetic_documents(count, pages, seed):
+    rng = random.Random(seed)
+    return [
+        PAGE_SEPARATOR.join(synthetic_page(rng) for _ in range(rng.randint(1, pages)))
+        for _ in range(count)
+    ]
+
+def throughput(parse, texts, repeat):
+    """Best-of-N docs/sec"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            parse(text)
+        best = min(best, time.perf_counter() - start)
+    return len(texts) / best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=300)
+    parser.add_argument('--pages', type=int, default=8, help='max pages per document')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--samples', action='store_true', help='parse the sample PDFs under uploads/')
+    args = parser.parse_args()
+    
+    if args.samples:
+        from benchmarks.common import sample_texts
+        texts = sample_texts()
+        # Cycle the handful of samples up to --docs so timings are not dominated by noise
+        texts = [texts[i % len(texts)] for i in range(max(args.docs, len(texts)))]
+    else:
+        texts = synthetic_documents(args.docs, args.pages, args.seed)
+    mismatches = sum(parse_vehicle_data(t) != legacy_parse_vehicle_data(t) for t in texts)
+    
+    before = throughput(legacy_parse_vehicle_data, texts, args.repeat)
+    after = throughput(parse_vehicle_data, texts, args.repeat)
+    
+    print(json.dumps({
+        'benchmark': 'parse_vehicle_data',
+        'source': 'samples' if args.samples else 'synthetic',
+        'docs': len(texts),
+        'avg_chars': sum(map(len, texts)) // len(texts),
+        'mismatches': mismatches,
+        'before_docs_per_sec': round(before, 1),
+        'after_docs_per_sec': round(after, 1),
+        'speedup': round(after / before, 2)
+    }, indent=2))
+    return 1 if mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""OCR image preprocessing: payload bytes, latency and field-extraction accuracy against unprocessed images
+
+Usage (from backend/):
+    python -m benchmarks.bench_preprocess --quality 60,80,95
+    OCR_FAKE_VISION=0 python -m benchmarks.bench_preprocess   # accuracy through real Vision
+
+Every page of the sample PDFs under uploads/ is rendered at --dpi the old way (full colour,
+PyMuPDF's default JPEG quality) and preprocessed at each --quality, and a colour photo of each
+first page (--photo-dpi, JPEG) goes through prepare_image. Reports bytes and ms per image and the
+bytes saved. Accuracy: fields parsed from OCR of each variant are compared with the fields parsed
+from the PDFs' own text layer; 'mismatches' counts fields the unprocessed images got right and the
+preprocessed ones did not, and the exit code is 1 when there are any. OCR uses real Vision when
+OCR_FAKE_VISION=0 and it is installed, else local Tesseract, else accuracy is reported as skipped.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+from benchmarks.common import configure_env, environment, sample_pdfs, summarize
+
+FIELDS = ('vin', 'buyer_name', 'seller_name', 'sale_date', 'sale_amount', 'odometer_reading', 'document_type')
+
+def ocr_engine():
+    """(name, images -> texts) for the best OCR engine on this host, or (None, reason)"""
+    from app import ocr, tesseract
+    if not ocr.USE_FAKE_VISION and ocr.vision_installed():
+        def vision(images):
+            texts, error = ocr.annotate_images(images)
+            if error:
+                raise RuntimeError(error)
+            return texts
+        return 'vision', vision
+    if tesseract.is_available():
+        return 'tesseract', lambda images: [tesseract.ocr_image_bytes(content)[0] for content in images]
+    return None, 'no OCR engine: set OCR_FAKE_VISION=0 with Vision credentials, or install tesseract'
+
+def render(pages, dpi, preprocess, quality=None):
+    """[(document index, JPEG bytes)] and per-image ms for every page"""
+    import fitz
+    from app import rasterize
+    rasterize.OCR_PREPROCESS = preprocess
+    if quality:
+        rasterize.OCR_JPEG_QUALITY = quality
+    images, latencies = [], []
+    for index, path, page_number in pages:
+        start = time.perf_counter()
+        with fitz.open(path) as pdf_document:
+            images.append((index, rasterize.render_ocr_image(pdf_document[page_number], dpi / 72)))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return images, latencies
+
+def write_photos(pdfs, dpi, workdir):
+    """First page of every sample as a full-colour JPEG, standing in for a phone photo"""
+    import fitz
+    photos = []
+    for index, path in enumerate(pdfs):
+        photo = os.path.join(workdir, f'photo{index}.jpg')
+        with fitz.open(path) as pdf_document:
+            pix = pdf_document[0].get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72))
+            with open(photo, 'wb') as out:
+                out.write(pix.tobytes('jpeg', jpg_quality=92))
+        photos.append((index, photo))
+    return photos
+
+def prepare(photos, preprocess, quality=None):
+    from app import rasterize
+    rasterize.OCR_PREPROCESS = preprocess
+    if quality:
+        rasterize.OCR_JPEG_QUALITY = quality
+    images, latencies = [], []
+    for index, photo in photos:
+        start = time.perf_counter()
+        images.append((index, rasterize.prepare_image(photo)))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return images, latencies
+
+def correct_fields(images, truth, engine):
+    """{(document index, field)} the engine's text got right"""
+    from app.ocr import PAGE_SEPARATOR, parse_vehicle_data
+    texts = engine([content for _, content in images])
+    by_document = {}
+    for (index, _), text in zip(images, texts):
+        by_document.setdefault(index, []).append(text)
+    correct = set()
+    for index, texts in by_document.items():
+        parsed = parse_vehicle_data(PAGE_SEPARATOR.join(texts))
+        correct.update((index, field) for field in FIELDS if truth[index][field] is not None and parsed[field] == truth[index][field])
+    return correct
+
+def measure(images, latencies, baseline_bytes):
+    sizes = [len(content) for _, content in images]
+    return {
+        'images': len(images),
+        'kb_per_image': round(sum(sizes) / len(sizes) / 1024, 1),
+        'bytes_saved_pct': round((1 - sum(sizes) / baseline_bytes) * 100, 1) if baseline_bytes else 0.0,
+        'latency': summarize(latencies)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dpi', type=int, default=144, help='PDF render DPI (OCR_PDF_DPI)')
+    parser.add_argument('--quality', default='80', help='comma-separated JPEG qualities to preprocess at')
+    parser.add_argument('--photo-dpi', type=int, default=400, help='resolution of the simulated photos')
+    args = parser.parse_args()
+    
+    results = {'benchmark': 'preprocess', 'environment': environment(), 'dpi': args.dpi}
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_env(workdir)
+        import fitz
+        from app.ocr import PAGE_SEPARATOR, TextLayerBackend, parse_vehicle_data
+        
+        pdfs = sample_pdfs()
+        pages, truth = [], []
+        for index, path in enumerate(pdfs):
+            with fitz.open(path) as pdf_document:
+                page_count = pdf_document.page_count
+            pages.extend((index, path, n) for n in range(page_count))
+            texts, _ = TextLayerBackend().extract_pages(path, range(page_count))
+            truth.append(parse_vehicle_data(PAGE_SEPARATOR.join(text for text, _ in texts or [])))
+        photos = write_photos(pdfs, args.photo_dpi, workdir)
+        
+        engine_name, engine = ocr_engine()
+        expected = sum(1 for fields in truth for field in FIELDS if fields[field] is not None)
+        
+        variants = {'pdf': (render, pages, args.dpi), 'photo': (prepare, photos)}
+        for kind, (run, items, *extra) in variants.items():
+            baseline_images, baseline_latencies = run(items, *extra, False)
+            baseline_bytes = sum(len(content) for _, content in baseline_images)
+            baseline_correct = correct_fields(baseline_images, truth, engine) if engine_name else None
+            results[kind] = {'unprocessed': measure(baseline_images, baseline_latencies, 0), 'preprocessed': []}
+            if engine_name:
+                results[kind]['unprocessed']['fields_correct'] = len(baseline_correct)
+            
+            for quality in (int(q) for q in args.quality.split(',')):
+                images, latencies = run(items, *extra, True, quality)
+                entry = {'quality': quality, **measure(images, latencies, baseline_bytes)}
+                if engine_name:
+                    correct = correct_fields(images, truth, engine)
+                    entry['fields_correct'] = len(correct)
+                    entry['mismatches'] = len(baseline_correct - correct)
+                results[kind]['preprocessed'].append(entry)
+        
+        results['accuracy'] = {'engine': engine_name, 'fields_expected': expected} if engine_name else {'skipped': engine}
+    
+    print(json.dumps(results, indent=2))
+    regressed = any(entry.get('mismatches') for kind in ('pdf', 'photo') for entry in results[kind]['preprocessed'])
+    return 1 if regressed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""PDF rasterization time and memory per DPI, one page at a time and through the render pool
+
+Usage (from backend/):
+    python -m benchmarks.bench_rasterize --dpi 100,144,200,300 --pages 16
+
+Builds a --pages page PDF from the samples under uploads/, then for each DPI runs a fresh
+subprocess (so peak RSS is per setting) that renders every page serially with render_page and
+then all pages at once with render_pages on the OCR_RASTER_WORKERS pool. Reports per-page
+latency, JPEG size, pages/sec and peak RSS of the process and of the pool workers as JSON.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+from benchmarks.common import BACKEND_DIR, environment, peak_rss_mb, sample_pdfs, summarize
+
+def build_pdf(path, pages):
+    """Concatenate the sample PDFs until the document has the requested page count"""
+    import fitz
+    with fitz.open() as out:
+        while out.page_count < pages:
+            for sample in sample_pdfs():
+                with fitz.open(sample) as source:
+                    out.insert_pdf(source, to_page=min(source.page_count, pages - out.page_count) - 1)
+                if out.page_count >= pages:
+                    break
+        out.save(path)
+
+def run_single(args):
+    sys.path.insert(0, BACKEND_DIR)
+    from app.rasterize import OCR_RASTER_WORKERS, get_page_count, render_page, render_pages
+    
+    pages = list(range(get_page_count(args.pdf)))
+    rss_before = peak_rss_mb()
+    latencies, sizes = [], []
+    for _ in range(args.repeat):
+        for page_number in pages:
+            start = time.perf_counter()
+            content = render_page(args.pdf, page_number, args.dpi)
+            latencies.append((time.perf_counter() - start) * 1000)
+            sizes.append(len(content))
+    serial_rss = peak_rss_mb() - rss_before
+    # A single-worker pool renders in-process, see render_pages
+    pooled = OCR_RASTER_WORKERS > 1
+    
+    # First call pays for spawning the pool
+    render_pages(args.pdf, pages[:2], args.dpi)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        render_pages(args.pdf, pages, args.dpi)
+    pool_seconds = time.perf_counter() - start
+    
+    return {
+        'dpi': args.dpi,
+        'render_page': summarize(latencies),
+        'jpeg_kb_per_page': round(sum(sizes) / len(sizes) / 1024, 1),
+        'serial_pages_per_sec': round(len(latencies) / (sum(latencies) / 1000), 1),
+        'pool_pages_per_sec': round(len(pages) * args.repeat / pool_seconds, 1),
+        'pool_workers': OCR_RASTER_WORKERS,
+        'rss_growth_mb': round(serial_rss, 1),
+        'pool_worker_peak_rss_mb': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1) if pooled else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dpi', default='100,144,200,300', help='comma-separated DPI values')
+    parser.add_argument('--pages', type=int, default=16)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--pdf', help=argparse.SUPPRESS)
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.single:
+        args.dpi = int(args.dpi)
+        print(json.dumps(run_single(args)))
+        return 0
+    
+    results = {'benchmark': 'rasterize', 'pages': args.pages, 'environment': environment(), 'runs': []}
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = os.path.join(tmp, 'bench.pdf')
+        build_pdf(pdf, args.pages)
+        for dpi in args.dpi.split(','):
+            out = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_rasterize', '--single', '--pdf', pdf,
+                 '--dpi', dpi, '--repeat', str(args.repeat)],
+                cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+            )
+            results['runs'].append(json.loads(out.stdout.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
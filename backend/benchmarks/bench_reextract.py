@@ -0,0 +1,70 @@
+"""Offline re-extraction throughput: stale documents reparsed per second, per worker count and batch size
+
+Usage (from backend/):
+    python -m benchmarks.bench_reextract --docs 20000 --workers 1,2,4 --batch-size 1000
+
+Seeds --docs completed documents whose OCR text cycles through the sample PDFs' text layers,
+then for every worker count marks them all stale and times a full reextract() pass. Reports
+docs/sec, rows whose fields changed and peak RSS (which should stay flat as --docs grows) as JSON.
+"""
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+from benchmarks.common import configure_env, environment, peak_rss_mb, sample_texts, seed_database
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=20000)
+    parser.add_argument('--workers', default='1,2,4', help='comma-separated parser process counts')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+    
+    results = {
+        'benchmark': 'reextract',
+        'environment': environment(),
+        'docs': args.docs,
+        'batch_size': args.batch_size,
+        'runs': []
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_env(workdir)
+        from sqlalchemy import update
+        from app import create_app, db
+        from app.models import Document, DocumentText
+        from app.reextract import reextract
+        
+        app = create_app(start_workers=False)
+        seed_database(app, 1, args.docs)
+        texts = sample_texts()
+        with app.app_context():
+            for start in range(1, args.docs + 1, args.batch_size):
+                db.session.execute(update(DocumentText), [
+                    {'document_id': doc_id, 'extracted_text': texts[doc_id % len(texts)]}
+                    for doc_id in range(start, min(start + args.batch_size, args.docs + 1))
+                ])
+                db.session.commit()
+            
+            for workers in args.workers.split(','):
+                db.session.execute(update(Document).values(parser_version=None))
+                db.session.commit()
+                rss_before = peak_rss_mb()
+                start = time.perf_counter()
+                done, changed = reextract(args.batch_size, int(workers))
+                seconds = time.perf_counter() - start
+                results['runs'].append({
+                    'workers': int(workers),
+                    'reparsed': done,
+                    'changed': changed,
+                    'docs_per_sec': round(done / seconds, 1),
+                    'seconds': round(seconds, 2),
+                    'rss_growth_mb': round(peak_rss_mb() - rss_before, 1)
+                })
+    
+    print(json.dumps(results, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
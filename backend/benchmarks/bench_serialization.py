@@ -0,0 +1,158 @@
+"""Document list serialization: time and bytes on the wire, legacy jsonify against orjson, serializers and compression
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization --docs 1000,10000 --repeat 5
+
+Seeds one dealer with the largest --docs count, every row with --notes-bytes of notes, and for
+each count serializes that many rows with every list field (notes and OCR fields included):
+  legacy   Document.row_to_dict as it was (a type check per value) and Flask's default provider
+  current  the precomputed Document.serializer and the app's JSON provider (orjson when installed)
+'mismatches' counts payloads that decode differently. Wire bytes are reported raw and compressed
+with the app's gzip and (when installed) brotli settings. 'endpoint' walks GET /api/documents
+pages over the same rows with and without Accept-Encoding. Results are printed as JSON.
+"""
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import date
+
+from benchmarks.common import access_tokens, configure_env, environment, seed_database, summarize
+
+def legacy_row_to_dict(row, fields):
+    """Document.row_to_dict before precomputed serializers"""
+    data = dict(zip(fields, row))
+    for key, value in data.items():
+        if isinstance(value, date):
+            data[key] = value.isoformat()
+    return data
+
+def timed(fn, repeat):
+    """(last result, millisecond samples)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, samples
+
+def serialize_run(app, rows, fields, repeat):
+    from flask.json.provider import DefaultJSONProvider
+    from app.models import Document
+    
+    legacy_provider = DefaultJSONProvider(app)
+    encode = getattr(app.json, 'dumps_bytes', lambda obj: app.json.dumps(obj).encode())
+    
+    def legacy():
+        return legacy_provider.dumps({
+            'success': True,
+            'documents': [legacy_row_to_dict(row, fields) for row in rows]
+        }).encode()
+    
+    def current():
+        return encode({'success': True, 'documents': Document.serializer(fields).many(rows)})
+    
+    legacy_body, legacy_ms = timed(legacy, repeat)
+    current_body, current_ms = timed(current, repeat)
+    legacy_summary, current_summary = summarize(legacy_ms), summarize(current_ms)
+    return {
+        'legacy': legacy_summary,
+        'current': {'provider': type(app.json).__name__, **current_summary},
+        'speedup': round(legacy_summary['p50_ms'] / current_summary['p50_ms'], 2),
+        'mismatches': int(json.loads(legacy_body) != json.loads(current_body))
+    }, legacy_body, current_body
+
+def wire_sizes(legacy_body, current_body, repeat):
+    from app.compression import ENCODINGS, available_encodings
+    sizes = {
+        'legacy_kb': round(len(legacy_body) / 1024, 1),
+        'raw_kb': round(len(current_body) / 1024, 1)
+    }
+    for encoding in available_encodings():
+        compressed, samples = timed(lambda: ENCODINGS[encoding](current_body), repeat)
+        sizes[encoding] = {
+            'kb': round(len(compressed) / 1024, 1),
+            'ratio': round(len(current_body) / len(compressed), 1),
+            'compress': summarize(samples)
+        }
+    return sizes
+
+def list_query(limit):
+    from app.models import Document
+    return f"/api/documents?fields={','.join(Document.LIST_FIELDS)}&limit={limit}"
+
+def page_urls(client, token, docs):
+    """GET /api/documents URLs of the pages covering the newest docs rows, cursors resolved once"""
+    headers = {'Authorization': f'Bearer {token}'}
+    urls, seen, cursor = [], 0, None
+    while seen < docs:
+        url = list_query(min(500, docs - seen)) + (f'&cursor={cursor}' if cursor else '')
+        page = client.get(url, headers=headers).json
+        urls.append(url)
+        seen += len(page['documents'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    return urls
+
+def endpoint_run(client, token, docs, repeat):
+    """Fetch the list pages covering docs rows per Accept-Encoding: ms per walk and bytes received"""
+    from app.compression import available_encodings
+    urls = page_urls(client, token, docs)
+    results = {'pages': len(urls)}
+    for encoding in ['identity'] + available_encodings():
+        headers = {'Authorization': f'Bearer {token}', 'Accept-Encoding': encoding}
+        received, samples = timed(lambda: sum(len(client.get(url, headers=headers).data) for url in urls), repeat)
+        results[encoding] = {'wire_kb': round(received / 1024, 1), 'walk': summarize(samples)}
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', default='1000,10000', help='comma-separated list sizes')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--notes-bytes', type=int, default=200)
+    args = parser.parse_args()
+    sizes = [int(n) for n in args.docs.split(',')]
+    
+    results = {'benchmark': 'serialization', 'environment': environment(), 'runs': []}
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_env(workdir)
+        from sqlalchemy import update
+        from app import create_app, db
+        from app.models import Document
+        from app.compression import COMPRESS_GZIP_LEVEL, COMPRESS_BROTLI_QUALITY, COMPRESS_MIN_BYTES
+        
+        app = create_app(start_workers=False)
+        user_id, = seed_database(app, 1, max(sizes), text_kb=1)
+        token = access_tokens(app, [user_id])[user_id]
+        client = app.test_client()
+        results['compression'] = {
+            'gzip_level': COMPRESS_GZIP_LEVEL,
+            'brotli_quality': COMPRESS_BROTLI_QUALITY,
+            'min_bytes': COMPRESS_MIN_BYTES
+        }
+        
+        with app.app_context():
+            notes = ('Follow up with lender about payoff. ' * (args.notes_bytes // 36 + 1))[:args.notes_bytes]
+            db.session.execute(update(Document).values(notes=notes))
+            db.session.commit()
+            
+            fields = Document.LIST_FIELDS
+            for docs in sizes:
+                rows = db.session.query(*[getattr(Document, f) for f in fields]).order_by(
+                    Document.uploaded_at.desc(), Document.id.desc()
+                ).limit(docs).all()
+                run, legacy_body, current_body = serialize_run(app, rows, fields, args.repeat)
+                results['runs'].append({
+                    'docs': docs,
+                    **run,
+                    'wire': wire_sizes(legacy_body, current_body, args.repeat),
+                    'endpoint': endpoint_run(client, token, docs, args.repeat)
+                })
+    
+    print(json.dumps(results, indent=2))
+    return 1 if any(run['mismatches'] for run in results['runs']) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
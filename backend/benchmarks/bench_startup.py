@@ -0,0 +1,140 @@
+"""Startup cost: import + create_app time, memory, and gunicorn time-to-ready and per-worker RSS
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup --repeat 5 --workers 4
+
+Every boot runs in a fresh interpreter against a scratch database:
+  first_boot   create_app on an empty database (runs every migration)
+  boot         create_app on a migrated database, the path every worker restart takes;
+               split into 'import app' and create_app, plus RSS afterwards and the heavy
+               modules (google, grpc, fitz) that ended up imported
+  gunicorn     time until the first response, and RSS/PSS of the master and each worker,
+               with and without --preload (PSS shows how much preloading shares)
+Reports JSON. Set OCR_FAKE_VISION=0 on a host with google-cloud-vision to include its cost.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+from benchmarks.common import BACKEND_DIR, configure_env, environment
+
+HEAVY_MODULES = ('google.cloud.vision', 'grpc', 'fitz', 'pymupdf', 'pytesseract', 'PIL')
+
+BOOT_SCRIPT = '''
+import sys, time, json
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+application.test_client().get('/api/documents/stats')
+served = time.perf_counter()
+rss = next(int(line.split()[1]) for line in open('/proc/self/status') if line.startswith('VmRSS'))
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (served - created) * 1000,
+    'rss_mb': rss / 1024,
+    'heavy_modules': [m for m in %r if m in sys.modules]
+}))
+'''
+
+def boot_once():
+    out = subprocess.run(
+        [sys.executable, '-c', BOOT_SCRIPT % (HEAVY_MODULES,)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def proc_memory_mb(pid):
+    """(RSS, PSS) of a process in MB, PSS None where smaps_rollup is unavailable"""
+    with open(f'/proc/{pid}/status') as status:
+        rss = next(int(line.split()[1]) for line in status if line.startswith('VmRSS'))
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as smaps:
+            pss = next(int(line.split()[1]) for line in smaps if line.startswith('Pss:'))
+    except (OSError, StopIteration):
+        pss = None
+    return round(rss / 1024, 1), round(pss / 1024, 1) if pss is not None else None
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as stat:
+                    # ppid is the 4th field, after the parenthesised command name
+                    if int(stat.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        children.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return children
+
+def gunicorn_boot(workers, preload):
+    from benchmarks.bench_gunicorn import free_port, wait_for_server
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}',
+               '--log-level', 'warning', 'run:app']
+    if preload:
+        command.insert(3, '--preload')
+    start = time.perf_counter()
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_for_server(port):
+            raise RuntimeError('gunicorn did not start')
+        ready_ms = (time.perf_counter() - start) * 1000
+        # Let the remaining workers finish booting before measuring them
+        deadline = time.monotonic() + 30
+        while len(child_pids(server.pid)) < workers and time.monotonic() < deadline:
+            time.sleep(0.1)
+        time.sleep(1)
+        # A few requests so most workers have served one, as they would in production
+        for _ in range(workers * 4):
+            wait_for_server(port)
+        master = proc_memory_mb(server.pid)
+        children = [proc_memory_mb(pid) for pid in child_pids(server.pid)]
+    finally:
+        server.terminate()
+        server.wait(10)
+    return {
+        'preload': preload,
+        'workers': workers,
+        'ready_ms': round(ready_ms, 1),
+        'master_rss_mb': master[0],
+        'worker_rss_mb': [rss for rss, _ in children],
+        'worker_pss_mb': [pss for _, pss in children],
+        'total_pss_mb': round(sum(pss for _, pss in [master] + children if pss is not None), 1)
+    }
+
+def median_boot(samples):
+    return {
+        key: round(statistics.median(sample[key] for sample in samples), 1)
+        for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'rss_mb')
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='fresh-interpreter boots to take the median of')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers, 0 to skip gunicorn')
+    args = parser.parse_args()
+    
+    results = {'benchmark': 'startup', 'environment': environment()}
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_env(workdir)
+        first = boot_once()
+        results['first_boot'] = median_boot([first])
+        samples = [boot_once() for _ in range(args.repeat)]
+        results['boot'] = median_boot(samples)
+        results['boot']['heavy_modules'] = samples[-1]['heavy_modules']
+        if args.workers:
+            results['gunicorn'] = [gunicorn_boot(args.workers, preload) for preload in (False, True)]
+    print(json.dumps(results, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
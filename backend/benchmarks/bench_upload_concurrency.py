@@ -0,0 +1,146 @@
+"""Concurrent uploaders against one SQLite database, with OCR workers writing results alongside
+
+Usage (from backend/):
+    python -m benchmarks.bench_upload_concurrency --uploaders 8 --requests 5 --files 10
+
+Each uploader is a separate process with its own app and connections (like gunicorn
+workers) posting multi-file uploads for its own dealer account. An OCR worker process
+drains the queue at the same time. Runs twice:
+  per_file  one request per file, i.e. one transaction per file as the old upload loop did
+  batched   all files of an upload in one request and one transaction
+Reports files/sec, request latency p50/p99 and 'database is locked' failures as JSON.
+Set SQLITE_JOURNAL_MODE=DELETE SQLITE_BUSY_TIMEOUT_MS=0 to see the pre-WAL behaviour.
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_PDF = os.path.join(os.path.dirname(BACKEND_DIR), 'uploads', 'user_1', '20251108_210814_Sample_Dealer_Packet_Filled.pdf')
+
+def configure_env(workdir):
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(workdir, "bench.db")}'
+    os.environ['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+    os.environ.setdefault('OCR_FAKE_VISION', '1')
+    os.environ['OCR_WORKER_MODE'] = 'external'
+    sys.path.insert(0, BACKEND_DIR)
+
+def unique_pdf(base, rng):
+    # Bytes after %%EOF are ignored by readers but give every upload its own hash
+    return base + b'\n%' + rng.randbytes(16).hex().encode() + b'\n'
+
+def uploader(index, workdir, args, per_file, start_event, results):
+    configure_env(workdir)
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    
+    app = create_app(start_workers=False)
+    with app.app_context():
+        token = create_access_token(identity=str(index + 1))
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    base = open(SAMPLE_PDF, 'rb').read()
+    rng = random.Random(index)
+    
+    latencies, errors, locked, files_ok = [], 0, 0, 0
+    start_event.wait()
+    for _ in range(args.requests):
+        batch = [(io.BytesIO(unique_pdf(base, rng)), f'doc{i}.pdf') for i in range(args.files)]
+        groups = [[item] for item in batch] if per_file else [batch]
+        for group in groups:
+            start = time.perf_counter()
+            response = client.post('/api/documents/upload', headers=headers,
+                                    data={'files': group}, content_type='multipart/form-data')
+            latencies.append((time.perf_counter() - start) * 1000)
+            body = response.get_json() or {}
+            files_ok += len(body.get('uploaded') or [])
+            for error in body.get('errors') or [body.get('error') or '']:
+                if error:
+                    errors += 1
+                    locked += 'locked' in error
+    results.put({'latencies': latencies, 'errors': errors, 'locked': locked, 'files': files_ok})
+
+def ocr_worker(workdir, stop_event):
+    configure_env(workdir)
+    from app import create_app
+    from app.jobs import WorkerPool
+    
+    app = create_app(start_workers=False)
+    pool = WorkerPool(app, mode='thread').start()
+    stop_event.wait()
+    pool.stop()
+
+def run(args, per_file):
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_env(workdir)
+        from app import create_app, db
+        from app.models import User
+        
+        app = create_app(start_workers=False)
+        with app.app_context():
+            db.session.add_all([User(id=i + 1, email=f'dealer{i}@example.com', password='x') for i in range(args.uploaders)])
+            db.session.commit()
+        
+        start_event, stop_event, results = ctx.Event(), ctx.Event(), ctx.Queue()
+        procs = [ctx.Process(target=uploader, args=(i, workdir, args, per_file, start_event, results))
+                 for i in range(args.uploaders)]
+        worker = ctx.Process(target=ocr_worker, args=(workdir, stop_event)) if args.ocr_workers else None
+        for proc in procs + ([worker] if worker else []):
+            proc.start()
+        
+        # Let every process finish booting before the clock starts
+        time.sleep(args.warmup)
+        started = time.perf_counter()
+        start_event.set()
+        collected = [results.get() for _ in procs]
+        elapsed = time.perf_counter() - started
+        for proc in procs:
+            proc.join()
+        if worker:
+            stop_event.set()
+            worker.join(10)
+    
+    latencies = sorted(l for r in collected for l in r['latencies'])
+    files = sum(r['files'] for r in collected)
+    return {
+        'files': files,
+        'seconds': round(elapsed, 2),
+        'files_per_sec': round(files / elapsed, 1),
+        'requests': len(latencies),
+        'p50_ms': round(statistics.median(latencies), 1),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 1),
+        'errors': sum(r['errors'] for r in collected),
+        'locked_errors': sum(r['locked'] for r in collected)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--uploaders', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=5, help='uploads per uploader')
+    parser.add_argument('--files', type=int, default=10, help='files per upload')
+    parser.add_argument('--ocr-workers', type=int, default=1, help='0 to upload with no OCR writes')
+    parser.add_argument('--warmup', type=float, default=5, help='seconds to let processes boot')
+    args = parser.parse_args()
+    
+    results = {
+        'benchmark': 'upload_concurrency',
+        'uploaders': args.uploaders,
+        'files_per_upload': args.files,
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'busy_timeout_ms': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '30000'))
+    }
+    for name, per_file in (('per_file', True), ('batched', False)):
+        results[name] = run(args, per_file)
+    print(json.dumps(results, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
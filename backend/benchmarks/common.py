@@ -0,0 +1,162 @@
+"""Shared helpers for the benchmark suite: environment, seeding, sample files and result summaries"""
+import os
+import sys
+import glob
+import random
+import platform
+import resource
+import statistics
+import subprocess
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+SAMPLES_DIR = os.path.join(REPO_DIR, 'uploads')
+SEED_BATCH_SIZE = 500
+BENCH_PASSWORD = 'bench-password'
+
+def configure_env(workdir, **env):
+    """Point the app at a scratch database and upload folder, with fake Vision and no in-process workers"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(workdir, "bench.db")}'
+    os.environ['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+    os.environ.setdefault('OCR_FAKE_VISION', '1')
+    os.environ.setdefault('OCR_WORKER_MODE', 'external')
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-only-secret-key-0123456789abcdef')
+    for name, value in env.items():
+        os.environ[name] = str(value)
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+def sample_pdfs():
+    """PDFs checked in under uploads/"""
+    return sorted(glob.glob(os.path.join(SAMPLES_DIR, '*', '*.pdf')))
+
+def sample_texts():
+    """Text layer of every sample PDF, one string per document as OCR would produce it"""
+    from app.ocr import PAGE_SEPARATOR, TextLayerBackend
+    from app.rasterize import get_page_count
+    
+    backend = TextLayerBackend()
+    texts = []
+    for path in sample_pdfs():
+        pages, error = backend.extract_pages(path, range(get_page_count(path)))
+        if not error:
+            texts.append(PAGE_SEPARATOR.join(text for text, _ in pages))
+    return texts
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def summarize(latencies_ms):
+    """p50/p99/mean of a list of millisecond samples"""
+    if not latencies_ms:
+        return {'count': 0}
+    return {
+        'count': len(latencies_ms),
+        'p50_ms': round(statistics.median(latencies_ms), 2),
+        'p99_ms': round(percentile(latencies_ms, 0.99), 2),
+        'mean_ms': round(statistics.fmean(latencies_ms), 2)
+    }
+
+def environment():
+    """Where and on what a result was produced, so runs can be compared across commits"""
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        'git_revision': revision,
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count()
+    }
+
+def document_rows(user_id, first_id, count, rng, start=datetime(2024, 1, 1)):
+    """Synthetic completed document rows for one dealer"""
+    types = ['buyer_order', 'vehicle_title', 'odometer_statement', 'bill_of_sale', 'unknown']
+    rows = []
+    for i in range(count):
+        doc_id = first_id + i
+        cents = rng.randint(100000, 9000000)
+        sale_date = start + timedelta(days=rng.randint(0, 365))
+        miles = rng.randint(100, 250000)
+        rows.append({
+            'id': doc_id,
+            'uploaded_by': user_id,
+            'filename': f'doc{doc_id}.pdf',
+            'original_filename': f'doc{doc_id}.pdf',
+            'file_type': 'pdf',
+            'file_size': 250000,
+            'file_path': f'/uploads/user_{user_id}/doc{doc_id}.pdf',
+            'status': 'completed',
+            'vin': '1HGCM82633A004352',
+            'buyer_name': 'John Smith',
+            'seller_name': 'Sunrise Motors',
+            'sale_date': sale_date.strftime('%m/%d/%Y'),
+            'sale_amount': f'${cents / 100:,.2f}',
+            'odometer_reading': f'{miles:,} miles',
+            'sale_amount_cents': cents,
+            'sale_date_value': sale_date.date(),
+            'odometer_miles': miles,
+            'document_type': rng.choice(types),
+            'uploaded_at': start + timedelta(minutes=i),
+            'processed_at': start + timedelta(minutes=i, seconds=5)
+        })
+    return rows
+
+def seed_database(app, users, docs_per_user, text_kb=4, seed=1):
+    """Insert dealers bench{i}@example.com with completed documents and OCR text, returns user ids"""
+    from app import db
+    from app.models import User, Document, DocumentText
+    from app.passwords import hash_password
+    from app.search import get_backend
+    from app.stats import rebuild_rollup
+    
+    rng = random.Random(seed)
+    filler = 'VIN odometer buyer seller title lien dealer signature miles date '
+    text = (filler * (text_kb * 1024 // len(filler) + 1))[:text_kb * 1024]
+    with app.app_context():
+        stored = hash_password(BENCH_PASSWORD)
+        db.session.add_all([
+            User(id=i, email=f'bench{i}@example.com', password=stored, role='dealer', dealership_name=f'Dealer {i}')
+            for i in range(1, users + 1)
+        ])
+        db.session.commit()
+        
+        next_id = 1
+        for user_id in range(1, users + 1):
+            for start in range(0, docs_per_user, SEED_BATCH_SIZE):
+                rows = document_rows(user_id, next_id, min(SEED_BATCH_SIZE, docs_per_user - start), rng)
+                next_id += len(rows)
+                db.session.execute(Document.__table__.insert(), rows)
+                db.session.execute(DocumentText.__table__.insert(), [
+                    {'document_id': row['id'], 'extracted_text': text} for row in rows
+                ])
+                # Search index and rollups as the OCR worker would have left them
+                for row in rows:
+                    get_backend().index_text(row['id'], user_id, text)
+                db.session.commit()
+        
+        rebuild_rollup()
+        db.session.commit()
+    return list(range(1, users + 1))
+
+def access_tokens(app, user_ids):
+    """Login-equivalent access tokens, minted directly so seeding does not pay for password hashing"""
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        return {
+            user_id: create_access_token(
+                identity=str(user_id),
+                additional_claims={'role': 'dealer', 'dealership': f'Dealer {user_id}'},
+                expires_delta=timedelta(hours=2)
+            )
+            for user_id in user_ids
+        }
@@ -0,0 +1,147 @@
+"""Run the benchmark suite and save one JSON document, optionally compared with an earlier run
+
+Usage (from backend/):
+    python -m benchmarks.run_all --preset quick --output bench-$(git rev-parse --short HEAD).json
+    python -m benchmarks.run_all --preset quick --compare bench-abc1234.json
+    python -m benchmarks.run_all --only parse,list,rasterize
+
+Each benchmark runs as its own subprocess with the preset's arguments; failures are recorded
+rather than aborting the suite. With --compare, every numeric result whose name says which
+direction is better (*_per_sec and speedup up; *_ms, *_mb, seconds and error counts down) is
+diffed against the earlier file, and changes beyond --threshold are listed. Exits 1 when a
+benchmark failed or a regression was found.
+"""
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from benchmarks.common import BACKEND_DIR, environment
+
+# name: (module, quick args, full args)
+SUITE = {
+    'parse': ('bench_parse', ['--samples', '--docs', '300', '--repeat', '2'], ['--samples', '--docs', '2000', '--repeat', '5']),
+    'parse_synthetic': ('bench_parse', ['--docs', '200', '--repeat', '2'], ['--docs', '1000', '--repeat', '5']),
+    'list': ('bench_list', ['--docs', '2000', '--repeat', '3'], ['--docs', '20000', '--repeat', '5']),
+    'preprocess': ('bench_preprocess', ['--quality', '80'], ['--quality', '60,80,95']),
+    'rasterize': ('bench_rasterize', ['--dpi', '144', '--pages', '4', '--repeat', '2'], []),
+    'upload': ('bench_upload_concurrency', ['--uploaders', '2', '--requests', '2', '--files', '5', '--warmup', '3'], []),
+    'ocr_async': ('bench_ocr_async', ['--docs', '50', '--latency', '0.05'], []),
+    'login': ('bench_login', ['--workers', '2', '--logins', '10', '--users', '10', '--methods', 'scrypt:32768:8:1',
+                              '--me-requests', '300'], []),
+    'serialization': ('bench_serialization', ['--docs', '1000', '--repeat', '3'], ['--docs', '1000,10000', '--repeat', '5']),
+    'reextract': ('bench_reextract', ['--docs', '5000', '--workers', '1,2'], ['--docs', '100000', '--workers', '1,2,4']),
+    'startup': ('bench_startup', ['--repeat', '3', '--workers', '2'], []),
+    'gunicorn': ('bench_gunicorn', ['--workers', '1,2', '--concurrency', '1,8', '--duration', '3', '--users', '4',
+                                    '--docs', '200'], ['--upload-ratio', '0.1']),
+}
+
+HIGHER_IS_BETTER = ('per_sec', 'speedup')
+LOWER_IS_BETTER = ('_ms', '_mb', 'seconds', 'errors', 'failures', 'mismatches')
+
+def run_benchmark(module, args, timeout):
+    """Run one benchmark module, returns (result, error)"""
+    start = time.perf_counter()
+    try:
+        out = subprocess.run(
+            [sys.executable, '-m', f'benchmarks.{module}', *args],
+            cwd=BACKEND_DIR, capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return None, f'timed out after {timeout}s'
+    # Parse from the first JSON object, past any notices printed before it (e.g. the Vision credentials check)
+    try:
+        result, _ = json.JSONDecoder().raw_decode(out.stdout[out.stdout.index('{'):])
+    except ValueError:
+        return None, (out.stderr.strip().splitlines() or [f'exit code {out.returncode}'])[-1]
+    result['wall_seconds'] = round(time.perf_counter() - start, 1)
+    return result, None
+
+def flatten(value, prefix=''):
+    """Dotted path -> number for every numeric leaf"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key != 'environment':
+                yield from flatten(item, f'{prefix}.{key}' if prefix else key)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            yield from flatten(item, f'{prefix}[{index}]')
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, value
+
+def direction(path):
+    """+1 when bigger is better, -1 when smaller is, 0 for counts and settings"""
+    name = path.rsplit('.', 1)[-1]
+    if name == 'wall_seconds':
+        return 0
+    if any(marker in name for marker in HIGHER_IS_BETTER):
+        return 1
+    if any(name.endswith(marker) for marker in LOWER_IS_BETTER):
+        return -1
+    return 0
+
+def compare(baseline, current, threshold):
+    """Changes beyond threshold (a fraction) between two suite results"""
+    before = dict(flatten(baseline.get('results', {})))
+    changes = {'regressions': [], 'improvements': []}
+    for path, value in flatten(current.get('results', {})):
+        sign = direction(path)
+        old = before.get(path)
+        if not sign or old is None:
+            continue
+        if old == 0:
+            # Zero-to-nonzero error counts are regressions whatever the percentage
+            if value and sign < 0:
+                changes['regressions'].append({'metric': path, 'before': old, 'after': value})
+            continue
+        change = (value - old) / abs(old)
+        if abs(change) < threshold:
+            continue
+        entry = {'metric': path, 'before': old, 'after': value, 'change_pct': round(change * 100, 1)}
+        changes['improvements' if change * sign > 0 else 'regressions'].append(entry)
+    return changes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--preset', choices=['quick', 'full'], default='quick')
+    parser.add_argument('--only', help=f'comma-separated subset of: {", ".join(SUITE)}')
+    parser.add_argument('--output', help='write the results here as well as to stdout')
+    parser.add_argument('--compare', help='earlier run_all output to diff against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative change worth reporting')
+    parser.add_argument('--timeout', type=int, default=1800, help='seconds per benchmark')
+    args = parser.parse_args()
+    
+    names = args.only.split(',') if args.only else list(SUITE)
+    unknown = [name for name in names if name not in SUITE]
+    if unknown:
+        parser.error(f'unknown benchmark(s): {", ".join(unknown)}')
+    
+    suite = {'preset': args.preset, 'environment': environment(), 'results': {}, 'errors': {}}
+    for name in names:
+        module, quick, full = SUITE[name]
+        print(f'running {name}...', file=sys.stderr, flush=True)
+        result, error = run_benchmark(module, quick if args.preset == 'quick' else full, args.timeout)
+        if error:
+            suite['errors'][name] = error
+        else:
+            suite['results'][name] = result
+    
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        suite['comparison'] = {
+            'baseline_revision': baseline.get('environment', {}).get('git_revision'),
+            **compare(baseline, suite, args.threshold)
+        }
+    
+    output = json.dumps(suite, indent=2)
+    if args.output:
+        with open(args.output, 'w') as out:
+            out.write(output + '\n')
+    print(output)
+    regressed = args.compare and suite['comparison']['regressions']
+    return 1 if suite['errors'] or regressed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
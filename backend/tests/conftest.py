@@ -0,0 +1,94 @@
+"""Shared fixtures: a fresh app and SQLite database per test, fake Vision and no background workers
+
+Run from backend/: python -m pytest
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+SAMPLES_DIR = os.path.join(REPO_DIR, 'uploads')
+
+# Module-level settings are read at import, so they are set before anything imports app
+TEST_ROOT = tempfile.mkdtemp(prefix='dealership-tests-')
+os.environ.update({
+    'UPLOAD_FOLDER': os.path.join(TEST_ROOT, 'uploads'),
+    'THUMBNAIL_FOLDER': os.path.join(TEST_ROOT, 'thumbnails'),
+    'STORAGE_FAKE_S3_ROOT': os.path.join(TEST_ROOT, 'fake-s3'),
+    'OCR_FAKE_VISION': '1',
+    'OCR_WORKER_MODE': 'external',
+    'JWT_SECRET_KEY': 'test-only-secret-key-0123456789abcdef',
+    'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+})
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "test.db"}')
+    from app import create_app, db
+    app = create_app(start_workers=False)
+    app.config['TESTING'] = True
+    with app.app_context():
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def create_user(app, email='dealer@example.com'):
+    """Dealer row and an Authorization header for it, (user_id, headers)"""
+    from flask_jwt_extended import create_access_token
+    from app import db
+    from app.models import User
+    user = User(email=email, password='unused', role='dealer', dealership_name='Test Motors')
+    db.session.add(user)
+    db.session.commit()
+    token = create_access_token(identity=str(user.id), additional_claims={'role': 'dealer', 'dealership': 'Test Motors'})
+    return user.id, {'Authorization': f'Bearer {token}'}
+
+@pytest.fixture
+def dealer(app):
+    return create_user(app)
+
+@pytest.fixture
+def other_dealer(app):
+    return create_user(app, 'other@example.com')
+
+def add_documents(user_id, count, start=datetime(2024, 1, 1), **fields):
+    """Insert completed documents one minute apart, returns their ids oldest first"""
+    from app import db
+    from app.models import Document
+    docs = [
+        Document(
+            uploaded_by=user_id,
+            filename=f'doc{i}.pdf',
+            original_filename=f'doc{i}.pdf',
+            file_type='pdf',
+            file_size=100,
+            file_path=f'00/00/missing{user_id}_{i}.pdf',
+            status=fields.get('status', 'completed'),
+            uploaded_at=start + timedelta(minutes=i),
+            **{name: value for name, value in fields.items() if name != 'status'}
+        )
+        for i in range(count)
+    ]
+    db.session.add_all(docs)
+    db.session.commit()
+    return [doc.id for doc in docs]
+
+def sample_pdf():
+    """Bytes of a checked-in sample PDF"""
+    for root, _, files in os.walk(SAMPLES_DIR):
+        for name in sorted(files):
+            if name.endswith('.pdf'):
+                with open(os.path.join(root, name), 'rb') as f:
+                    return f.read()
+    pytest.skip('no sample PDFs under uploads/')
@@ -0,0 +1,72 @@
+"""Login: password hashes are upgraded to the configured policy; logout revokes the token"""
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import db
+from app.models import RevokedToken, User
+from app.passwords import PASSWORD_HASH_METHOD, hash_password, method_prefix
+
+def add_user(password_hash):
+    user = User(email='legacy@example.com', password=password_hash, role='dealer', dealership_name='Legacy Motors')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+def login(client, password='correct horse'):
+    return client.post('/api/auth/login', json={'email': 'legacy@example.com', 'password': password})
+
+@pytest.mark.parametrize('legacy_method', ['pbkdf2:sha256:500', 'scrypt:1024:8:1'])
+def test_login_rehashes_a_legacy_cost_hash(app, client, legacy_method):
+    user_id = add_user(hash_password('correct horse', legacy_method))
+    
+    response = login(client)
+    assert response.status_code == 200, response.json
+    db.session.expire_all()
+    stored = db.session.get(User, user_id).password
+    assert stored.startswith(method_prefix(PASSWORD_HASH_METHOD) + '$')
+    assert login(client).status_code == 200
+
+def test_login_leaves_a_current_hash_alone(app, client):
+    original = hash_password('correct horse')
+    user_id = add_user(original)
+    
+    assert login(client).status_code == 200
+    db.session.expire_all()
+    assert db.session.get(User, user_id).password == original
+
+def test_wrong_password_does_not_rehash(app, client):
+    original = hash_password('correct horse', 'pbkdf2:sha256:500')
+    user_id = add_user(original)
+    
+    assert login(client, 'wrong').status_code == 401
+    db.session.expire_all()
+    assert db.session.get(User, user_id).password == original
+
+def bearer(user_id, **kwargs):
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user_id), **kwargs)}'}
+
+def test_logout_revokes_the_token_until_it_expires(client, dealer):
+    user_id, headers = dealer
+    assert client.get('/api/auth/me', headers=headers).status_code == 200
+    assert client.post('/api/auth/logout', headers=headers).status_code == 200
+    assert client.get('/api/auth/me', headers=headers).status_code == 401
+    
+    (row,) = RevokedToken.query.all()
+    assert row.user_id == user_id and row.expires_at > datetime.utcnow()
+
+def test_logout_of_a_token_without_exp(client, dealer):
+    user_id = dealer[0]
+    headers = bearer(user_id, expires_delta=False)
+    assert client.post('/api/auth/logout', headers=headers).status_code == 200
+    assert client.get('/api/auth/me', headers=headers).status_code == 401
+    (row,) = RevokedToken.query.all()
+    assert row.expires_at is None
+    
+    # The next logout purges expired rows but keeps the one that never expires
+    db.session.add(RevokedToken(jti='expired', user_id=user_id, expires_at=datetime.utcnow() - timedelta(hours=1)))
+    db.session.commit()
+    assert client.post('/api/auth/logout', headers=bearer(user_id)).status_code == 200
+    assert sorted(row.expires_at is None for row in RevokedToken.query) == [False, True]
+    assert db.session.get(RevokedToken, 'expired') is None
@@ -0,0 +1,86 @@
+"""Bulk delete, notes and zip download endpoints"""
+import io
+import zipfile
+
+from app import db
+from app.models import Document, DocumentText
+from conftest import add_documents, sample_pdf
+
+def upload(client, headers, name, content):
+    response = client.post(
+        '/api/documents/upload', headers=headers,
+        data={'files': [(io.BytesIO(content), name)]}, content_type='multipart/form-data'
+    )
+    assert response.status_code == 200, response.json
+    return response.json['uploaded'][0]['id']
+
+def test_bulk_delete_removes_only_owned_documents(client, dealer, other_dealer):
+    user_id, headers = dealer
+    mine = add_documents(user_id, 3)
+    theirs = add_documents(other_dealer[0], 1)
+    
+    response = client.post('/api/documents/bulk/delete', headers=headers, json={'ids': [mine[0], mine[1], theirs[0], 999]})
+    assert response.status_code == 200
+    assert response.json['deleted'] == [mine[0], mine[1]]
+    assert response.json['not_found'] == [theirs[0], 999]
+    assert {doc_id for (doc_id,) in db.session.query(Document.id)} == {mine[2], theirs[0]}
+
+def test_bulk_delete_keeps_files_shared_with_remaining_documents(client, dealer):
+    user_id, headers = dealer
+    content = sample_pdf()
+    first, second = upload(client, headers, 'a.pdf', content), upload(client, headers, 'b.pdf', content)
+    
+    assert client.post('/api/documents/bulk/delete', headers=headers, json={'ids': [first]}).status_code == 200
+    response = client.get(f'/api/documents/{second}/download', headers=headers)
+    assert response.status_code == 200 and response.data == content
+
+def test_bulk_delete_drops_ocr_text(client, dealer):
+    user_id, headers = dealer
+    (doc_id,) = add_documents(user_id, 1)
+    db.session.add(DocumentText(document_id=doc_id, extracted_text='VIN 1HGCM82633A004352'))
+    db.session.commit()
+    
+    client.post('/api/documents/bulk/delete', headers=headers, json={'ids': [doc_id]})
+    assert db.session.get(DocumentText, doc_id) is None
+
+def test_bulk_endpoints_validate_id_lists(client, dealer):
+    _, headers = dealer
+    for body in (None, {}, [1], {'ids': []}, {'ids': 'x'}, {'ids': ['abc']}, {'ids': list(range(501))}):
+        for endpoint in ('delete', 'notes', 'download'):
+            response = client.post(f'/api/documents/bulk/{endpoint}', headers=headers, json=body)
+            assert response.status_code == 400, (endpoint, body)
+
+def test_bulk_delete_rejects_ids_that_are_not_json_integers(client, dealer):
+    user_id, headers = dealer
+    doc_ids = add_documents(user_id, 5)
+    for ids in ([True, 1.7], [doc_ids[0] + 0.5], [str(doc_ids[0])], [doc_ids[0], None]):
+        response = client.post('/api/documents/bulk/delete', headers=headers, json={'ids': ids})
+        assert response.status_code == 400, ids
+    assert db.session.query(Document).count() == 5
+
+def test_bulk_notes_replace_and_append(client, dealer, other_dealer):
+    user_id, headers = dealer
+    mine = add_documents(user_id, 2)
+    (theirs,) = add_documents(other_dealer[0], 1)
+    
+    response = client.post('/api/documents/bulk/notes', headers=headers, json={'ids': mine + [theirs], 'notes': 'first'})
+    assert response.json['updated'] == mine and response.json['not_found'] == [theirs]
+    client.post('/api/documents/bulk/notes', headers=headers, json={'ids': mine[:1], 'notes': 'second', 'mode': 'append'})
+    
+    db.session.expire_all()
+    assert [db.session.get(Document, doc_id).notes for doc_id in mine] == ['first\nsecond', 'first']
+    assert db.session.get(Document, theirs).notes is None
+
+def test_bulk_download_streams_owned_files(client, dealer, other_dealer):
+    user_id, headers = dealer
+    content = sample_pdf()
+    doc_ids = [upload(client, headers, 'deal.pdf', content), upload(client, headers, 'deal.pdf', content)]
+    
+    response = client.post('/api/documents/bulk/download', headers=headers, json={'ids': doc_ids})
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.data))
+    assert archive.namelist() == ['deal.pdf', 'deal (2).pdf']
+    assert all(archive.read(name) == content for name in archive.namelist())
+    
+    response = client.post('/api/documents/bulk/download', headers=other_dealer[1], json={'ids': doc_ids})
+    assert response.status_code == 403
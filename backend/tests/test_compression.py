@@ -0,0 +1,68 @@
+"""Accept-Encoding negotiation of compressed API responses"""
+import gzip
+
+import pytest
+from flask import Response
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+from app import compression
+from app.compression import compress_response
+from conftest import add_documents
+
+brotli = pytest.importorskip('brotli')
+
+BODY = b'{"documents": [' + b'{"vin": "1HGCM82633A004352"}, ' * 100 + b'{}]}'
+
+def respond(accept_encoding, body=BODY, **kwargs):
+    response = Response(body, mimetype=kwargs.pop('mimetype', 'application/json'), **kwargs)
+    return compress_response(response, parse_accept_header(accept_encoding, Accept))
+
+def test_brotli_is_preferred_then_gzip():
+    response = respond('gzip, deflate, br')
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.get_data()) == BODY
+    
+    response = respond('gzip')
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == BODY
+    assert response.content_length == len(response.get_data())
+    assert 'Accept-Encoding' in response.vary
+
+def test_refused_encodings_are_never_used(monkeypatch):
+    assert respond('br;q=0, gzip').headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Encoding' not in respond('br;q=0, gzip;q=0').headers
+    assert 'Content-Encoding' not in respond('identity').headers
+    
+    monkeypatch.setattr(compression, 'brotli', None)
+    assert respond('br').headers.get('Content-Encoding') is None
+    assert respond('br, gzip').headers['Content-Encoding'] == 'gzip'
+
+def test_uncompressed_responses_still_vary_on_accept_encoding():
+    for response in (respond(''), respond('gzip', body=b'{"ok": true}'), respond('gzip', body=b'')):
+        assert 'Content-Encoding' not in response.headers
+        assert 'Accept-Encoding' in response.vary
+    assert respond('gzip', body=b'').get_data() == b''
+
+def test_responses_that_are_not_ours_to_compress_are_untouched():
+    cases = [
+        respond('gzip', status=204, body=b''),
+        respond('gzip', status=404),
+        respond('gzip', mimetype='application/pdf'),
+        respond('gzip', headers={'Content-Encoding': 'br'}),
+    ]
+    for response in cases:
+        assert response.headers.get('Content-Encoding') in (None, 'br')
+        assert 'Accept-Encoding' not in response.vary
+    assert cases[-1].get_data() == BODY
+
+def test_api_responses_are_compressed_end_to_end(client, dealer):
+    user_id, headers = dealer
+    add_documents(user_id, 20, vin='1HGCM82633A004352')
+    plain = client.get('/api/documents/?limit=20', headers=headers)
+    compressed = client.get('/api/documents/?limit=20', headers={**headers, 'Accept-Encoding': 'gzip'})
+    
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['Vary'] == plain.headers['Vary']
+    assert gzip.decompress(compressed.get_data()) == plain.get_data()
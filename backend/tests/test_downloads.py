@@ -0,0 +1,74 @@
+"""Conditional, range-capable downloads and proxy offload"""
+import io
+
+import pytest
+
+from app import documents
+from conftest import sample_pdf
+
+@pytest.fixture
+def stored(client, dealer):
+    """(download url, headers, content) of an uploaded sample PDF"""
+    _, headers = dealer
+    content = sample_pdf()
+    response = client.post(
+        '/api/documents/upload', headers=headers,
+        data={'files': [(io.BytesIO(content), 'deal.pdf')]}, content_type='multipart/form-data'
+    )
+    assert response.status_code == 200, response.json
+    return f"/api/documents/{response.json['uploaded'][0]['id']}/download", headers, content
+
+def test_download_sends_validators(client, stored):
+    url, headers, content = stored
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.data == content
+    assert response.headers['ETag'] and response.headers['Last-Modified']
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert 'private' in response.headers['Cache-Control']
+
+def test_matching_etag_returns_304(client, stored):
+    url, headers, _ = stored
+    etag = client.get(url, headers=headers).headers['ETag']
+    
+    response = client.get(url, headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert client.get(url, headers={**headers, 'If-None-Match': '"other"'}).status_code == 200
+
+def test_range_returns_206_with_those_bytes(client, stored):
+    url, headers, content = stored
+    response = client.get(url, headers={**headers, 'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert response.data == content[10:20]
+    assert response.headers['Content-Range'] == f'bytes 10-19/{len(content)}'
+    
+    tail = client.get(url, headers={**headers, 'Range': 'bytes=-5'})
+    assert tail.status_code == 206 and tail.data == content[-5:]
+
+def test_x_accel_offload_hands_the_file_to_the_proxy(client, stored, monkeypatch):
+    monkeypatch.setattr(documents, 'DOWNLOAD_OFFLOAD', 'x-accel')
+    url, headers, _ = stored
+    response = client.get(url, headers=headers)
+    
+    assert response.status_code == 200
+    assert response.data == b''
+    redirect = response.headers['X-Accel-Redirect']
+    assert redirect.startswith(documents.DOWNLOAD_ACCEL_PREFIX) and redirect.endswith('.pdf')
+    assert '..' not in redirect
+    # Still answered here: the proxy only sees requests that need the bytes
+    assert client.get(url, headers={**headers, 'If-None-Match': response.headers['ETag']}).status_code == 304
+
+def test_x_sendfile_offload_names_the_local_file(client, stored, monkeypatch):
+    monkeypatch.setattr(documents, 'DOWNLOAD_OFFLOAD', 'x-sendfile')
+    url, headers, content = stored
+    response = client.get(url, headers=headers)
+    
+    assert response.data == b''
+    with open(response.headers['X-Sendfile'], 'rb') as f:
+        assert f.read() == content
+
+def test_no_offload_header_by_default(client, stored):
+    url, headers, _ = stored
+    response = client.get(url, headers=headers)
+    assert 'X-Accel-Redirect' not in response.headers and 'X-Sendfile' not in response.headers
@@ -0,0 +1,242 @@
+"""OCR job queue: claiming, retry and failure transitions, stale job recovery"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app import jobs
+from app.documents import delete_documents
+from app.models import Document, OcrJob
+from conftest import add_documents
+
+def ocr_success(**data):
+    extracted = {
+        'vin': None, 'buyer_name': None, 'seller_name': None, 'sale_date': None,
+        'sale_amount': None, 'odometer_reading': None, 'document_type': 'title'
+    }
+    extracted.update(data)
+    return {'success': True, 'error': None, 'extracted_text': 'text', 'extracted_data': extracted}
+
+def queue_documents(user_id, count):
+    doc_ids = add_documents(user_id, count, status='pending')
+    job_ids = []
+    for doc_id in doc_ids:
+        job = jobs.enqueue_ocr(db.session.get(Document, doc_id))
+        db.session.flush()
+        job_ids.append(job.id)
+    db.session.commit()
+    return doc_ids, job_ids
+
+@pytest.fixture
+def ocr_results(monkeypatch):
+    """Canned OCR results by document path, success unless set otherwise"""
+    results = {}
+    monkeypatch.setattr(jobs, 'lookup_or_process', lambda path, content_hash=None: dict(results.get(path, ocr_success())))
+    return results
+
+@pytest.fixture(autouse=True)
+def single_worker(monkeypatch):
+    # claim_jobs spreads a short queue over OCR_WORKERS; one worker claims it all
+    monkeypatch.setattr(jobs, 'OCR_WORKERS', 1)
+
+def test_claim_marks_jobs_running_and_documents_processing(app, dealer):
+    doc_ids, job_ids = queue_documents(dealer[0], 2)
+    claims = jobs.claim_jobs(limit=4)
+    
+    assert sorted(claim.job_id for claim in claims) == job_ids
+    assert sorted(claim.document_id for claim in claims) == doc_ids
+    assert all(db.session.get(OcrJob, job_id).status == 'running' for job_id in job_ids)
+    assert all(db.session.get(OcrJob, job_id).attempts == 1 for job_id in job_ids)
+    assert all(db.session.get(Document, doc_id).status == 'processing' for doc_id in doc_ids)
+    assert jobs.claim_jobs(limit=4) == []
+
+def test_short_queue_is_spread_over_workers(app, dealer, monkeypatch):
+    monkeypatch.setattr(jobs, 'OCR_WORKERS', 4)
+    queue_documents(dealer[0], 2)
+    assert len(jobs.claim_jobs(limit=4)) == 1
+    assert len(jobs.claim_jobs(limit=4)) == 1
+
+def test_claim_rows_is_won_by_one_caller(app, dealer):
+    _, job_ids = queue_documents(dealer[0], 3)
+    now = datetime.utcnow()
+    first = jobs.claim_rows(job_ids, now)
+    second = jobs.claim_rows(job_ids, now)
+    db.session.commit()
+    
+    assert sorted(first) == job_ids
+    assert second == []
+
+def test_concurrent_workers_never_claim_a_job_twice(app, dealer):
+    _, job_ids = queue_documents(dealer[0], 12)
+    claimed, errors = [], []
+    
+    def worker():
+        with app.app_context():
+            try:
+                while True:
+                    claims = jobs.claim_jobs(limit=2)
+                    if not claims:
+                        return
+                    claimed.extend(claim.job_id for claim in claims)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+    
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert errors == []
+    assert sorted(claimed) == job_ids
+
+def test_claim_skips_jobs_not_yet_due(app, dealer):
+    _, (job_id,) = queue_documents(dealer[0], 1)
+    db.session.get(OcrJob, job_id).run_after = datetime.utcnow() + timedelta(minutes=5)
+    db.session.commit()
+    
+    assert jobs.claim_jobs() == []
+
+def test_successful_job_completes_document(app, dealer, ocr_results):
+    (doc_id,), (job_id,) = queue_documents(dealer[0], 1)
+    jobs.run_jobs(jobs.claim_jobs())
+    
+    doc, job = db.session.get(Document, doc_id), db.session.get(OcrJob, job_id)
+    assert job.status == 'done' and job.last_error is None
+    assert doc.status == 'completed' and doc.document_type == 'title' and doc.processed_at
+
+def test_failed_job_is_retried_with_backoff_then_fails(app, dealer, ocr_results, monkeypatch):
+    monkeypatch.setattr(jobs, 'OCR_MAX_ATTEMPTS', 2)
+    (doc_id,), (job_id,) = queue_documents(dealer[0], 1)
+    ocr_results[db.session.get(Document, doc_id).file_path] = {'success': False, 'error': 'Vision unavailable'}
+    
+    jobs.run_jobs(jobs.claim_jobs())
+    job, doc = db.session.get(OcrJob, job_id), db.session.get(Document, doc_id)
+    assert (job.status, job.attempts, job.last_error) == ('queued', 1, 'Vision unavailable')
+    assert doc.status == 'pending'
+    assert job.run_after > datetime.utcnow()
+    
+    job.run_after = datetime.utcnow()
+    db.session.commit()
+    jobs.run_jobs(jobs.claim_jobs())
+    job, doc = db.session.get(OcrJob, job_id), db.session.get(Document, doc_id)
+    assert (job.status, job.attempts) == ('failed', 2)
+    assert doc.status == 'failed'
+
+def test_stale_running_jobs_are_requeued(app, dealer, monkeypatch):
+    _, (stale_id, fresh_id) = queue_documents(dealer[0], 2)
+    jobs.claim_jobs()
+    db.session.get(OcrJob, stale_id).updated_at = datetime.utcnow() - timedelta(seconds=jobs.OCR_JOB_TIMEOUT + 1)
+    db.session.commit()
+    
+    jobs.requeue_stale_jobs()
+    assert db.session.get(OcrJob, stale_id).status == 'queued'
+    assert db.session.get(OcrJob, fresh_id).status == 'running'
+
+def test_unsavable_result_fails_only_its_own_job(app, dealer, ocr_results, monkeypatch):
+    doc_ids, job_ids = queue_documents(dealer[0], 3)
+    bad_path = db.session.get(Document, doc_ids[1]).file_path
+    ocr_results[bad_path] = ocr_success(vin='BAD')
+    typed_fields = jobs.typed_fields
+    
+    def overflowing_fields(data):
+        fields = typed_fields(data)
+        if data.get('vin') == 'BAD':
+            fields['sale_amount_cents'] = 2 ** 70
+        return fields
+    
+    monkeypatch.setattr(jobs, 'typed_fields', overflowing_fields)
+    jobs.run_jobs(jobs.claim_jobs())
+    
+    db.session.expire_all()
+    statuses = [(db.session.get(OcrJob, job_id).status, db.session.get(Document, doc_id).status) for doc_id, job_id in zip(doc_ids, job_ids)]
+    assert statuses == [('done', 'completed'), ('failed', 'failed'), ('done', 'completed')]
+    assert db.session.get(OcrJob, job_ids[1]).last_error.startswith('Could not save OCR result')
+    assert db.session.get(Document, doc_ids[1]).sale_amount_cents is None
+
+def test_worker_loop_requeues_stale_jobs_periodically(app, dealer, monkeypatch):
+    monkeypatch.setattr(jobs, 'OCR_REQUEUE_INTERVAL', 0)
+    monkeypatch.setattr(jobs, 'OCR_POLL_INTERVAL', 0.01)
+    monkeypatch.setattr(jobs, 'claim_jobs', lambda: [])
+    stop_event = threading.Event()
+    thread = threading.Thread(target=jobs.worker_loop, args=(app, stop_event))
+    thread.start()
+    try:
+        # Goes stale after the loop started, so only a periodic sweep can recover it
+        _, (job_id,) = queue_documents(dealer[0], 1)
+        job = db.session.get(OcrJob, job_id)
+        job.status = 'running'
+        job.updated_at = datetime.utcnow() - timedelta(seconds=jobs.OCR_JOB_TIMEOUT + 1)
+        db.session.commit()
+        
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            db.session.expire_all()
+            if db.session.get(OcrJob, job_id).status == 'queued':
+                break
+            time.sleep(0.02)
+        assert db.session.get(OcrJob, job_id).status == 'queued'
+    finally:
+        stop_event.set()
+        thread.join()
+
+def test_batch_documents_are_ocrd_concurrently(app, dealer, monkeypatch):
+    doc_ids, job_ids = queue_documents(dealer[0], 4)
+    # Every lookup waits for all the others: a serial batch would time out the barrier
+    barrier = threading.Barrier(4, timeout=5)
+    
+    def lookup(path, content_hash=None):
+        barrier.wait()
+        return ocr_success()
+    
+    monkeypatch.setattr(jobs, 'lookup_or_process', lookup)
+    jobs.run_jobs(jobs.claim_jobs(limit=4))
+    assert [db.session.get(OcrJob, job_id).status for job_id in job_ids] == ['done'] * 4
+
+def delete_document(doc_id):
+    delete_documents([db.session.get(Document, doc_id)])
+    db.session.commit()
+
+def test_document_deleted_while_claimed_keeps_the_rest_of_the_batch(app, dealer, ocr_results):
+    doc_ids, job_ids = queue_documents(dealer[0], 3)
+    claims = jobs.claim_jobs()
+    delete_document(doc_ids[1])
+    jobs.run_jobs(claims)
+    
+    db.session.expire_all()
+    assert db.session.get(Document, doc_ids[1]) is None
+    assert db.session.get(OcrJob, job_ids[1]) is None
+    assert [db.session.get(OcrJob, job_ids[i]).status for i in (0, 2)] == ['done', 'done']
+    assert [db.session.get(Document, doc_ids[i]).status for i in (0, 2)] == ['completed', 'completed']
+
+def test_document_deleted_while_claimed_in_a_batch_saved_singly(app, dealer, ocr_results, monkeypatch):
+    doc_ids, job_ids = queue_documents(dealer[0], 3)
+    ocr_results[db.session.get(Document, doc_ids[0]).file_path] = ocr_success(vin='BAD')
+    typed_fields = jobs.typed_fields
+    
+    def overflowing_fields(data):
+        fields = typed_fields(data)
+        if data.get('vin') == 'BAD':
+            fields['sale_amount_cents'] = 2 ** 70
+        return fields
+    
+    monkeypatch.setattr(jobs, 'typed_fields', overflowing_fields)
+    claims = jobs.claim_jobs()
+    delete_document(doc_ids[1])
+    jobs.run_jobs(claims)
+    
+    db.session.expire_all()
+    assert db.session.get(OcrJob, job_ids[0]).status == 'failed'
+    assert db.session.get(OcrJob, job_ids[2]).status == 'done'
+    assert db.session.get(Document, doc_ids[2]).status == 'completed'
+
+def test_fail_job_skips_vanished_rows(app, dealer):
+    (doc_id,), _ = queue_documents(dealer[0], 1)
+    (claim,) = jobs.claim_jobs()
+    delete_document(doc_id)
+    
+    assert jobs.fail_job(claim, 'disk full') == ['deleted']
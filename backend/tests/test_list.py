@@ -0,0 +1,68 @@
+"""Keyset-paginated document list"""
+from datetime import datetime
+
+from conftest import add_documents
+
+def walk(client, headers, query=''):
+    """Every page of the list, returns (ids in order, pages)"""
+    ids, pages, cursor = [], 0, None
+    while True:
+        url = f'/api/documents?{query}' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200, response.json
+        ids.extend(doc['id'] for doc in response.json['documents'])
+        pages += 1
+        cursor = response.json['next_cursor']
+        if not cursor:
+            return ids, pages
+
+def test_default_projection_pages_newest_first(client, dealer):
+    user_id, headers = dealer
+    doc_ids = add_documents(user_id, 7)
+    
+    ids, pages = walk(client, headers, 'limit=3')
+    assert ids == doc_ids[::-1]
+    assert pages == 3
+    
+    first = client.get('/api/documents?limit=3', headers=headers).json['documents'][0]
+    assert 'notes' not in first and 'extracted_text' not in first
+    assert first['uploaded_at'] == datetime(2024, 1, 1, 0, 6).isoformat()
+
+def test_equal_timestamps_page_by_id(client, dealer):
+    user_id, headers = dealer
+    doc_ids = []
+    for _ in range(5):
+        doc_ids += add_documents(user_id, 1)
+    
+    ids, _ = walk(client, headers, 'limit=2')
+    assert ids == sorted(doc_ids, reverse=True)
+
+def test_selected_fields_and_filters(client, dealer):
+    user_id, headers = dealer
+    add_documents(user_id, 3, document_type='title')
+    pending = add_documents(user_id, 2, status='pending')
+    
+    ids, _ = walk(client, headers, 'status=pending&limit=1')
+    assert ids == pending[::-1]
+    
+    response = client.get('/api/documents?fields=vin,notes&document_type=title', headers=headers)
+    assert [set(doc) for doc in response.json['documents']] == [{'id', 'uploaded_at', 'vin', 'notes'}] * 3
+
+def test_list_is_scoped_to_the_dealer(client, dealer, other_dealer):
+    add_documents(other_dealer[0], 2)
+    assert walk(client, dealer[1])[0] == []
+
+def test_invalid_parameters_are_rejected(client, dealer):
+    _, headers = dealer
+    assert client.get('/api/documents?cursor=not-a-cursor', headers=headers).status_code == 400
+    assert client.get('/api/documents?fields=password', headers=headers).status_code == 400
+    assert client.get('/api/documents?from=yesterday', headers=headers).status_code == 400
+
+def test_status_returns_the_list_row(client, dealer):
+    user_id, headers = dealer
+    (doc_id,) = add_documents(user_id, 1, status='pending')
+    
+    status = client.get(f'/api/documents/{doc_id}/status', headers=headers).json
+    row = client.get('/api/documents', headers=headers).json['documents'][0]
+    assert status['status'] == 'pending'
+    assert status['document'] == row
@@ -0,0 +1,75 @@
+"""Prometheus text output at /metrics and the OCR stage timers"""
+import pytest
+
+from app import metrics
+from conftest import add_documents
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    """Metrics on before the app is created, with every value reset"""
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', True)
+    for metric in metrics.REGISTRY:
+        monkeypatch.setattr(metric, 'values', {})
+
+def sample_lines(text, name):
+    return [line for line in text.splitlines() if line.startswith(name)]
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    histogram = metrics.Histogram('test_seconds', 'Test latency', ('path',), buckets=(0.1, 1))
+    metrics.REGISTRY.remove(histogram)
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe(value, 'a "quoted"\\path')
+    
+    assert histogram.render() == [
+        '# HELP test_seconds Test latency',
+        '# TYPE test_seconds histogram',
+        'test_seconds_bucket{path="a \\"quoted\\"\\\\path",le="0.1"} 1',
+        'test_seconds_bucket{path="a \\"quoted\\"\\\\path",le="1"} 3',
+        'test_seconds_bucket{path="a \\"quoted\\"\\\\path",le="+Inf"} 4',
+        'test_seconds_sum{path="a \\"quoted\\"\\\\path"} 4.05',
+        'test_seconds_count{path="a \\"quoted\\"\\\\path"} 4',
+    ]
+
+def test_stage_timers_observe_their_stage(monkeypatch):
+    @metrics.timed_stage('parse')
+    def parse(text):
+        return text.upper()
+    
+    with metrics.stage_timer('vision'):
+        pass
+    assert parse('vin') == 'VIN'
+    assert parse('vin') == 'VIN'
+    
+    counts = {stage: sum(entry[:-1]) for (stage,), entry in metrics.STAGE_SECONDS.values.items()}
+    assert counts == {'vision': 1, 'parse': 2}
+    
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', False)
+    assert metrics.stage_timer('vision') is metrics.NULL_TIMER
+    assert parse('vin') == 'VIN'
+    metrics.OCR_JOBS.inc('done')
+    assert sum(metrics.STAGE_SECONDS.values[('parse',)][:-1]) == 2
+    assert metrics.OCR_JOBS.values == {}
+
+def test_metrics_endpoint_reports_requests_queries_and_queue(client, dealer):
+    from app import db, jobs
+    from app.models import Document
+    user_id, headers = dealer
+    doc_ids = add_documents(user_id, 3, status='pending')
+    for doc_id in doc_ids:
+        jobs.enqueue_ocr(db.session.get(Document, doc_id))
+    db.session.commit()
+    
+    assert client.get('/api/documents/', headers=headers).status_code == 200
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert 'http_request_duration_seconds_count{endpoint="documents.list_documents",method="GET",status="200"} 1' in text
+    (queries,) = sample_lines(text, 'http_request_sql_queries_sum{endpoint="documents.list_documents"}')
+    assert float(queries.split()[-1]) >= 1
+    assert 'ocr_queue_jobs{status="queued"} 3' in text
+    assert 'ocr_queue_jobs{status="running"} 0' in text
+    assert sample_lines(text, 'stage_duration_seconds_count{stage="db_commit"}')
+    assert 'http_requests_in_flight 1' in text
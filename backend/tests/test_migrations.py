@@ -0,0 +1,103 @@
+"""Versioned migrations: fresh databases, reruns, upgrades from the original schema and migration-only boot"""
+import sqlite3
+from datetime import date
+
+from app import create_app, db
+from app.migrations import MIGRATIONS, RENAMED_MIGRATIONS, run_migrations
+from app.models import Document, DocumentText, SchemaMigration
+
+# Tables as they were before migrations existed
+LEGACY_SCHEMA = '''
+CREATE TABLE user (
+    id INTEGER PRIMARY KEY, email VARCHAR(100) NOT NULL UNIQUE, password VARCHAR(255) NOT NULL,
+    role VARCHAR(20), dealership_name VARCHAR(100)
+);
+CREATE TABLE document (
+    id INTEGER PRIMARY KEY, uploaded_by INTEGER REFERENCES user(id), filename VARCHAR(255),
+    original_filename VARCHAR(255), file_type VARCHAR(10), file_size INTEGER, file_path VARCHAR(500),
+    status VARCHAR(20), notes TEXT, extracted_text TEXT, vin VARCHAR(100), buyer_name VARCHAR(255),
+    seller_name VARCHAR(255), sale_date VARCHAR(50), sale_amount VARCHAR(50), odometer_reading VARCHAR(50),
+    document_type VARCHAR(100), uploaded_at DATETIME
+);
+INSERT INTO user VALUES (1, 'legacy@example.com', 'x', 'dealer', 'Legacy Motors');
+INSERT INTO document VALUES (
+    1, 1, 'a.pdf', 'a.pdf', 'pdf', 10, '/srv/uploads/user_1/a.pdf', 'completed', 'call back',
+    'VIN 1HGCM82633A004352 sold', '1HGCM82633A004352', 'John Smith', 'Sunrise Motors',
+    '03/15/2024', '$12,500.00', '45000 miles', 'bill_of_sale', '2024-03-15 10:00:00'
+);
+'''
+
+def test_fresh_database_records_every_migration(app):
+    applied = [name for (name,) in db.session.query(SchemaMigration.name).order_by(SchemaMigration.name)]
+    assert applied == [name for name, _ in MIGRATIONS]
+    assert run_migrations() == []
+
+def test_upgrade_from_legacy_schema(tmp_path, monkeypatch):
+    path = tmp_path / 'legacy.db'
+    with sqlite3.connect(path) as connection:
+        connection.executescript(LEGACY_SCHEMA)
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{path}')
+    
+    app = create_app(start_workers=False)
+    with app.app_context():
+        doc = db.session.get(Document, 1)
+        assert (doc.sale_amount_cents, doc.sale_date_value, doc.odometer_miles) == (1250000, date(2024, 3, 15), 45000)
+        assert doc.parser_version is None
+        assert db.session.get(DocumentText, 1).extracted_text == 'VIN 1HGCM82633A004352 sold'
+        assert doc.notes == 'call back'
+        
+        inspector = db.inspect(db.engine)
+        assert 'content_hash' in {column['name'] for column in inspector.get_columns('document')}
+        assert 'ix_document_content_hash' in {index['name'] for index in inspector.get_indexes('document')}
+        assert inspector.has_table('ocr_result')
+        
+        legacy_text = db.session.execute(db.text('SELECT extracted_text FROM document WHERE id = 1')).scalar()
+        assert legacy_text is None
+        assert run_migrations() == []
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+def test_boot_without_migrating_leaves_schema_to_flask_migrate(tmp_path, monkeypatch):
+    from app import migrations
+    monkeypatch.setattr(migrations, 'MIGRATE_ON_START', False)
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "deploy.db"}')
+    
+    app = create_app(start_workers=False)
+    with app.app_context():
+        assert not db.inspect(db.engine).has_table('schema_migration')
+        assert not db.inspect(db.engine).has_table('document_fts')
+        
+        result = app.test_cli_runner().invoke(args=['migrate'])
+        assert result.output.startswith('Applied: 0000_base_schema')
+        assert app.test_cli_runner().invoke(args=['migrate']).output.strip() == 'Up to date'
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+def test_sqlite_connections_use_wal_and_busy_timeout(app):
+    from app.database import SQLITE_BUSY_TIMEOUT_MS
+    with db.engine.connect() as connection:
+        assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+        assert connection.exec_driver_sql('PRAGMA busy_timeout').scalar() == SQLITE_BUSY_TIMEOUT_MS
+        assert connection.exec_driver_sql('PRAGMA synchronous').scalar() == 1  # NORMAL
+
+def test_migration_ids_are_unique_and_ordered():
+    names = [name for name, _ in MIGRATIONS]
+    numbers = [name.split('_', 1)[0] for name in names]
+    assert len(set(numbers)) == len(numbers)
+    assert names == sorted(names)
+    assert set(RENAMED_MIGRATIONS.values()) <= set(names)
+
+def test_old_migration_ids_are_renamed_not_rerun(app, monkeypatch):
+    current = {new: old for old, new in RENAMED_MIGRATIONS.items()}
+    db.session.query(SchemaMigration).delete()
+    # As recorded before 0001_ocr_cache existed
+    db.session.add_all([SchemaMigration(name=current.get(name, name)) for name, _ in MIGRATIONS if name != '0001_ocr_cache'])
+    db.session.commit()
+    
+    ran = []
+    monkeypatch.setattr('app.migrations.MIGRATIONS', [(name, lambda name=name: ran.append(name)) for name, _ in MIGRATIONS])
+    assert run_migrations() == ['0001_ocr_cache']
+    applied = [name for (name,) in db.session.query(SchemaMigration.name).order_by(SchemaMigration.name)]
+    assert applied == [name for name, _ in MIGRATIONS]
@@ -0,0 +1,95 @@
+"""Vision rate limit shares and the async client's limits"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app import fake_vision, ocr_async
+
+def test_rate_limit_is_shared_between_ocr_processes(monkeypatch):
+    monkeypatch.setenv('WEB_CONCURRENCY', '3')
+    monkeypatch.setenv('OCR_WORKERS', '4')
+    for mode, processes in (('thread', 3), ('process', 12), ('external', 1)):
+        monkeypatch.setenv('OCR_WORKER_MODE', mode)
+        assert ocr_async.default_vision_processes() == processes, mode
+    
+    assert ocr_async.VISION_PROCESS_RATE_LIMIT == ocr_async.VISION_RATE_LIMIT / ocr_async.VISION_PROCESSES
+    client = ocr_async.AsyncVisionClient(client=SimpleNamespace(batch_annotate_images=lambda requests: None))
+    assert client.bucket.rate == ocr_async.VISION_PROCESS_RATE_LIMIT
+
+class FlakyClient(fake_vision.ImageAnnotatorAsyncClient):
+    """Fails its first `failures` calls with the given error, tracking calls in flight"""
+    def __init__(self, failures=0, error=fake_vision.ServiceUnavailable, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.error = error
+        self.in_flight = self.peak = 0
+    
+    async def batch_annotate_images(self, requests):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            if self.calls < self.failures:
+                self.calls += 1
+                raise self.error('fake Vision failure')
+            return await super().batch_annotate_images(requests)
+        finally:
+            self.in_flight -= 1
+
+def limited(client, **kwargs):
+    return ocr_async.AsyncVisionClient(client=client, **{'rate': 0, 'burst': 1, **kwargs})
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(ocr_async, 'VISION_RETRY_BACKOFF', 0)
+
+def test_transient_errors_are_retried():
+    client = limited(FlakyClient(failures=2), max_retries=3)
+    response = asyncio.run(client.batch_annotate_images([None]))
+    assert response.responses[0].full_text_annotation.text == fake_vision.FAKE_TEXT
+    assert (client.calls, client.retries) == (3, 2)
+    
+    client = limited(FlakyClient(failures=5), max_retries=2)
+    with pytest.raises(fake_vision.ServiceUnavailable):
+        asyncio.run(client.batch_annotate_images([None]))
+    assert (client.calls, client.retries) == (3, 2)
+
+def test_other_errors_are_not_retried():
+    client = limited(FlakyClient(failures=1, error=ValueError))
+    with pytest.raises(ValueError):
+        asyncio.run(client.batch_annotate_images([None]))
+    assert (client.calls, client.retries) == (1, 0)
+
+def test_slow_calls_time_out_and_retry(monkeypatch):
+    client = limited(fake_vision.ImageAnnotatorAsyncClient(latency=1), timeout=0.01, max_retries=1)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(client.batch_annotate_images([None]))
+    assert (client.calls, client.retries) == (2, 1)
+    
+    # The OCR path reports the timeout by name, since it stringifies to ''
+    monkeypatch.setattr(ocr_async.ocr, 'load_image_content', lambda path: b'jpeg')
+    texts, error = asyncio.run(ocr_async.extract_pages_async('photo.jpg', [0], client))
+    assert (texts, error) == (None, 'TimeoutError')
+
+def test_semaphore_bounds_calls_in_flight():
+    fake = FlakyClient(latency=0.02)
+    client = limited(fake, concurrency=2)
+    
+    async def burst():
+        return await asyncio.gather(*(client.batch_annotate_images([None]) for _ in range(6)))
+    assert len(asyncio.run(burst())) == 6
+    assert fake.peak == 2 and client.calls == 6
+
+def test_sync_clients_run_off_the_event_loop():
+    sync = fake_vision.ImageAnnotatorClient(latency=0.02)
+    client = limited(sync, concurrency=4)
+    assert not client.native
+    
+    async def burst():
+        start = time.perf_counter()
+        await asyncio.gather(*(client.batch_annotate_images([None]) for _ in range(4)))
+        return time.perf_counter() - start
+    # Four 20 ms calls overlap on worker threads instead of blocking the loop one after another
+    assert asyncio.run(burst()) < 0.07
+    assert sync.calls == 4
@@ -0,0 +1,108 @@
+"""OCR backend chain: per-page fallback text_layer -> tesseract -> vision and the confidence gate"""
+import pytest
+
+from app import ocr
+
+class StubBackend(ocr.OcrBackend):
+    """Canned (text, confidence) per page, recording which pages it was asked for"""
+    def __init__(self, name, pages=None, error=None, supports=None, cost_per_page=0.0):
+        self.name = name
+        self.pages = pages or {}
+        self.error = error
+        self.supports_file = supports
+        self.cost_per_page = cost_per_page
+        self.calls = []
+    
+    def supports(self, file_path):
+        return self.supports_file is None or self.supports_file(file_path)
+    
+    def extract_pages(self, file_path, page_numbers):
+        self.calls.append(list(page_numbers))
+        if self.error:
+            return None, self.error
+        return [self.pages[n] for n in page_numbers], None
+
+@pytest.fixture
+def chain(monkeypatch):
+    """Install stub backends over a three page PDF, returns a setter for the chain"""
+    monkeypatch.setattr(ocr, 'get_pdf_page_count', lambda file_path: (3, None))
+    monkeypatch.setattr(ocr, 'backend_stats', {})
+    monkeypatch.setattr(ocr, 'OCR_MIN_CONFIDENCE', 0.8)
+    
+    def install(*backends):
+        monkeypatch.setattr(ocr, '_backends', list(backends))
+        return backends
+    return install
+
+def test_each_backend_only_sees_pages_earlier_ones_could_not_read(chain):
+    text_layer, tesseract, vision = chain(
+        StubBackend('text_layer', {0: ('typed page', 0.95), 1: ('', 0.0), 2: ('~~', 0.1)}),
+        StubBackend('tesseract', {1: ('scanned page', 0.9), 2: ('blurry', 0.5)}),
+        StubBackend('vision', {2: ('handwritten page', 0.85)}, cost_per_page=0.0015),
+    )
+    text, error = ocr.extract_text('deal.pdf')
+    
+    assert error is None
+    assert text == ocr.PAGE_SEPARATOR.join(['typed page', 'scanned page', 'handwritten page'])
+    assert (text_layer.calls, tesseract.calls, vision.calls) == ([[0, 1, 2]], [[1, 2]], [[2]])
+    
+    stats = ocr.get_backend_stats()
+    assert {name: entry['accepted_pages'] for name, entry in stats['backends'].items()} == {
+        'text_layer': 1, 'tesseract': 1, 'vision': 1
+    }
+    assert stats['vision_pages_avoided'] == 2
+    assert stats['backends']['vision']['cost'] == 0.0015
+
+def test_chain_stops_once_every_page_passes_the_gate(chain):
+    text_layer, vision = chain(
+        StubBackend('text_layer', {n: (f'page {n}', 0.8) for n in range(3)}),
+        StubBackend('vision'),
+    )
+    assert ocr.extract_text('deal.pdf') == (ocr.PAGE_SEPARATOR.join(['page 0', 'page 1', 'page 2']), None)
+    assert vision.calls == []
+
+def test_most_confident_text_is_kept_when_no_backend_passes(chain):
+    chain(
+        StubBackend('text_layer', {n: (f'layer {n}', 0.6) for n in range(3)}),
+        StubBackend('tesseract', {n: (f'tesseract {n}', 0.7 if n == 1 else 0.3) for n in range(3)}),
+        StubBackend('vision', error='quota exceeded'),
+    )
+    text, error = ocr.extract_text('deal.pdf')
+    assert error is None
+    assert text.split(ocr.PAGE_SEPARATOR) == ['layer 0', 'tesseract 1', 'layer 2']
+    assert ocr.backend_stats['vision']['errors'] == 1
+
+def test_failing_backends_fall_through_and_report_the_last_error(chain):
+    _, vision = chain(
+        StubBackend('tesseract', error='tesseract crashed'),
+        StubBackend('vision', {n: (f'page {n}', 0.9) for n in range(3)}),
+    )
+    assert ocr.extract_text('deal.pdf')[1] is None
+    assert vision.calls == [[0, 1, 2]]
+    
+    chain(StubBackend('tesseract', error='tesseract crashed'), StubBackend('vision', error='vision down'))
+    assert ocr.extract_text('deal.pdf') == (None, 'vision down')
+
+def test_unsupported_files_skip_a_backend(chain):
+    text_layer, vision = chain(
+        StubBackend('text_layer', supports=lambda path: path.endswith('.pdf')),
+        StubBackend('vision', {0: ('photo text', 0.9)}),
+    )
+    assert ocr.extract_text('photo.jpg') == ('photo text', None)
+    assert text_layer.calls == [] and vision.calls == [[0]]
+    
+    chain(StubBackend('text_layer', supports=lambda path: path.endswith('.pdf')))
+    assert ocr.extract_text('photo.jpg') == (None, 'No OCR backend available for this file')
+
+def test_get_backends_keeps_configured_order_and_drops_unavailable(monkeypatch):
+    monkeypatch.setattr(ocr, '_backends', None)
+    monkeypatch.setattr(ocr, 'OCR_BACKENDS', ['vision', 'tesseract', 'text_layer'])
+    monkeypatch.setattr(ocr.TesseractBackend, 'available', lambda self: False)
+    monkeypatch.setattr(ocr.VisionBackend, 'available', lambda self: True)
+    assert [backend.name for backend in ocr.get_backends()] == ['vision', 'text_layer']
+
+def test_text_quality_gates_short_and_garbled_pages():
+    assert ocr.text_quality('VIN 1HGCM82633A004352') == 0.0
+    assert ocr.text_quality('Certificate of title issued to John Smith, 100 Main Street.') == 1.0
+    garbled = ocr.text_quality('Cert' + '�' * 40 + 'ificate of title')
+    assert 0 < garbled < ocr.OCR_MIN_CONFIDENCE
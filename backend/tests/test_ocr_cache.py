@@ -0,0 +1,107 @@
+"""Content-addressed OCR result cache and deduplicated stored files"""
+import hashlib
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app import ocr_cache
+from app.models import Document, OcrResult
+from app.ocr import PARSER_VERSION
+from app.ocr_cache import evict, lookup_or_process, record_results
+from conftest import sample_pdf
+
+def ocr_result(text='Certificate of title VIN 1HGCM82633A004352', success=True):
+    return {
+        'success': success,
+        'error': None if success else 'Vision unavailable',
+        'extracted_text': text if success else None,
+        'extracted_data': {'vin': '1HGCM82633A004352', 'document_type': 'title'} if success else {},
+        'parser_version': PARSER_VERSION
+    }
+
+@pytest.fixture
+def processed(monkeypatch):
+    """Paths process_document was called with; it returns ocr_result()"""
+    calls = []
+    
+    def process_document(path):
+        calls.append(path)
+        return ocr_result()
+    
+    monkeypatch.setattr(ocr_cache, 'process_document', process_document)
+    return calls
+
+@pytest.fixture
+def stored_file(tmp_path):
+    path = tmp_path / 'deal.pdf'
+    path.write_bytes(b'%PDF-1.4 cache test')
+    return str(path), hashlib.sha256(b'%PDF-1.4 cache test').hexdigest()
+
+def test_miss_runs_ocr_and_hit_reuses_it(app, processed, stored_file):
+    path, content_hash = stored_file
+    first = lookup_or_process(path)
+    assert first['content_hash'] == content_hash and not first.get('cached')
+    assert processed == [path]
+    # Lookups never write: nothing is cached until record_results
+    assert db.session.get(OcrResult, content_hash) is None
+    
+    assert record_results([first])
+    db.session.commit()
+    
+    second = lookup_or_process(path, content_hash)
+    assert second['cached'] and second['extracted_text'] == first['extracted_text']
+    assert second['extracted_data'] == first['extracted_data']
+    assert processed == [path]
+
+def test_record_results_counts_hits_and_skips_failures(app, processed, stored_file):
+    path, content_hash = stored_file
+    record_results([lookup_or_process(path)])
+    db.session.commit()
+    
+    hits = [lookup_or_process(path, content_hash) for _ in range(2)]
+    assert not record_results(hits)
+    db.session.commit()
+    assert db.session.get(OcrResult, content_hash).hits == 2
+    
+    failed = {**ocr_result(success=False), 'content_hash': 'f' * 64}
+    assert not record_results([failed])
+    assert db.session.get(OcrResult, 'f' * 64) is None
+
+def test_evict_drops_least_recently_used_first(app):
+    now = datetime.utcnow()
+    for i, name in enumerate('abc'):
+        record_results([{**ocr_result('x' * 100), 'content_hash': name * 64}])
+        db.session.get(OcrResult, name * 64).last_used_at = now - timedelta(minutes=10 - i)
+    db.session.commit()
+    size = db.session.get(OcrResult, 'a' * 64).size_bytes
+    
+    assert evict(max_bytes=size * 3) == 0
+    assert evict(max_bytes=size * 2) == 1
+    db.session.commit()
+    assert sorted(entry.content_hash[0] for entry in OcrResult.query) == ['b', 'c']
+
+def test_older_parser_entries_are_reparsed_from_cached_text(app, processed, stored_file):
+    path, content_hash = stored_file
+    record_results([{**lookup_or_process(path), 'parser_version': PARSER_VERSION - 1,
+                     'extracted_data': {'vin': 'stale'}}])
+    db.session.commit()
+    
+    hit = lookup_or_process(path, content_hash)
+    assert hit['cached'] and hit['extracted_data']['vin'] == '1HGCM82633A004352'
+
+def test_same_content_is_stored_once(client, dealer):
+    user_id, headers = dealer
+    content = sample_pdf()
+    for name in ('first.pdf', 'second.pdf'):
+        response = client.post(
+            '/api/documents/upload', headers=headers,
+            data={'files': [(io.BytesIO(content), name)]}, content_type='multipart/form-data'
+        )
+        assert response.status_code == 200, response.json
+    
+    docs = Document.query.order_by(Document.id).all()
+    assert len(docs) == 2
+    assert docs[0].file_path == docs[1].file_path
+    assert docs[0].content_hash == docs[1].content_hash == hashlib.sha256(content).hexdigest()
@@ -0,0 +1,18 @@
+"""Typed columns parsed from the extracted display strings"""
+from datetime import date
+
+from app.ocr import MAX_AMOUNT_CENTS, MAX_ODOMETER_MILES, typed_fields
+
+def test_typed_fields_parse_display_strings():
+    fields = typed_fields({'sale_amount': '$12,500.00', 'sale_date': '3-15-24', 'odometer_reading': '45000 miles'})
+    assert fields == {'sale_amount_cents': 1250000, 'sale_date_value': date(2024, 3, 15), 'odometer_miles': 45000}
+
+def test_values_outside_column_range_are_dropped():
+    largest = {'sale_amount': f'{MAX_AMOUNT_CENTS // 100}', 'odometer_reading': f'{MAX_ODOMETER_MILES} miles'}
+    assert typed_fields(largest)['sale_amount_cents'] == MAX_AMOUNT_CENTS // 100 * 100
+    assert typed_fields(largest)['odometer_miles'] == MAX_ODOMETER_MILES
+    
+    for amount in ('$' + '9' * 30, '-' + '9' * 30, 'Infinity', 'NaN'):
+        assert typed_fields({'sale_amount': amount})['sale_amount_cents'] is None, amount
+    for reading in (f'{MAX_ODOMETER_MILES + 1} miles', '²'):
+        assert typed_fields({'odometer_reading': reading})['odometer_miles'] is None, reading
@@ -0,0 +1,70 @@
+"""Every page of a PDF is rendered and sent to Vision, in order, within its batch limits"""
+from types import SimpleNamespace
+
+import fitz
+import pytest
+
+from app import fake_vision, ocr, rasterize
+
+class RecordingClient(fake_vision.ImageAnnotatorClient):
+    """Names each image by the order it arrived in, keeping every batch it was sent"""
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+    
+    def batch_annotate_images(self, requests):
+        self._round_trip()
+        start = sum(len(batch) for batch in self.batches)
+        self.batches.append([request.image.content for request in requests])
+        return SimpleNamespace(responses=[fake_vision._response(f'image {start + i}') for i in range(len(requests))])
+
+@pytest.fixture
+def vision(monkeypatch):
+    client = RecordingClient()
+    monkeypatch.setattr(ocr, 'get_vision_client', lambda: client)
+    monkeypatch.setattr(rasterize, 'OCR_RASTER_WORKERS', 1)
+    return client
+
+def make_pdf(path, pages):
+    with fitz.open() as pdf_document:
+        for n in range(pages):
+            pdf_document.new_page().insert_text((72, 72), f'Page {n + 1}')
+        pdf_document.save(path)
+    return str(path)
+
+def test_every_page_is_rendered_in_order(vision, tmp_path):
+    path = make_pdf(tmp_path / 'deal.pdf', 20)
+    text, error = ocr.extract_text_from_pdf(path)
+    
+    assert error is None
+    assert text.split(ocr.PAGE_SEPARATOR) == [f'image {n}' for n in range(20)]
+    assert [len(batch) for batch in vision.batches] == [ocr.VISION_BATCH_SIZE, 4]
+    sent = [content for batch in vision.batches for content in batch]
+    assert sent == [rasterize.render_page(path, n, ocr.OCR_PDF_DPI) for n in range(20)]
+
+def test_page_count_is_capped(vision, tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr, 'OCR_MAX_PAGES', 3)
+    path = make_pdf(tmp_path / 'long.pdf', 5)
+    assert ocr.get_pdf_page_count(path) == (3, None)
+    assert len(ocr.extract_text_from_pdf(path)[0].split(ocr.PAGE_SEPARATOR)) == 3
+
+def test_selected_pages_only(vision, tmp_path):
+    path = make_pdf(tmp_path / 'deal.pdf', 4)
+    assert ocr.annotate_pdf_pages(path, [1, 3]) == (['image 0', 'image 1'], None)
+    assert vision.batches == [[rasterize.render_page(path, n, ocr.OCR_PDF_DPI) for n in (1, 3)]]
+
+def test_batches_respect_image_count_and_byte_limits(monkeypatch):
+    monkeypatch.setattr(ocr, 'VISION_BATCH_SIZE', 3)
+    monkeypatch.setattr(ocr, 'VISION_MAX_BATCH_BYTES', 10)
+    images = [b'1234', b'5678', b'901', b'a', b'b', b'c', b'd', b'0123456789ab']
+    # Cut at three images or ten bytes; an image over the byte limit still goes out, alone
+    assert list(ocr.chunk_images(images)) == [[b'1234', b'5678'], [b'901', b'a', b'b'], [b'c', b'd'], [b'0123456789ab']]
+    assert list(ocr.chunk_images([])) == []
+
+def test_vision_page_error_fails_the_document(vision, tmp_path, monkeypatch):
+    def failing(requests):
+        return SimpleNamespace(responses=[SimpleNamespace(
+            error=SimpleNamespace(message='Bad image data'), full_text_annotation=SimpleNamespace(text='')
+        )])
+    monkeypatch.setattr(vision, 'batch_annotate_images', failing)
+    assert ocr.extract_text_from_pdf(make_pdf(tmp_path / 'deal.pdf', 2)) == (None, 'Bad image data')
@@ -0,0 +1,74 @@
+"""parse_vehicle_data returns exactly what the original per-field regexes did"""
+import pytest
+
+from app.ocr import DOCUMENT_TYPES, PAGE_SEPARATOR, parse_vehicle_data
+from benchmarks.bench_parse import legacy_parse_vehicle_data, synthetic_documents
+
+FIELDS = '''Sold To: John Smith
+Email: john@example.com
+We Own: Sunrise Motors
+Dealer Address: 100 Main Street
+Purchase Date: 03/15/2024
+VIN: 1hgcm82633a004352
+Odometer Reading: 45,000 miles
+Total Price: $12,500.00
+'''
+
+# One document per type, named by its first keyword, with every field labelled in words
+# that are not keywords of a higher priority type ('dealer', 'odometer')
+TYPE_FIELDS = FIELDS.replace('Dealer Address', 'Address').replace('Odometer Reading', 'Mileage')
+TYPE_TEXTS = {doc_type: f'{keywords[0].upper()}\n{TYPE_FIELDS}' for doc_type, keywords in DOCUMENT_TYPES.items()}
+
+FIELD_TEXTS = {
+    'every field': FIELDS,
+    'no fields': 'The undersigned certifies the information above is true and correct.',
+    'empty': '',
+    'buyer placeholder label': 'Sold To: Information\nName: nobody',
+    'buyer on next line': 'SOLD TO:\nMaria Garcia\nCity: Springfield',
+    'buyer with punctuation': 'Sold to: Wei Chen, Jr.\n',
+    'anchor words out of order': 'To whom it may concern, this vehicle was sold.',
+    'seller stops at dealer': 'We Own: Valley Auto Group Dealer #42',
+    'seller placeholder label': 'WE OWN: deal\nWe Own: Metro Cars LLC',
+    'date without label': 'Signed 7-4-21 at the lot',
+    'month date': 'Executed December 3, 2023 in Springfield',
+    'label date and other date': 'Printed 01/02/2020\nPurchase Date: 5/6/2021',
+    'amount without label': 'Balance due $ 9,999\nPaid $1.00',
+    'no dollar sign': 'Total 12500.00 USD',
+    'mileage label': 'Mileage: 98765',
+    'odometer too short': 'Odometer: 12\nTrip 45,210 miles',
+    'odometer too long': 'Odometer Reading: 123456789 mi',
+    'miles only': 'Driven about 7,500 miles since purchase',
+    'lowercase vin': 'vin 1ftfw1et5dfc10312 and 1HGCM82633A004352',
+    'vin with excluded letters': 'VIN 1HGCM82633A00435O then 2T1BURHE0JC043821',
+    'non-ascii buyer': 'Sold To: José Müller\nWe Own: Autohaus Köln\n$5.000,00',
+    'case folding changes length': 'İstanbul Motors\nSold To: Ayşe Yılmaz\nODOMETER: 33,000 miles',
+    'two keywords': 'Bill of sale attached to the certificate of title',
+    'multi-page': PAGE_SEPARATOR.join([FIELDS, 'VEHICLE REGISTRATION\nMileage: 1,234', 'Sold To: Second Buyer']),
+}
+
+@pytest.mark.parametrize('doc_type', sorted(TYPE_TEXTS))
+def test_every_document_type_matches_legacy(doc_type):
+    text = TYPE_TEXTS[doc_type]
+    assert parse_vehicle_data(text) == legacy_parse_vehicle_data(text)
+    assert parse_vehicle_data(text)['document_type'] == doc_type
+
+def test_every_field_is_extracted():
+    data = parse_vehicle_data(FIELDS)
+    assert data == {
+        'vin': '1HGCM82633A004352',
+        'buyer_name': 'John Smith',
+        'seller_name': 'Sunrise Motors',
+        'sale_date': '03/15/2024',
+        'sale_amount': '$12,500.00',
+        'odometer_reading': '45000 miles',
+        'document_type': 'deal'
+    }
+
+@pytest.mark.parametrize('name', sorted(FIELD_TEXTS))
+def test_field_cases_match_legacy(name):
+    text = FIELD_TEXTS[name]
+    assert parse_vehicle_data(text) == legacy_parse_vehicle_data(text)
+
+def test_synthetic_documents_match_legacy():
+    for text in synthetic_documents(200, 4, seed=7):
+        assert parse_vehicle_data(text) == legacy_parse_vehicle_data(text)
@@ -0,0 +1,82 @@
+"""OCR image preprocessing: grayscale, the pixel cap and the per-image JPEG size cap"""
+import random
+
+import fitz
+import pytest
+
+from app import rasterize
+
+@pytest.fixture(autouse=True)
+def in_process(monkeypatch):
+    monkeypatch.setattr(rasterize, 'OCR_RASTER_WORKERS', 1)
+
+def image_info(content):
+    pix = fitz.Pixmap(content)
+    return pix.width, pix.height, pix.n
+
+def letter_pdf(path):
+    with fitz.open() as pdf_document:
+        page = pdf_document.new_page(width=612, height=792)
+        page.insert_text((72, 72), 'Certificate of title', fontsize=24)
+        page.draw_rect(fitz.Rect(72, 100, 540, 700), color=(1, 0, 0), fill=(0.2, 0.4, 0.8))
+        pdf_document.save(path)
+    return str(path)
+
+def noise(width, height):
+    """RGB pixmap of random pixels, which JPEG cannot shrink much"""
+    rng = random.Random(7)
+    return fitz.Pixmap(fitz.csRGB, width, height, bytes(rng.getrandbits(8) for _ in range(width * height * 3)), False)
+
+def photo(path, width, height):
+    noise(width, height).save(str(path))
+    return str(path)
+
+def test_limit_zoom_caps_pixels():
+    assert rasterize.limit_zoom(612, 792, 2.0, max_pixels=10 ** 9) == 2.0
+    zoom = rasterize.limit_zoom(612, 792, 300 / 72, max_pixels=1000000)
+    assert 612 * 792 * zoom * zoom == pytest.approx(1000000)
+    assert rasterize.limit_zoom(612, 792, 300 / 72, max_pixels=0) == 300 / 72
+
+def test_pages_render_grayscale_within_the_pixel_cap(tmp_path, monkeypatch):
+    path = letter_pdf(tmp_path / 'title.pdf')
+    width, height, channels = image_info(rasterize.render_page(path, 0, 144))
+    assert (width, height, channels) == (1224, 1584, 1)
+    
+    monkeypatch.setattr(rasterize, 'OCR_MAX_PIXELS', 500000)
+    width, height, _ = image_info(rasterize.render_page(path, 0, 300))
+    assert 490000 <= width * height <= 505000 and width / height == pytest.approx(612 / 792, rel=0.01)
+    
+    monkeypatch.setattr(rasterize, 'OCR_PREPROCESS', False)
+    assert image_info(rasterize.render_page(path, 0, 144)) == (1224, 1584, 3)
+
+def test_jpeg_is_kept_under_the_byte_cap():
+    full = noise(400, 400).tobytes('jpeg', jpg_quality=80)
+    assert rasterize.encode_jpeg(noise(400, 400), 80, max_bytes=len(full)) == full
+    
+    # Lower quality first, down to MIN_JPEG_QUALITY, then halve the resolution
+    capped = rasterize.encode_jpeg(noise(400, 400), 80, max_bytes=len(full) * 3 // 4)
+    assert len(capped) <= len(full) * 3 // 4
+    assert image_info(capped)[:2] == (400, 400)
+    
+    floor = noise(400, 400).tobytes('jpeg', jpg_quality=rasterize.MIN_JPEG_QUALITY)
+    shrunk = rasterize.encode_jpeg(noise(400, 400), 80, max_bytes=len(floor) // 2)
+    assert len(shrunk) <= len(floor) // 2
+    assert image_info(shrunk)[:2] == (200, 200)
+
+def test_photos_are_never_scaled_up_and_kept_when_smaller(tmp_path, monkeypatch):
+    noisy = photo(tmp_path / 'noise.png', 300, 200)
+    prepared = rasterize.prepare_image(noisy)
+    assert image_info(prepared) == (300, 200, 1)
+    
+    # A small JPEG re-encoded in grayscale would not get smaller, so the upload is sent as is
+    original = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 50, 50), False).tobytes('jpeg', jpg_quality=30)
+    (tmp_path / 'small.jpg').write_bytes(original)
+    assert rasterize.prepare_image(str(tmp_path / 'small.jpg')) == original
+    
+    monkeypatch.setattr(rasterize, 'OCR_MAX_PIXELS', 15000)
+    width, height, _ = image_info(rasterize.prepare_image(noisy))
+    assert width * height <= 15000 * 1.01 and width / height == pytest.approx(1.5, rel=0.02)
+    
+    monkeypatch.setattr(rasterize, 'OCR_PREPROCESS', False)
+    with open(noisy, 'rb') as f:
+        assert rasterize.prepare_image(noisy) == f.read()
@@ -0,0 +1,110 @@
+"""Offline re-extraction: stale selection, resumable batches, rollup moves and VIN relinking"""
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import DealerDailyRollup, Document, DocumentText, DocumentVehicle
+from app.ocr import PARSER_VERSION
+from app.reextract import count_stale, reextract
+from app.stats import rebuild_rollup
+from app.vin import link_vehicle
+from conftest import add_documents
+
+TEXT = 'INVOICE\nVIN: 1M8GDM9AXKP042788\nTotal Price: $9,000.00\n'
+
+def add_texts(doc_ids, text=TEXT):
+    db.session.add_all(DocumentText(document_id=doc_id, extracted_text=text) for doc_id in doc_ids)
+    db.session.commit()
+
+def stale_documents(user_id, count, **fields):
+    doc_ids = add_documents(user_id, count, **fields)
+    add_texts(doc_ids)
+    return doc_ids
+
+def versions():
+    return dict(db.session.query(Document.id, Document.parser_version).order_by(Document.id))
+
+@pytest.fixture
+def updates(app):
+    """Statements sent to the database, as (sql, executemany)"""
+    sent = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        sent.append((statement, executemany))
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield sent
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+def test_only_completed_documents_from_older_parsers_are_selected(app, dealer):
+    user_id = dealer[0]
+    unversioned = stale_documents(user_id, 1)
+    older = stale_documents(user_id, 1, parser_version=PARSER_VERSION - 1)
+    current = stale_documents(user_id, 1, parser_version=PARSER_VERSION)
+    pending = stale_documents(user_id, 1, status='pending')
+    add_documents(user_id, 1)  # no stored text to reparse
+    
+    assert count_stale() == 2
+    assert count_stale(after_id=unversioned[0]) == 1
+    assert reextract(workers=1) == (2, 2)
+    assert versions()[unversioned[0]] == versions()[older[0]] == PARSER_VERSION
+    assert db.session.get(Document, current[0]).vin is None
+    assert db.session.get(Document, pending[0]).parser_version is None
+    assert count_stale() == 0
+
+def test_interrupted_run_resumes_where_it_stopped(app, dealer):
+    doc_ids = stale_documents(dealer[0], 5)
+    
+    def interrupt(done, changed, last_id):
+        raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        reextract(batch_size=2, workers=1, progress=interrupt)
+    
+    # The first batch was committed before the interruption, the rest is still stale
+    db.session.rollback()
+    assert [doc_id for doc_id, version in versions().items() if version] == doc_ids[:2]
+    assert count_stale() == 3
+    
+    seen = []
+    assert reextract(batch_size=2, workers=1, progress=lambda *args: seen.append(args)) == (3, 3)
+    assert seen == [(2, 2, doc_ids[3]), (3, 3, doc_ids[4])]
+    assert set(versions().values()) == {PARSER_VERSION}
+
+def test_after_id_and_limit_bound_the_run(app, dealer):
+    doc_ids = stale_documents(dealer[0], 5)
+    assert reextract(batch_size=2, workers=1, after_id=doc_ids[0], limit=3) == (3, 3)
+    assert [doc_id for doc_id, version in versions().items() if version] == doc_ids[1:4]
+
+def test_each_batch_is_one_executemany_update(app, dealer, updates):
+    stale_documents(dealer[0], 5)
+    reextract(batch_size=2, workers=1)
+    
+    # A one-row batch goes out as a plain execute, larger ones as executemany
+    document_updates = [many for sql, many in updates if sql.startswith('UPDATE document SET')]
+    assert document_updates == [True, True, False]
+
+def test_rollup_moves_with_the_reparsed_fields(app, dealer):
+    user_id = dealer[0]
+    stale_documents(user_id, 3, document_type='title')
+    rebuild_rollup()
+    db.session.commit()
+    
+    reextract(workers=1)
+    rows = [(row.document_type, row.doc_count, row.sale_count, row.sale_amount_cents) for row in DealerDailyRollup.query]
+    assert rows == [('invoice', 3, 3, 2700000)]
+
+def test_changed_vins_are_relinked(app, dealer):
+    doc_id, unchanged_id = stale_documents(dealer[0], 2, vin='1HGCM82633A004352', document_type='invoice')
+    db.session.get(DocumentText, unchanged_id).extracted_text = 'INVOICE\nVIN: 1HGCM82633A004352\n'
+    for doc in Document.query:
+        link_vehicle(doc)
+    db.session.commit()
+    
+    assert reextract(workers=1) == (2, 1)
+    links = {link.document_id: link.vin for link in DocumentVehicle.query}
+    assert links == {doc_id: '1M8GDM9AXKP042788', unchanged_id: '1HGCM82633A004352'}
+
+def test_cli_reports_progress(app, dealer):
+    stale_documents(dealer[0], 3)
+    output = app.test_cli_runner().invoke(args=['reextract', '--workers', '1', '--batch-size', '2']).output
+    assert output.startswith(f'3 documents to reparse with parser version {PARSER_VERSION}')
+    assert 'Done: 3 reparsed, 3 changed' in output
+    assert app.test_cli_runner().invoke(args=['reextract']).output.startswith('0 documents to reparse')
@@ -0,0 +1,90 @@
+"""Full-text search results and their highlighted snippets"""
+from app import db
+from app.models import Document
+from app.search import LikeSearchBackend, SQLiteFTSBackend, index_document
+from conftest import add_documents
+
+HOSTILE_TEXT = 'Buyer <script>alert(1)</script> & co paid for VIN 1HGCM82633A004352 <img src=x onerror=alert(2)>'
+
+def add_text(user_id, body):
+    (doc_id,) = add_documents(user_id, 1)
+    doc = db.session.get(Document, doc_id)
+    doc.extracted_text = body
+    index_document(doc)
+    db.session.commit()
+    return doc_id
+
+def test_snippet_escapes_ocr_text(client, dealer):
+    user_id, headers = dealer
+    doc_id = add_text(user_id, HOSTILE_TEXT)
+    
+    response = client.get('/api/documents/search?q=1HGCM82633A004352', headers=headers)
+    assert [row['id'] for row in response.json['results']] == [doc_id]
+    snippet = response.json['results'][0]['snippet']
+    assert '<script>' not in snippet and '<img' not in snippet
+    assert '&lt;script&gt;' in snippet and '&amp; co' in snippet
+    assert '<mark>1HGCM82633A004352</mark>' in snippet
+
+def test_like_backend_snippet_escapes_ocr_text():
+    snippet = LikeSearchBackend.snippet(HOSTILE_TEXT, 'script')
+    assert snippet.startswith('Buyer &lt;<mark>script</mark>&gt;')
+    assert '<' not in snippet.replace('<mark>', '').replace('</mark>', '')
+    assert LikeSearchBackend.snippet('<b>no match</b>', 'vin') == '&lt;b&gt;no match&lt;/b&gt;'
+
+def search_ids(client, headers, query):
+    response = client.get(f'/api/documents/search?q={query}', headers=headers)
+    assert response.status_code == 200, response.json
+    return [row['id'] for row in response.json['results']]
+
+def fts_integrity_check():
+    # Raises if the index disagrees with the document_text rows it was built from
+    db.session.execute(db.text("INSERT INTO document_fts (document_fts) VALUES ('integrity-check')"))
+
+def test_index_follows_text_updates_and_deletes(client, dealer, other_dealer):
+    user_id, headers = dealer
+    first = add_text(user_id, 'Odometer statement for a blue sedan')
+    second = add_text(user_id, 'Bill of sale for a red truck')
+    add_text(other_dealer[0], 'Bill of sale for a blue truck')
+    assert search_ids(client, headers, 'blue') == [first]
+    assert sorted(search_ids(client, headers, 'tru*')) == [second]
+    
+    db.session.get(Document, first).extracted_text = 'Odometer statement for a green sedan'
+    db.session.commit()
+    assert search_ids(client, headers, 'blue') == []
+    assert search_ids(client, headers, 'green') == [first]
+    
+    assert client.post('/api/documents/bulk/delete', json={'ids': [second]}, headers=headers).status_code == 200
+    assert search_ids(client, headers, 'truck') == []
+    fts_integrity_check()
+
+def test_fts_index_keeps_no_copy_of_the_text(app):
+    tables = {name for (name,) in db.session.execute(db.text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+    assert 'document_fts' in tables and 'document_fts_content' not in tables
+
+def test_upgrade_replaces_a_content_bearing_index(app, client, dealer):
+    user_id, headers = dealer
+    doc_id = add_text(user_id, 'Certificate of title, lienholder First National')
+    # The table as earlier versions created it, holding its own copy of the text
+    db.session.execute(db.text('DROP TABLE document_fts'))
+    db.session.execute(db.text("CREATE VIRTUAL TABLE document_fts USING fts5(owner, extracted_text, tokenize = 'porter unicode61')"))
+    db.session.commit()
+    backend = SQLiteFTSBackend()
+    assert not backend.available()
+    
+    backend.setup()
+    assert backend.available()
+    assert search_ids(client, headers, 'lienholder') == [doc_id]
+    fts_integrity_check()
+
+def test_like_backend_matches_wildcards_literally(app, dealer):
+    user_id = dealer[0]
+    literal = add_text(user_id, 'Stock no. LOT_42 at 100% financing, path C:\\deals')
+    add_text(user_id, 'Stock no. LOTA42 at 1000 financing, path C:deals')
+    backend = LikeSearchBackend()
+    
+    def like_ids(term):
+        return [row['id'] for row in backend.search(user_id, [(term, False, False)], 10, 0)]
+    assert like_ids('LOT_42') == [literal]
+    assert like_ids('100%') == [literal]
+    assert like_ids('C:\\deals') == [literal]
+    assert like_ids('_') == [literal]
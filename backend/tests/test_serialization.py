@@ -0,0 +1,78 @@
+"""JSON providers give the same values, and row serializers project exactly the selected fields"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+from app import serialization
+from app.models import Document
+from app.serialization import RowSerializer, init_json, isoformat
+from conftest import add_documents
+
+orjson = pytest.importorskip('orjson')
+
+PAYLOAD = {
+    'id': 7,
+    'name': 'José Müller',
+    'uploaded_at': datetime(2024, 3, 15, 9, 30),
+    'sale_date_value': date(2024, 3, 15),
+    'amount': Decimal('12500.00'),
+    'huge': 2 ** 70,
+    'by_id': {1: 'one'},
+    'tags': ('a', None, True),
+}
+
+def test_orjson_and_std_providers_encode_the_same_values(app):
+    std = DefaultJSONProvider(app)
+    fast = serialization.OrjsonProvider(app)
+    assert json.loads(fast.dumps(PAYLOAD)) == json.loads(std.dumps(PAYLOAD))
+    assert fast.loads(fast.dumps(PAYLOAD))['uploaded_at'] == 'Fri, 15 Mar 2024 09:30:00 GMT'
+    # UTF-8 instead of \u escapes, keys in insertion order
+    assert fast.dumps({'b': 'é', 'a': 1}) == '{"b":"é","a":1}'
+
+def test_orjson_response_is_compact_unless_debugging(app):
+    provider = serialization.OrjsonProvider(app)
+    response = provider.response({'ok': True})
+    assert response.mimetype == 'application/json'
+    assert response.get_data() == b'{"ok":true}\n'
+    
+    app.debug = True
+    assert provider.response(ok=True).get_data() == b'{\n  "ok": true\n}\n'
+
+def test_init_json_picks_the_configured_provider(app, monkeypatch):
+    for name, provider in (('auto', serialization.OrjsonProvider), ('orjson', serialization.OrjsonProvider), ('std', DefaultJSONProvider)):
+        monkeypatch.setattr(serialization, 'JSON_PROVIDER', name)
+        assert type(init_json(app)) is provider
+    
+    monkeypatch.setattr(serialization, 'orjson', None)
+    for name in ('auto', 'orjson'):
+        monkeypatch.setattr(serialization, 'JSON_PROVIDER', name)
+        assert type(init_json(app)) is DefaultJSONProvider
+
+def test_row_serializer_converts_only_non_null_values():
+    serializer = RowSerializer(('id', 'uploaded_at'), {'uploaded_at': isoformat})
+    rows = [(1, datetime(2024, 1, 1, 12)), (2, None)]
+    assert serializer.many(rows) == [{'id': 1, 'uploaded_at': '2024-01-01T12:00:00'}, {'id': 2, 'uploaded_at': None}]
+    assert serializer.one(rows[0]) == {'id': 1, 'uploaded_at': '2024-01-01T12:00:00'}
+
+def test_document_serializers_are_cached_per_projection():
+    assert Document.serializer(('id', 'vin')) is Document.serializer(('id', 'vin'))
+    converted = Document.serializer(Document.LIST_FIELDS).converters
+    assert set(converted) == {'sale_date_value', 'uploaded_at'}
+
+def test_list_projection_matches_to_dict(client, dealer):
+    user_id, headers = dealer
+    add_documents(user_id, 2, vin='1HGCM82633A004352', sale_date_value=date(2024, 3, 15))
+    full = {doc.id: doc.to_dict() for doc in Document.query}
+    
+    # id and uploaded_at always lead, the cursor is built from them
+    listed = client.get('/api/documents/?fields=vin,sale_date_value', headers=headers).json['documents']
+    assert [list(doc) for doc in listed] == [['id', 'uploaded_at', 'vin', 'sale_date_value']] * 2
+    for doc in listed:
+        assert doc == {key: full[doc['id']][key] for key in doc}
+    assert listed[0]['sale_date_value'] == '2024-03-15'
+    
+    summary = client.get('/api/documents/', headers=headers).json['documents'][0]
+    assert tuple(summary) == Document.SUMMARY_FIELDS
@@ -0,0 +1,61 @@
+"""Boot does no per-process work that a fork would lose or repeat"""
+import gc
+import os
+
+import pytest
+
+from app import create_app, db
+from app import database, jobs
+
+@pytest.fixture
+def worker_app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "workers.db"}')
+    monkeypatch.setattr(jobs, 'OCR_WORKERS', 1)
+    app = create_app(start_workers=True)
+    yield app
+    pool = app.extensions.get('ocr_workers')
+    if pool:
+        pool.stop()
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+def test_workers_start_with_the_first_request_not_create_app(worker_app):
+    assert 'ocr_workers' not in worker_app.extensions
+    
+    client = worker_app.test_client()
+    client.get('/api/documents')
+    pool = worker_app.extensions['ocr_workers']
+    assert pool.pid == os.getpid()
+    assert all(worker.is_alive() for worker in pool.workers)
+    
+    client.get('/api/documents')
+    assert worker_app.extensions['ocr_workers'] is pool
+
+def test_a_forked_process_starts_its_own_pool(worker_app, monkeypatch):
+    client = worker_app.test_client()
+    client.get('/api/documents')
+    inherited = worker_app.extensions['ocr_workers']
+    
+    # As seen from a child: the pool in app.extensions was started by another pid
+    monkeypatch.setattr(jobs.os, 'getpid', lambda: inherited.pid + 1)
+    client.get('/api/documents')
+    pool = worker_app.extensions['ocr_workers']
+    assert pool is not inherited and pool.pid == inherited.pid + 1
+    inherited.stop()
+
+def test_fork_hook_tracks_engines_without_keeping_them_alive(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "fork.db"}')
+    app = create_app(start_workers=False)
+    with app.app_context():
+        engine = db.engine
+        assert engine in database._engines
+        database.dispose_engines_after_fork()
+        assert engine.pool.checkedout() == 0
+        db.session.remove()
+    
+    tracked = len(database._engines)
+    del app, engine
+    gc.collect()
+    assert len(database._engines) < tracked
@@ -0,0 +1,75 @@
+"""The incrementally maintained dealer rollup always equals a full rebuild from documents"""
+import io
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app import jobs
+from app.models import DealerDailyRollup, Document, DocumentText
+from app.reextract import reextract
+from app.stats import ROLLUP_KEYS, ROLLUP_MEASURES, rebuild_rollup
+from conftest import add_documents, sample_pdf
+
+FIELDS = 'Purchase Date: 03/15/2024\nTotal Price: $12,500.00\n'
+
+def rollup_rows():
+    columns = [getattr(DealerDailyRollup, name) for name in ROLLUP_KEYS + ROLLUP_MEASURES]
+    return sorted(tuple(row) for row in db.session.query(*columns))
+
+def assert_matches_rebuild():
+    """Compare the live rollup with a rebuild, which leaves the rebuilt rows in place"""
+    live = rollup_rows()
+    rebuild_rollup()
+    db.session.commit()
+    assert live == rollup_rows()
+    assert all(row[len(ROLLUP_KEYS)] > 0 for row in live)
+
+@pytest.fixture
+def ocr_results(monkeypatch):
+    monkeypatch.setattr(jobs, 'OCR_WORKERS', 1)
+    monkeypatch.setattr(jobs, 'lookup_or_process', lambda path, content_hash=None: {
+        'success': True, 'error': None, 'extracted_text': 'BILL OF SALE\n' + FIELDS,
+        'extracted_data': {
+            'vin': None, 'buyer_name': None, 'seller_name': None, 'sale_date': '03/15/2024',
+            'sale_amount': '$12,500.00', 'odometer_reading': None, 'document_type': 'bill_of_sale'
+        }
+    })
+
+def upload(client, headers, names):
+    content = sample_pdf()
+    response = client.post(
+        '/api/documents/upload', headers=headers,
+        data={'files': [(io.BytesIO(content), name) for name in names]}, content_type='multipart/form-data'
+    )
+    assert response.status_code == 200, response.json
+    return [doc['id'] for doc in response.json['uploaded']]
+
+def test_rollup_follows_upload_completion_and_delete(client, dealer, other_dealer, ocr_results):
+    user_id, headers = dealer
+    doc_ids = upload(client, headers, ['a.pdf', 'b.pdf', 'c.pdf'])
+    upload(client, other_dealer[1], ['d.pdf'])
+    assert_matches_rebuild()
+    
+    jobs.run_jobs(jobs.claim_jobs(limit=10))
+    assert {doc.status for doc in Document.query} == {'completed'}
+    assert_matches_rebuild()
+    
+    response = client.post('/api/documents/bulk/delete', headers=headers, json={'ids': doc_ids[:2]})
+    assert response.status_code == 200
+    assert_matches_rebuild()
+    assert client.delete(f'/api/documents/{doc_ids[2]}', headers=headers).status_code == 200
+    assert_matches_rebuild()
+    assert DealerDailyRollup.query.filter_by(uploaded_by=user_id).count() == 0
+
+def test_rollup_follows_reextract(app, dealer):
+    user_id = dealer[0]
+    doc_ids = add_documents(user_id, 3, document_type='title', processed_at=datetime(2024, 1, 2))
+    db.session.add_all(DocumentText(document_id=doc_id, extracted_text='INVOICE\n' + FIELDS) for doc_id in doc_ids)
+    db.session.commit()
+    rebuild_rollup()
+    db.session.commit()
+    
+    assert reextract(batch_size=2, workers=1) == (3, 3)
+    assert {(doc.document_type, doc.sale_amount_cents) for doc in Document.query} == {('invoice', 1250000)}
+    assert_matches_rebuild()
@@ -0,0 +1,63 @@
+"""Content-addressed storage shared between documents"""
+import hashlib
+import os
+import threading
+
+from app import db
+from app.documents import create_document, delete_documents
+from app.models import Document
+from app.storage import delete_unused_file, file_exists, save_upload, staging_file
+from conftest import sample_pdf
+
+def stage(content):
+    fd, temp_path = staging_file()
+    with os.fdopen(fd, 'wb') as out:
+        out.write(content)
+    return temp_path
+
+def test_delete_waits_for_an_upload_of_the_same_content(app, dealer):
+    user_id, _ = dealer
+    content = sample_pdf()
+    content_hash = hashlib.sha256(content).hexdigest()
+    key = save_upload(stage(content), content_hash, 'pdf')
+    old = create_document(user_id, 'old.pdf', 'pdf', len(content), key, content_hash)
+    db.session.commit()
+    delete_documents([old])
+    db.session.commit()
+    
+    deleted = []
+    
+    def delete():
+        with app.app_context():
+            deleted.append(delete_unused_file(key))
+            db.session.remove()
+    
+    # Another user's upload of the same content: the file exists, so its staged copy is dropped
+    with app.test_request_context():
+        assert save_upload(stage(content), content_hash, 'pdf') == key
+        deleter = threading.Thread(target=delete)
+        deleter.start()
+        deleter.join(0.3)
+        assert deleter.is_alive()
+        create_document(user_id, 'new.pdf', 'pdf', len(content), key, content_hash)
+        db.session.commit()
+    
+    deleter.join(5)
+    assert deleted == [False]
+    assert file_exists(key)
+
+def test_unused_file_is_deleted(app, dealer):
+    content = b'%PDF-1.4 unused'
+    key = save_upload(stage(content), hashlib.sha256(content).hexdigest(), 'pdf')
+    assert delete_unused_file(key)
+    assert not file_exists(key)
+    assert db.session.query(Document).count() == 0
+
+def test_reference_checks_use_the_file_path_index(app):
+    for query in (
+        db.session.query(Document.id).filter_by(file_path='00/00/a.pdf'),
+        db.session.query(Document.file_path).filter(Document.file_path.in_(['00/00/a.pdf', '00/00/b.pdf'])),
+    ):
+        sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        plan = ' '.join(row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')))
+        assert 'ix_document_file_path' in plan
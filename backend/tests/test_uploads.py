@@ -0,0 +1,119 @@
+"""Resumable chunked uploads and content type checks"""
+import hashlib
+import glob
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from app import db
+from app.models import UploadSession
+from app.uploads import UploadError, append_chunk, stream_to_file
+from conftest import sample_pdf
+
+class TrickleStream(io.BytesIO):
+    """Returns at most a few bytes per read, like a slow socket"""
+    def read(self, size=-1):
+        return super().read(3)
+
+def start(client, headers, size, filename='deal.pdf'):
+    return client.post('/api/documents/upload/sessions', headers=headers, json={'filename': filename, 'size': size})
+
+def test_session_size_must_be_a_positive_integer(client, dealer):
+    _, headers = dealer
+    for size in (None, True, False, 0, -1, 1.5, '100'):
+        assert start(client, headers, size).status_code == 400, size
+    assert start(client, headers, len(sample_pdf())).status_code == 201
+
+def send(client, headers, upload_id, offset, data):
+    return client.put(
+        f'/api/documents/upload/sessions/{upload_id}', headers={**headers, 'Upload-Offset': str(offset)}, data=data
+    )
+
+def test_signature_is_checked_across_short_reads():
+    content = sample_pdf()
+    out = io.BytesIO()
+    assert stream_to_file(TrickleStream(content[:64]), out, hashlib.sha256(), 1024, 'pdf') == 64
+    assert out.getvalue() == content[:64]
+    
+    with pytest.raises(UploadError) as error:
+        stream_to_file(TrickleStream(b'%PDX-1.4 not a pdf'), io.BytesIO(), hashlib.sha256(), 1024, 'pdf')
+    assert error.value.status_code == 415
+
+def test_signature_split_across_chunks(client, dealer):
+    _, headers = dealer
+    content = sample_pdf()
+    upload_id = start(client, headers, len(content)).json['upload_id']
+    
+    assert send(client, headers, upload_id, 0, content[:3]).status_code == 200
+    response = send(client, headers, upload_id, 3, content[3:])
+    assert response.status_code == 201, response.json
+    
+    upload_id = start(client, headers, len(content)).json['upload_id']
+    send(client, headers, upload_id, 0, b'%PD')
+    assert send(client, headers, upload_id, 3, b'X' + content[4:]).status_code == 415
+
+def test_file_shorter_than_its_signature_is_rejected(client, dealer):
+    _, headers = dealer
+    assert start(client, headers, 3).status_code == 415
+    response = client.post(
+        '/api/documents/upload', headers=headers,
+        data={'files': [(io.BytesIO(b'%PD'), 'deal.pdf')]}, content_type='multipart/form-data'
+    )
+    assert response.json['uploaded'] == [] and response.json['errors'] == ['File content does not match its type']
+
+def test_losing_writer_never_touches_accepted_bytes(client, dealer):
+    _, headers = dealer
+    content = sample_pdf()
+    half = len(content) // 2
+    upload_id = start(client, headers, len(content)).json['upload_id']
+    assert send(client, headers, upload_id, 0, content[:half]).status_code == 200
+    
+    # A request that read the session before the first chunk was accepted
+    session = db.session.get(UploadSession, upload_id)
+    stale = SimpleNamespace(**{name: getattr(session, name) for name in ('id', 'total_size', 'file_type', 'temp_path')})
+    stale.received_bytes = 0
+    with pytest.raises(UploadError) as error:
+        append_chunk(stale, io.BytesIO(b'%PDF-' + b'x' * half), 0)
+    assert error.value.status_code == 409
+    db.session.rollback()
+    
+    with open(session.temp_path, 'rb') as f:
+        assert f.read() == content[:half]
+    assert glob.glob(f'{session.temp_path}.*') == []
+    
+    response = send(client, headers, upload_id, half, content[half:])
+    assert response.status_code == 201, response.json
+    assert client.get(f'/api/documents/{response.json["id"]}/download', headers=headers).data == content
+
+def test_session_body_must_be_a_json_object(client, dealer):
+    _, headers = dealer
+    url = '/api/documents/upload/sessions'
+    for body in ([], ['deal.pdf', 100], 'deal.pdf', 7, None):
+        response = client.post(url, headers=headers, json=body)
+        assert response.status_code == 400, body
+        assert response.json['error'] == 'Request body must be a JSON object'
+    assert client.post(url, headers=headers, data='{not json', content_type='application/json').status_code == 400
+    assert client.post(url, headers=headers, data='size=100').status_code == 400
+
+def test_expiry_drops_hashes_of_uploads_gone_from_the_database(client, dealer, monkeypatch):
+    from app import uploads
+    _, headers = dealer
+    content = sample_pdf()
+    kept = start(client, headers, len(content)).json['upload_id']
+    gone = start(client, headers, len(content)).json['upload_id']
+    for upload_id in (kept, gone):
+        send(client, headers, upload_id, 0, content[:4])
+    assert {kept, gone} <= set(uploads._hashers)
+    
+    # As if another process had cancelled it
+    UploadSession.query.filter_by(id=gone).delete()
+    db.session.commit()
+    uploads.expire_sessions()
+    assert kept in uploads._hashers and gone not in uploads._hashers
+    
+    monkeypatch.setattr(uploads, 'UPLOAD_SESSION_TTL', -1)
+    uploads.expire_sessions()
+    db.session.commit()
+    assert kept not in uploads._hashers
+    assert db.session.get(UploadSession, kept) is None
@@ -0,0 +1,40 @@
+"""VIN check-digit validation and document-to-vehicle links"""
+import pytest
+
+from app import db
+from app.models import Document, DocumentVehicle, Vehicle
+from app.vin import is_valid_vin, link_vehicle, normalize_vin
+from conftest import add_documents
+
+@pytest.mark.parametrize('vin', ['1HGCM82633A004352', '1M8GDM9AXKP042788', '11111111111111111'])
+def test_valid_check_digits(vin):
+    assert is_valid_vin(vin)
+
+@pytest.mark.parametrize('vin', ['1HGCM82643A004352', '1M8GDM9A1KP042788', '11111111211111111'])
+def test_wrong_check_digits(vin):
+    assert not is_valid_vin(vin)
+
+@pytest.mark.parametrize('letter', 'IOQ')
+def test_i_o_and_q_are_never_valid(letter):
+    # Each stands in for a digit with the same weight, so only the character itself is wrong
+    digit = {'I': '1', 'O': '0', 'Q': '0'}[letter]
+    vin = '1HGCM82633A004352'
+    position = vin.index(digit)
+    assert not is_valid_vin(vin[:position] + letter + vin[position + 1:])
+
+@pytest.mark.parametrize('vin', [None, '', '1HGCM82633A00435', '1HGCM82633A0043521', '1hgcm82633a004352'])
+def test_wrong_length_or_case_is_invalid(vin):
+    assert not is_valid_vin(vin)
+
+def test_link_normalizes_and_skips_invalid_vins(app, dealer):
+    valid_id, invalid_id = add_documents(dealer[0], 2)
+    valid, invalid = db.session.get(Document, valid_id), db.session.get(Document, invalid_id)
+    valid.vin = ' 1hgcm82633a004352 '
+    invalid.vin = '1HGCM82643A004352'
+    
+    assert link_vehicle(valid) == normalize_vin(valid.vin) == '1HGCM82633A004352'
+    assert link_vehicle(invalid) is None
+    db.session.commit()
+    
+    assert [vehicle.vin for vehicle in Vehicle.query] == ['1HGCM82633A004352']
+    assert [link.document_id for link in DocumentVehicle.query] == [valid_id]
@@ -0,0 +1,7 @@
+from app import create_app
+from app.jobs import run_workers
+
+app = create_app(start_workers=False)
+
+if __name__ == '__main__':
+    run_workers(app)
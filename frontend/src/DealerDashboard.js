@@ -1,7 +1,35 @@
-import React from 'react';
+import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Container, Paper, Button, Typography, Box, AppBar, Toolbar } from '@mui/material';
 
+const STATS_API = 'http://localhost:5000/api/documents/stats';
+
+const formatDollars = (cents) => `$${(cents / 100).toLocaleString(undefined, { minimumFractionDigits: 2 })}`;
+
+const StatsPanel = ({ stats }) => (
+  <Paper sx={{ p: 4, mt: 4 }}>
+    <Typography variant="h6" sx={{ mb: 2 }}>📊 Overview</Typography>
+    <Typography>Documents: {stats.total_documents}</Typography>
+    {Object.entries(stats.by_status).map(([status, count]) => (
+      <Typography key={status} color="textSecondary">{status}: {count}</Typography>
+    ))}
+    <Typography sx={{ mt: 2 }}>OCR failure rate: {(stats.ocr_failure_rate * 100).toFixed(1)}%</Typography>
+    {stats.avg_processing_ms !== null && (
+      <Typography>Average processing time: {(stats.avg_processing_ms / 1000).toFixed(1)}s</Typography>
+    )}
+    {stats.sales_by_month.length > 0 && (
+      <Box sx={{ mt: 2 }}>
+        <Typography>Sales by month:</Typography>
+        {stats.sales_by_month.map(row => (
+          <Typography key={row.month} color="textSecondary">
+            {row.month}: {row.deals} deal(s), {formatDollars(row.sale_amount_cents)}
+          </Typography>
+        ))}
+      </Box>
+    )}
+  </Paper>
+);
+
 const NavBar = ({ title, onLogout }) => (
   <AppBar position="static">
     <Toolbar>
@@ -14,6 +42,15 @@ const NavBar = ({ title, onLogout }) => (
 export default function DealerDashboard() {
   const navigate = useNavigate();
   const user = JSON.parse(localStorage.getItem('user') || '{}');
+  const [stats, setStats] = useState(null);
+
+  useEffect(() => {
+    const token = localStorage.getItem('access_token');
+    fetch(STATS_API, { headers: { 'Authorization': `Bearer ${token}` } })
+      .then(res => (res.ok ? res.json() : null))
+      .then(data => setStats(data ? data.stats : null))
+      .catch(() => setStats(null));
+  }, []);
 
   const handleLogout = () => {
     localStorage.removeItem('access_token');
@@ -41,6 +78,7 @@ export default function DealerDashboard() {
             ))}
           </Box>
         </Paper>
+        {stats && <StatsPanel stats={stats} />}
       </Container>
     </>
   );
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { Container, Paper, Button, Typography, Box, AppBar, Toolbar, Table, TableBody, TableCell, TableHead, TableRow, CircularProgress, Alert, Dialog, DialogTitle, DialogContent, DialogActions, TextField } from '@mui/material';
+import { Container, Paper, Button, Typography, Box, AppBar, Toolbar, Table, TableBody, TableCell, TableHead, TableRow, CircularProgress, Alert, Dialog, DialogTitle, DialogContent, DialogActions, TextField, Checkbox } from '@mui/material';
 
 const API_URL = 'http://localhost:5000/api/documents';
 
@@ -18,20 +18,55 @@ export default function DocumentsList() {
   const [selectedDoc, setSelectedDoc] = useState(null);
   const [ocrData, setOcrData] = useState(null);
   const [notes, setNotes] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [previewUrl, setPreviewUrl] = useState(null);
+  const [selected, setSelected] = useState([]);
   const navigate = useNavigate();
 
   useEffect(() => {
     loadDocuments();
   }, []);
 
-  const loadDocuments = async () => {
+  // OCR runs in the background; poll just the rows still being processed and patch them in
+  // place, so pages already loaded with Load More stay on screen
+  const pendingIds = documents
+    .filter(doc => doc.status === 'pending' || doc.status === 'processing')
+    .map(doc => doc.id)
+    .join(',');
+  useEffect(() => {
+    if (!pendingIds) return;
+    const timer = setInterval(() => refreshDocuments(pendingIds.split(',').map(Number)), 3000);
+    return () => clearInterval(timer);
+  }, [pendingIds]);
+
+  const refreshDocuments = async (ids) => {
+    const token = localStorage.getItem('access_token');
+    const updates = await Promise.all(ids.map(async (id) => {
+      try {
+        const res = await fetch(`${API_URL}/${id}/status`, { headers: { 'Authorization': `Bearer ${token}` } });
+        return res.ok ? (await res.json()).document : null;
+      } catch (err) {
+        return null;
+      }
+    }));
+    const byId = Object.fromEntries(updates.filter(Boolean).map(doc => [doc.id, doc]));
+    setDocuments(prev => prev.map(doc => byId[doc.id] ? { ...doc, ...byId[doc.id] } : doc));
+  };
+
+  const removeDocuments = (ids) => {
+    setDocuments(prev => prev.filter(doc => !ids.includes(doc.id)));
+  };
+
+  const loadDocuments = async (cursor = null) => {
     try {
       const token = localStorage.getItem('access_token');
-      const res = await fetch(API_URL, { method: 'GET', headers: { 'Authorization': `Bearer ${token}` } });
+      const url = cursor ? `${API_URL}?cursor=${encodeURIComponent(cursor)}` : API_URL;
+      const res = await fetch(url, { method: 'GET', headers: { 'Authorization': `Bearer ${token}` } });
 
       if (res.ok) {
         const data = await res.json();
-        setDocuments(data.documents || []);
+        setDocuments(prev => cursor ? [...prev, ...(data.documents || [])] : (data.documents || []));
+        setNextCursor(data.next_cursor || null);
         setError('');
       } else {
         const data = await res.json();
@@ -54,6 +89,7 @@ export default function DocumentsList() {
         setSelectedDoc(doc);
         setOcrData(data);
         setNotes(data.notes || '');
+        loadPreview(doc.id);
       } else {
         setError('Error loading document');
       }
@@ -62,6 +98,25 @@ export default function DocumentsList() {
     }
   };
 
+  // First-page preview; the server renders it once and the browser revalidates it by ETag
+  const loadPreview = async (docId) => {
+    try {
+      const token = localStorage.getItem('access_token');
+      const res = await fetch(`${API_URL}/${docId}/pages/1/thumbnail`, { headers: { 'Authorization': `Bearer ${token}` } });
+      if (res.ok) {
+        setPreviewUrl(window.URL.createObjectURL(await res.blob()));
+      }
+    } catch (err) {
+      setPreviewUrl(null);
+    }
+  };
+
+  const closeDialog = () => {
+    if (previewUrl) window.URL.revokeObjectURL(previewUrl);
+    setPreviewUrl(null);
+    setSelectedDoc(null);
+  };
+
   const handleSaveNotes = async () => {
     try {
       const token = localStorage.getItem('access_token');
@@ -73,8 +128,7 @@ export default function DocumentsList() {
 
       if (res.ok) {
         setError('Notes saved!');
-        setSelectedDoc(null);
-        loadDocuments();
+        closeDialog();
       } else {
         setError('Error saving notes');
       }
@@ -113,7 +167,43 @@ export default function DocumentsList() {
 
       if (res.ok) {
         setError('Deleted');
-        loadDocuments();
+        setSelected(prev => prev.filter(id => id !== docId));
+        removeDocuments([docId]);
+      } else {
+        setError('Delete error');
+      }
+    } catch (err) {
+      setError('Delete error');
+    }
+  };
+
+  const toggleSelected = (docId) => {
+    setSelected(prev => prev.includes(docId) ? prev.filter(id => id !== docId) : [...prev, docId]);
+  };
+
+  const toggleAll = () => {
+    setSelected(prev => prev.length === documents.length ? [] : documents.map(doc => doc.id));
+  };
+
+  // One request per action for the whole selection
+  const postBulk = (action, body) => {
+    const token = localStorage.getItem('access_token');
+    return fetch(`${API_URL}/bulk/${action}`, {
+      method: 'POST',
+      headers: { 'Authorization': `Bearer ${token}`, 'Content-Type': 'application/json' },
+      body: JSON.stringify({ ids: selected, ...body })
+    });
+  };
+
+  const handleBulkDelete = async () => {
+    if (!window.confirm(`Delete ${selected.length} documents?`)) return;
+
+    try {
+      const res = await postBulk('delete');
+      if (res.ok) {
+        setError('Deleted');
+        setSelected([]);
+        removeDocuments(selected);
       } else {
         setError('Delete error');
       }
@@ -122,6 +212,38 @@ export default function DocumentsList() {
     }
   };
 
+  const handleBulkNotes = async () => {
+    const text = window.prompt(`Note to add to ${selected.length} documents:`);
+    if (!text) return;
+
+    try {
+      const res = await postBulk('notes', { notes: text, mode: 'append' });
+      setError(res.ok ? 'Notes saved!' : 'Error saving notes');
+    } catch (err) {
+      setError('Error saving notes');
+    }
+  };
+
+  const handleBulkDownload = async () => {
+    try {
+      const res = await postBulk('download');
+
+      if (res.ok) {
+        const blob = await res.blob();
+        const url = window.URL.createObjectURL(blob);
+        const link = document.createElement('a');
+        link.href = url;
+        link.download = 'documents.zip';
+        link.click();
+        window.URL.revokeObjectURL(url);
+      } else {
+        setError('Download error');
+      }
+    } catch (err) {
+      setError('Download error');
+    }
+  };
+
   const handleLogout = () => {
     localStorage.clear();
     navigate('/auth');
@@ -139,6 +261,13 @@ export default function DocumentsList() {
       <Container maxWidth="lg" sx={{ py: 4 }}>
         <Box sx={{ mb: 3 }}>
           <Button variant="contained" onClick={() => navigate('/upload')}>📤 Upload More</Button>
+          {selected.length > 0 && (
+            <>
+              <Button sx={{ ml: 2 }} onClick={handleBulkDownload}>Download {selected.length}</Button>
+              <Button onClick={handleBulkNotes}>Add Note</Button>
+              <Button color="error" onClick={handleBulkDelete}>Delete {selected.length}</Button>
+            </>
+          )}
         </Box>
 
         {error && <Alert severity="error" sx={{ mb: 2 }}>{error}</Alert>}
@@ -151,6 +280,9 @@ export default function DocumentsList() {
             <Table>
               <TableHead>
                 <TableRow sx={{ backgroundColor: '#f5f5f5' }}>
+                  <TableCell padding="checkbox">
+                    <Checkbox checked={selected.length > 0 && selected.length === documents.length} indeterminate={selected.length > 0 && selected.length < documents.length} onChange={toggleAll} />
+                  </TableCell>
                   <TableCell>Filename</TableCell>
                   <TableCell>Type</TableCell>
                   <TableCell>Status</TableCell>
@@ -160,7 +292,10 @@ export default function DocumentsList() {
               </TableHead>
               <TableBody>
                 {documents.map((doc) => (
-                  <TableRow key={doc.id}>
+                  <TableRow key={doc.id} selected={selected.includes(doc.id)}>
+                    <TableCell padding="checkbox">
+                      <Checkbox checked={selected.includes(doc.id)} onChange={() => toggleSelected(doc.id)} />
+                    </TableCell>
                     <TableCell>{doc.filename}</TableCell>
                     <TableCell>{doc.file_type}</TableCell>
                     <TableCell>{doc.status}</TableCell>
@@ -174,13 +309,23 @@ export default function DocumentsList() {
                 ))}
               </TableBody>
             </Table>
+            {nextCursor && (
+              <Box sx={{ p: 2, textAlign: 'center' }}>
+                <Button onClick={() => loadDocuments(nextCursor)}>Load More</Button>
+              </Box>
+            )}
           </Paper>
         )}
       </Container>
 
-      <Dialog open={!!selectedDoc} onClose={() => setSelectedDoc(null)} maxWidth="md" fullWidth>
+      <Dialog open={!!selectedDoc} onClose={closeDialog} maxWidth="md" fullWidth>
         <DialogTitle>{selectedDoc?.filename}</DialogTitle>
         <DialogContent sx={{ pt: 2 }}>
+          {previewUrl && (
+            <Box sx={{ mb: 3, textAlign: 'center' }}>
+              <img src={previewUrl} alt="First page preview" style={{ maxWidth: '100%', border: '1px solid #eee' }} />
+            </Box>
+          )}
           <Box sx={{ mb: 3 }}>
             <Typography variant="h6" sx={{ mb: 2, color: '#1976d2' }}>Extracted Data</Typography>
             <DataRow label="VIN" value={ocrData?.vin} />
@@ -197,7 +342,7 @@ export default function DocumentsList() {
           <TextField fullWidth multiline rows={6} value={notes} onChange={(e) => setNotes(e.target.value)} placeholder="Add notes or annotations..." />
         </DialogContent>
         <DialogActions>
-          <Button onClick={() => setSelectedDoc(null)}>Close</Button>
+          <Button onClick={closeDialog}>Close</Button>
           <Button variant="contained" onClick={handleSaveNotes}>Save Notes</Button>
         </DialogActions>
       </Dialog>